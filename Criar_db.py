@@ -10,6 +10,8 @@ import sys
 from pathlib import Path
 import logging
 
+from noc import agregados, shards
+
 logging.basicConfig(level=logging.INFO)
 
 # ==========================================
@@ -18,56 +20,161 @@ logging.basicConfig(level=logging.INFO)
 BASE_DIR = Path(getattr(sys, "_MEIPASS", Path(__file__).parent))
 DB_PATH = BASE_DIR / "banco_exp.sqlite"
 
-conn = sqlite3.connect(DB_PATH)
-cursor = conn.cursor()
-
 # ==========================================
 # CRIAÇÃO DAS TABELAS
 # ==========================================
 
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS Auditoria_LayoutNew (
-    Id INTEGER PRIMARY KEY AUTOINCREMENT,
-    IdCompany INTEGER NOT NULL,
-    Layout TEXT NOT NULL,
-    dtDataReferencia DATE NOT NULL
-)
-""")
-
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS input_Auditoria (
-    Id INTEGER PRIMARY KEY AUTOINCREMENT,
-    idCompanyDeep INTEGER NOT NULL,
-    LayoutDeep TEXT NOT NULL,
-    dtDataReferenciaEPS DATE NOT NULL,
-    diferenca TEXT NOT NULL CHECK(diferenca IN ('Igual','Aumentou','Reduziu')),
-    DeepInsert DATETIME NOT NULL
-)
-""")
-
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS __Consolidado_Hist (
-    Id INTEGER PRIMARY KEY AUTOINCREMENT,
-    dtDataReferencia DATE NOT NULL,
-    dsNomeAssessoria TEXT NOT NULL,
-    IdCompany INTEGER NOT NULL,
-    Qtd INTEGER NOT NULL,
-    Layout TEXT NOT NULL,
-    Data_Coleta DATE NOT NULL
-)
-""")
+def criar_tabelas(cursor: sqlite3.Cursor, empresas_hora: list[str]) -> None:
+    """Cria (se preciso) todas as tabelas num arquivo; as de acionamentos só para as empresas do arquivo."""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS Auditoria_LayoutNew (
+        Id INTEGER PRIMARY KEY AUTOINCREMENT,
+        IdCompany INTEGER NOT NULL,
+        Layout TEXT NOT NULL,
+        dtDataReferencia DATE NOT NULL
+    )
+    """)
 
-EMPRESAS_HORA = [f"Empresa_{i}" for i in range(1, 13)]
-for empresa in EMPRESAS_HORA:
-    cursor.execute(f"""
-    CREATE TABLE IF NOT EXISTS __{empresa}_input_Acionamentos (
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS input_Auditoria (
+        Id INTEGER PRIMARY KEY AUTOINCREMENT,
+        idCompanyDeep INTEGER NOT NULL,
+        LayoutDeep TEXT NOT NULL,
+        dtDataReferenciaEPS DATE NOT NULL,
+        diferenca TEXT NOT NULL CHECK(diferenca IN ('Igual','Aumentou','Reduziu')),
+        DeepInsert DATETIME NOT NULL
+    )
+    """)
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS __Consolidado_Hist (
         Id INTEGER PRIMARY KEY AUTOINCREMENT,
         dtDataReferencia DATE NOT NULL,
-        hrHoraInicio TEXT NOT NULL,
-        Qtde INTEGER NOT NULL
+        dsNomeAssessoria TEXT NOT NULL,
+        IdCompany INTEGER NOT NULL,
+        Qtd INTEGER NOT NULL,
+        Layout TEXT NOT NULL,
+        Data_Coleta DATE NOT NULL
+    )
+    """)
+
+    for empresa in empresas_hora:
+        cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS __{empresa}_input_Acionamentos (
+            Id INTEGER PRIMARY KEY AUTOINCREMENT,
+            dtDataReferencia DATE NOT NULL,
+            hrHoraInicio TEXT NOT NULL,
+            Qtde INTEGER NOT NULL
+        )
+        """)
+
+    # Dimensões com chaves inteiras (noc/dimensoes.py): os agregados abaixo guardam
+    # só IdEmpresa/IdLayout em vez de repetir os nomes em cada linha.
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS Dim_Empresa (
+        IdEmpresa INTEGER PRIMARY KEY,
+        Nome TEXT NOT NULL UNIQUE,
+        IdCompany INTEGER,
+        Grupo TEXT NOT NULL
     )
     """)
 
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS Dim_Layout (
+        IdLayout INTEGER PRIMARY KEY,
+        Nome TEXT NOT NULL UNIQUE,
+        Grupo TEXT NOT NULL
+    )
+    """)
+
+    # Agregados criados antes das dimensões (com nomes em TEXT) são derivados:
+    # descarta e reconstrói com as chaves inteiras.
+    colunas_agregado = {c[1] for c in cursor.execute("PRAGMA table_info(Acionamentos_Hora_Agregado)")}
+    if "Empresa" in colunas_agregado:
+        for tabela in ("Acionamentos_Hora_Agregado", "Acionamentos_Hora_Baseline",
+                       "Consolidado_Diario", "Auditoria_Cumulativo_Diario"):
+            cursor.execute(f"DROP TABLE IF EXISTS {tabela}")
+        logging.info("Agregados com nomes em texto descartados; serão reconstruídos com chaves inteiras.")
+
+    # Agregado (empresa, data, hora) dos acionamentos, mantido pelo coleta-hora.py.
+    # PK começando pela data: consultas por intervalo leem só as páginas do período.
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS Acionamentos_Hora_Agregado (
+        IdEmpresa INTEGER NOT NULL,
+        dtDataReferencia DATE NOT NULL,
+        hrHoraInicio TEXT NOT NULL,
+        Qtde INTEGER NOT NULL,
+        PRIMARY KEY (dtDataReferencia, IdEmpresa, hrHoraInicio)
+    ) WITHOUT ROWID
+    """)
+
+    # Linhas de base (média/variância exponenciais) por empresa, dia da semana e hora,
+    # usadas pela detecção de quedas (noc/anomalias.py).
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS Acionamentos_Hora_Baseline (
+        IdEmpresa INTEGER NOT NULL,
+        DiaSemana INTEGER NOT NULL,
+        hrHoraInicio TEXT NOT NULL,
+        Media REAL NOT NULL,
+        Variancia REAL NOT NULL,
+        Amostras INTEGER NOT NULL,
+        UltimoDia DATE NOT NULL,
+        PRIMARY KEY (IdEmpresa, DiaSemana, hrHoraInicio)
+    ) WITHOUT ROWID
+    """)
+
+    # Agregados diários mantidos no momento da carga (noc/agregados.py).
+    # SUM(Qtd) por dia, layout e assessoria, lido pelos coletores bancária e consórcio.
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS Consolidado_Diario (
+        dtDataReferencia DATE NOT NULL,
+        IdLayout INTEGER NOT NULL,
+        IdEmpresa INTEGER NOT NULL,
+        Qtd INTEGER NOT NULL,
+        PRIMARY KEY (dtDataReferencia, IdLayout, IdEmpresa)
+    ) WITHOUT ROWID
+    """)
+
+    # Contagem diária e acumulada de Auditoria_LayoutNew por empresa e layout:
+    # o cumulativo do checklist até uma data é a última linha com data <= referência.
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS Auditoria_Cumulativo_Diario (
+        IdCompany INTEGER NOT NULL,
+        IdLayout INTEGER NOT NULL,
+        dtDataReferencia DATE NOT NULL,
+        Qtd INTEGER NOT NULL,
+        Cumulativo INTEGER NOT NULL,
+        PRIMARY KEY (IdCompany, IdLayout, dtDataReferencia)
+    ) WITHOUT ROWID
+    """)
+
+    # Índices por data para recalcular os agregados só a partir da menor data carregada
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_consolidado_data ON __Consolidado_Hist (dtDataReferencia)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_layoutnew_data ON Auditoria_LayoutNew (dtDataReferencia)")
+
+
+# Catálogo e shards (noc/shards.py) têm o mesmo esquema; cada empresa horária
+# ganha sua tabela de entrada apenas no seu shard.
+EMPRESAS_HORA = [f"Empresa_{i}" for i in range(1, 13)]
+roteador = shards.roteador(DB_PATH)
+for caminho in dict.fromkeys([roteador.catalogo, *roteador.caminhos()]):
+    conn = sqlite3.connect(caminho)
+    criar_tabelas(conn.cursor(), [e for e in EMPRESAS_HORA if roteador.shard_de(e) == caminho])
+    conn.commit()
+    conn.close()
+
+conn = sqlite3.connect(DB_PATH)
+
+# Ao ativar NOC_SHARDS num banco já populado, os dados por empresa vão para os shards
+movidas = shards.redistribuir(conn, roteador)
+if movidas:
+    logging.info(f"{movidas} linhas redistribuídas do catálogo para {roteador.quantidade} shards.")
+
+# Bancos já populados antes dos agregados: constrói tudo uma única vez
+if agregados.vazios(conn):
+    linhas = agregados.atualizar_todos(conn)
+    logging.info(f"Agregados diários construídos: {linhas}")
+
 conn.commit()
 conn.close()
 logging.info(f"Banco profissional criado com sucesso: {DB_PATH}")
@@ -0,0 +1,75 @@
+"""
+Teste de carga do dashboard com várias sessões simultâneas.
+Abre N sessões (AppTest do Streamlit) no mesmo processo, navega por todas as
+páginas em cada uma e mede a memória residente após cada sessão adicionada.
+Com o cache compartilhado, o custo por sessão extra deve ficar restrito ao
+estado da sessão (filtros/edições), sem cópias dos DataFrames.
+
+Uso: python benchmarks/carga-sessoes.py --sessoes 10
+"""
+
+import argparse
+import logging
+import os
+import sys
+from pathlib import Path
+
+from streamlit.testing.v1 import AppTest
+
+logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DASHBOARD_PATH = BASE_DIR / "dashboard.py"
+PAGINAS = ["Home", "Checklist", "Consorcio", "Coletas", "Hora", "Help"]
+
+
+def memoria_residente_mb() -> float:
+    """RSS atual do processo (psutil se disponível, senão /proc, senão pico do getrusage)."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2**20
+    except ImportError:
+        pass
+    if os.path.exists("/proc/self/statm"):
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def abrir_sessao() -> AppTest:
+    """Nova sessão que visita todas as páginas, como um operador no início do turno."""
+    sessao = AppTest.from_file(str(DASHBOARD_PATH), default_timeout=120)
+    sessao.run()
+    for pagina in PAGINAS:
+        sessao.session_state.page = pagina
+        sessao.run()
+        if sessao.exception:
+            raise RuntimeError(f"Página {pagina} falhou: {sessao.exception[0].value}")
+    return sessao
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessoes", type=int, default=10, help="quantidade de sessões simultâneas")
+    args = parser.parse_args()
+
+    os.chdir(BASE_DIR)  # o dashboard usa caminhos relativos
+    os.environ.setdefault("NOC_AQUECER", "0")
+
+    sessoes = []
+    medidas = [memoria_residente_mb()]
+    print(f"{'Sessões':>8} {'RSS (MB)':>10} {'Delta (MB)':>11}")
+    for n in range(1, args.sessoes + 1):
+        sessoes.append(abrir_sessao())
+        medidas.append(memoria_residente_mb())
+        print(f"{n:>8} {medidas[-1]:>10.1f} {medidas[-1] - medidas[-2]:>11.1f}")
+
+    # A primeira sessão paga a carga dos dados; as demais só o estado próprio
+    if len(sessoes) > 1:
+        media = (medidas[-1] - medidas[1]) / (len(sessoes) - 1)
+        print(f"\nMédia por sessão adicional (após a primeira): {media:.2f} MB")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
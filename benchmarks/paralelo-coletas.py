@@ -0,0 +1,148 @@
+"""
+Escalonamento do trabalho por empresa (noc/paralelo.py) de 1 a N processos.
+Gera (ou reaproveita) um banco sintético com uma tabela horária
+__<Empresa>_input_Acionamentos por empresa e o agregado cumulativo do checklist,
+e mede a mediana de várias execuções de cada carga com 1, 2, 4, ... workers:
+
+- hora: pivot por hora de cada empresa (mesma consulta do coleta-hora.py);
+- checklist: leitura do cumulativo de hoje e de ontem por empresa × layout.
+
+Uso: python benchmarks/paralelo-coletas.py --empresas 200 --dias 120 --workers 8
+"""
+
+import argparse
+import logging
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from noc import agregados, paralelo
+
+logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+
+BANCO_PADRAO = Path(__file__).resolve().parent / "paralelo_sintetico.sqlite"
+LAYOUTS = ["Acionamentos", "Carteira", "Tempos"]
+HORAS = [f"{h:02d}:00" for h in range(8, 20)]
+
+
+def gerar_banco(caminho: Path, empresas: int, dias: int) -> date:
+    """Cria as tabelas horárias e o cumulativo sintéticos; retorna a última data."""
+    inicio = date(2024, 1, 1)
+    datas = [(inicio + timedelta(days=d)).isoformat() for d in range(dias)]
+    caminho.unlink(missing_ok=True)
+    conn = sqlite3.connect(caminho)
+    conn.executescript("""
+        PRAGMA journal_mode = OFF;
+        PRAGMA synchronous = OFF;
+        CREATE TABLE Dim_Layout (IdLayout INTEGER PRIMARY KEY, Nome TEXT NOT NULL UNIQUE, Grupo TEXT NOT NULL);
+        CREATE TABLE Auditoria_Cumulativo_Diario (
+            IdCompany INTEGER NOT NULL, IdLayout INTEGER NOT NULL, dtDataReferencia DATE NOT NULL,
+            Qtd INTEGER NOT NULL, Cumulativo INTEGER NOT NULL,
+            PRIMARY KEY (IdCompany, IdLayout, dtDataReferencia)) WITHOUT ROWID;
+    """)
+    conn.executemany("INSERT INTO Dim_Layout VALUES (?, ?, 'Demais')", list(enumerate(LAYOUTS, 1)))
+    for i in range(1, empresas + 1):
+        conn.execute(f"""
+            CREATE TABLE __Empresa_{i}_input_Acionamentos (
+                Id INTEGER PRIMARY KEY AUTOINCREMENT, dtDataReferencia DATE NOT NULL,
+                hrHoraInicio TEXT NOT NULL, Qtde INTEGER NOT NULL)
+        """)
+        conn.executemany(
+            f"INSERT INTO __Empresa_{i}_input_Acionamentos (dtDataReferencia, hrHoraInicio, Qtde) VALUES (?, ?, ?)",
+            [(dia, hora, random.randint(0, 100)) for dia in datas for hora in HORAS for _ in range(3)]
+        )
+        for id_layout in range(1, len(LAYOUTS) + 1):
+            cumulativo = 0
+            linhas = []
+            for dia in datas:
+                qtd = random.randint(0, 20)
+                cumulativo += qtd
+                linhas.append((i, id_layout, dia, qtd, cumulativo))
+            conn.executemany("INSERT INTO Auditoria_Cumulativo_Diario VALUES (?, ?, ?, ?, ?)", linhas)
+    conn.commit()
+    conn.close()
+    logging.info(f"Banco sintético criado: {caminho} ({empresas} empresas, {dias} dias)")
+    return date.fromisoformat(datas[-1])
+
+# ==========================
+# Cargas (nível de módulo: enviadas aos processos por pickle)
+# ==========================
+
+def carga_hora(lote: list[int], banco: Path, desde: str) -> pd.DataFrame:
+    conn = paralelo.conexao(banco)
+    dados = []
+    for i in lote:
+        df = pd.read_sql(f"""
+            SELECT hrHoraInicio AS Hora, SUM(Qtde) AS Qtde
+            FROM __Empresa_{i}_input_Acionamentos
+            WHERE dtDataReferencia >= ?
+            GROUP BY hrHoraInicio
+        """, conn, params=(desde,))
+        df = df.pivot_table(index=None, columns="Hora", values="Qtde", fill_value=0)
+        df.insert(0, "Empresa", f"Empresa_{i}")
+        dados.append(df)
+    return pd.concat(dados, ignore_index=True)
+
+
+def carga_checklist(lote: list[int], banco: Path, hoje: str, ontem: str) -> pd.DataFrame:
+    conn = paralelo.conexao(banco)
+    return pd.DataFrame([
+        (i, layout, agregados.cumulativo_ate(conn, i, layout, ontem), agregados.cumulativo_ate(conn, i, layout, hoje))
+        for i in lote for layout in LAYOUTS
+    ], columns=["IdCompany", "Layout", "Qnt_Ontem", "Qnt_Hoje"])
+
+
+def medir(carga, empresas: list[int], workers: int, repeticoes: int, *args) -> float:
+    """Mediana (ms) de distribuir(carga) com 'workers' processos (inclui a criação do pool)."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        paralelo.distribuir(carga, empresas, workers, *args)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--empresas", type=int, default=200)
+    parser.add_argument("--dias", type=int, default=120)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="maior quantidade de processos medida")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--banco", type=Path, default=BANCO_PADRAO, help="reaproveita o banco se já existir")
+    args = parser.parse_args()
+
+    if args.banco.exists():
+        with sqlite3.connect(args.banco) as conn:
+            fim = date.fromisoformat(conn.execute("SELECT MAX(dtDataReferencia) FROM Auditoria_Cumulativo_Diario").fetchone()[0])
+            empresas = conn.execute("SELECT COUNT(DISTINCT IdCompany) FROM Auditoria_Cumulativo_Diario").fetchone()[0]
+    else:
+        fim = gerar_banco(args.banco, args.empresas, args.dias)
+        empresas = args.empresas
+
+    # Permite medir acima do número de núcleos (o padrão dos coletores limita a os.cpu_count())
+    paralelo.WORKERS_MAXIMO = max(args.workers, 1)
+    ids = list(range(1, empresas + 1))
+    hoje, ontem = fim.isoformat(), (fim - timedelta(days=1)).isoformat()
+    desde = (fim - timedelta(days=30)).isoformat()
+
+    niveis = sorted({1, *(2 ** k for k in range(1, args.workers.bit_length()) if 2 ** k <= args.workers), args.workers})
+    print(f"\n{'workers':>7} {'hora (ms)':>11} {'ganho':>7} {'checklist (ms)':>15} {'ganho':>7}")
+    base = None
+    for workers in niveis:
+        hora = medir(carga_hora, ids, workers, args.repeticoes, args.banco, desde)
+        checklist = medir(carga_checklist, ids, workers, args.repeticoes, args.banco, hoje, ontem)
+        base = base or (hora, checklist)
+        print(f"{workers:>7} {hora:>11.1f} {base[0] / hora:>6.2f}x {checklist:>15.1f} {base[1] / checklist:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Pivot diário (assessoria × layout por data) nos backends SQLite e DuckDB.
+Gera (ou reaproveita) um banco SQLite sintético só com as dimensões e o
+agregado Consolidado_Diario, com muitas empresas e um histórico longo, e mede
+a mediana de várias execuções de pivot_diario em cada backend (a sincronização
+inicial da réplica DuckDB é medida à parte). Os motores são medidos com o
+cache de resultados desligado; a coluna "cache" mede o acerto no cache
+persistente (noc/resultados.py) depois de aquecido. Antes da tabela, confere que
+as leituras com tabelas_cache (shards.Roteador.consultar, usada pelo histórico
+horário do dashboard) devolvem o mesmo que a leitura direta, frias e aquecidas,
+e que uma gravação em outra tabela do arquivo não invalida o resultado.
+
+Uso: python benchmarks/pivot-backends.py --empresas 500 --dias 730 --repeticoes 5
+"""
+
+import argparse
+import logging
+import random
+import sqlite3
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pandas as pd
+
+from noc import armazenamento, shards
+from noc.dimensoes import GRUPO_CONSORCIO, GRUPO_DEMAIS
+
+logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+
+BANCO_PADRAO = Path(__file__).resolve().parent / "pivot_sintetico.sqlite"
+LAYOUTS = [("Acionamentos", GRUPO_DEMAIS), ("Carteira", GRUPO_DEMAIS), ("Tempos", GRUPO_DEMAIS),
+           ("Consorcio", GRUPO_CONSORCIO)]
+
+
+def gerar_banco(caminho: Path, empresas: int, dias: int) -> date:
+    """Cria dimensões e Consolidado_Diario sintéticos; retorna a última data."""
+    inicio = date(2020, 1, 1)
+    caminho.unlink(missing_ok=True)
+    caminho.with_suffix(".duckdb").unlink(missing_ok=True)
+    conn = sqlite3.connect(caminho)
+    conn.executescript("""
+        PRAGMA journal_mode = OFF;
+        PRAGMA synchronous = OFF;
+        CREATE TABLE Dim_Empresa (IdEmpresa INTEGER PRIMARY KEY, Nome TEXT NOT NULL UNIQUE,
+                                  IdCompany INTEGER, Grupo TEXT NOT NULL);
+        CREATE TABLE Dim_Layout (IdLayout INTEGER PRIMARY KEY, Nome TEXT NOT NULL UNIQUE, Grupo TEXT NOT NULL);
+        CREATE TABLE Consolidado_Diario (
+            dtDataReferencia DATE NOT NULL, IdLayout INTEGER NOT NULL, IdEmpresa INTEGER NOT NULL,
+            Qtd INTEGER NOT NULL, PRIMARY KEY (dtDataReferencia, IdLayout, IdEmpresa)) WITHOUT ROWID;
+    """)
+    conn.executemany("INSERT INTO Dim_Layout (IdLayout, Nome, Grupo) VALUES (?, ?, ?)",
+                     [(i, nome, grupo) for i, (nome, grupo) in enumerate(LAYOUTS, 1)])
+    # Um décimo das empresas no consórcio, como na proporção atual
+    conn.executemany("INSERT INTO Dim_Empresa (IdEmpresa, Nome, IdCompany, Grupo) VALUES (?, ?, ?, ?)",
+                     [(i, f"Empresa_{i}", i, GRUPO_CONSORCIO if i % 10 == 0 else GRUPO_DEMAIS)
+                      for i in range(1, empresas + 1)])
+    for d in range(dias):
+        dia = (inicio + timedelta(days=d)).isoformat()
+        conn.executemany(
+            "INSERT INTO Consolidado_Diario VALUES (?, ?, ?, ?)",
+            [(dia, id_layout, id_empresa, random.randint(0, 50))
+             for id_empresa in range(1, empresas + 1)
+             for id_layout in ((4,) if id_empresa % 10 == 0 else (1, 2, 3))]
+        )
+    conn.commit()
+    total = conn.execute("SELECT COUNT(*) FROM Consolidado_Diario").fetchone()[0]
+    conn.close()
+    logging.info(f"Banco sintético: {total:,} linhas em Consolidado_Diario, {caminho.stat().st_size / 2**20:.0f} MB")
+    return inicio + timedelta(days=dias - 1)
+
+
+def medir(banco: armazenamento.Armazenamento, consultas: dict, repeticoes: int) -> dict[str, float]:
+    resultados = {}
+    for nome, filtros in consultas.items():
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            banco.pivot_diario(**filtros)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        resultados[nome] = statistics.median(tempos)
+    return resultados
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--empresas", type=int, default=500)
+    parser.add_argument("--dias", type=int, default=730)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--banco", type=Path, default=BANCO_PADRAO, help="reaproveita o banco se já existir")
+    args = parser.parse_args()
+
+    if args.banco.exists():
+        with sqlite3.connect(args.banco) as conn:
+            fim = date.fromisoformat(conn.execute("SELECT MAX(dtDataReferencia) FROM Consolidado_Diario").fetchone()[0])
+    else:
+        fim = gerar_banco(args.banco, args.empresas, args.dias)
+
+    # Mesmos filtros usados por coleta-bancaria (7 dias) e coleta-consorcio (histórico inteiro)
+    consultas = {
+        "bancaria (7 dias)": {"data_inicio": (fim - timedelta(days=6)).isoformat(), "data_fim": fim.isoformat(),
+                              "grupo_layout": GRUPO_DEMAIS},
+        "bancaria (90 dias)": {"data_inicio": (fim - timedelta(days=89)).isoformat(), "data_fim": fim.isoformat(),
+                               "grupo_layout": GRUPO_DEMAIS},
+        "consorcio (tudo)": {"grupo_empresa": GRUPO_CONSORCIO},
+    }
+
+    cache = armazenamento.resultados.CACHE
+    limite = cache.limite_bytes
+    cache.limite_bytes = 0
+
+    resultados = {}
+    for backend in armazenamento.BACKENDS:
+        inicio = time.perf_counter()
+        try:
+            banco = armazenamento.abrir(backend, args.banco)
+            banco.consultar("SELECT 1")
+        except ImportError:
+            logging.warning(f"Backend {backend} indisponível (pip install {backend}); ignorado.")
+            continue
+        logging.info(f"{backend}: abertura/sincronização em {(time.perf_counter() - inicio) * 1000:.0f} ms")
+        with banco:
+            resultados[backend] = medir(banco, consultas, args.repeticoes)
+
+    cache.caminho = args.banco.with_name(f"{args.banco.stem}_cache.sqlite")
+    cache.limite_bytes = limite
+    with armazenamento.abrir("sqlite", args.banco) as banco:
+        medir(banco, consultas, 1)
+        resultados["cache"] = medir(banco, consultas, args.repeticoes)
+
+    roteador = shards.roteador(args.banco)
+    sql = "SELECT IdEmpresa, COUNT(*) AS Linhas, SUM(Qtd) AS Qtd FROM Consolidado_Diario GROUP BY IdEmpresa"
+    direto = roteador.consultar(sql)
+    for _ in range(2):
+        pd.testing.assert_frame_equal(roteador.consultar(sql, tabelas_cache=["Consolidado_Diario"]), direto)
+
+    calculos = []
+    def calcular():
+        calculos.append(1)
+        return direto
+    fontes = {args.banco: ["Consolidado_Diario"]}
+    cache.obter(sql, (), fontes, calcular)
+    with sqlite3.connect(args.banco) as conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS Rascunho_Benchmark (x)")
+        conn.execute("INSERT INTO Rascunho_Benchmark VALUES (1)")
+    antes = len(calculos)
+    cache.obter(sql, (), fontes, calcular)
+    with sqlite3.connect(args.banco) as conn:
+        conn.execute("DROP TABLE Rascunho_Benchmark")
+    assert len(calculos) == antes, "gravação em outra tabela invalidou o resultado"
+    logging.info("Cache de resultados confere com a leitura direta e ignora gravações em outras tabelas.")
+
+    print(f"\n{'Consulta':<22}" + "".join(f"{b + ' (ms)':>15}" for b in resultados))
+    for nome in consultas:
+        print(f"{nome:<22}" + "".join(f"{r[nome]:>15.1f}" for r in resultados.values()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Latência das consultas dos coletores com e sem memory-map no SQLite.
+Gera (ou reaproveita) um banco sintético grande com o mesmo esquema de
+__Consolidado_Hist e Auditoria_LayoutNew e mede, para cada consulta típica dos
+coletores, a mediana de várias execuções com mmap_size=0 e com mmap ligado.
+
+Uso: python benchmarks/sqlite-mmap.py --linhas 5000000 --repeticoes 5
+"""
+
+import argparse
+import logging
+import random
+import sqlite3
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from noc.conexao import conectar_leitura
+
+logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
+
+BANCO_PADRAO = Path(__file__).resolve().parent / "banco_sintetico.sqlite"
+LAYOUTS = ["Acionamentos", "Carteira", "Tempos", "Consorcio"]
+MMAP_LIGADO = 4 << 30
+
+# Consultas equivalentes às de coleta-bancaria, coleta-consorcio e coleta-checklist
+CONSULTAS = {
+    "bancaria (7 dias, 1 layout)": (
+        "SELECT * FROM __Consolidado_Hist WHERE dtDataReferencia >= ? AND dtDataReferencia <= ? AND Layout = ?",
+        lambda fim: ((fim - timedelta(days=7)).isoformat(), fim.isoformat(), "Carteira"),
+    ),
+    "consorcio (IN empresas)": (
+        "SELECT * FROM __Consolidado_Hist WHERE dsNomeAssessoria IN ('Empresa_A','Empresa_B','Empresa_C','Empresa_D')",
+        lambda fim: (),
+    ),
+    "checklist (COUNT cumulativo)": (
+        "SELECT COUNT(*) FROM Auditoria_LayoutNew WHERE IdCompany = ? AND layout = ? AND dtDataReferencia <= ?",
+        lambda fim: (7, "Tempos", fim.isoformat()),
+    ),
+}
+
+
+def gerar_banco(caminho: Path, linhas: int) -> date:
+    """Cria o banco sintético com 'linhas' registros em cada tabela; retorna a última data."""
+    empresas = [f"Empresa_{i}" for i in range(1, 201)] + ["Empresa_A", "Empresa_B", "Empresa_C", "Empresa_D"]
+    por_dia = len(empresas) * len(LAYOUTS)
+    dias = max(1, linhas // por_dia)
+    inicio = date(2020, 1, 1)
+    fim = inicio + timedelta(days=dias - 1)
+
+    caminho.unlink(missing_ok=True)
+    conn = sqlite3.connect(caminho)
+    conn.executescript("""
+        PRAGMA journal_mode = OFF;
+        PRAGMA synchronous = OFF;
+        CREATE TABLE __Consolidado_Hist (
+            Id INTEGER PRIMARY KEY AUTOINCREMENT, dtDataReferencia DATE NOT NULL,
+            dsNomeAssessoria TEXT NOT NULL, IdCompany INTEGER NOT NULL, Qtd INTEGER NOT NULL,
+            Layout TEXT NOT NULL, Data_Coleta DATE NOT NULL);
+        CREATE TABLE Auditoria_LayoutNew (
+            Id INTEGER PRIMARY KEY AUTOINCREMENT, IdCompany INTEGER NOT NULL,
+            Layout TEXT NOT NULL, dtDataReferencia DATE NOT NULL);
+    """)
+    for d in range(dias):
+        dia = (inicio + timedelta(days=d)).isoformat()
+        conn.executemany(
+            "INSERT INTO __Consolidado_Hist (dtDataReferencia, dsNomeAssessoria, IdCompany, Qtd, Layout, Data_Coleta) VALUES (?, ?, ?, ?, ?, ?)",
+            [(dia, e, i, random.randint(0, 50), l, dia) for i, e in enumerate(empresas, 1) for l in LAYOUTS]
+        )
+        conn.executemany(
+            "INSERT INTO Auditoria_LayoutNew (IdCompany, Layout, dtDataReferencia) VALUES (?, ?, ?)",
+            [(i, l, dia) for i in range(1, len(empresas) + 1) for l in LAYOUTS]
+        )
+    conn.commit()
+    conn.close()
+    logging.info(f"Banco sintético: {dias * por_dia:,} linhas por tabela, {caminho.stat().st_size / 2**20:.0f} MB")
+    return fim
+
+
+def medir(caminho: Path, mmap_size: int, repeticoes: int, fim: date) -> dict[str, float]:
+    """Mediana (ms) de cada consulta; a primeira execução aquece o cache do SO e é descartada."""
+    resultados = {}
+    with conectar_leitura(caminho, imutavel=True, mmap_size=mmap_size) as conn:
+        for nome, (sql, parametros) in CONSULTAS.items():
+            conn.execute(sql, parametros(fim)).fetchall()
+            tempos = []
+            for _ in range(repeticoes):
+                inicio = time.perf_counter()
+                conn.execute(sql, parametros(fim)).fetchall()
+                tempos.append((time.perf_counter() - inicio) * 1000)
+            resultados[nome] = statistics.median(tempos)
+    return resultados
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--linhas", type=int, default=5_000_000, help="linhas por tabela no banco sintético")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--banco", type=Path, default=BANCO_PADRAO, help="reaproveita o banco se já existir")
+    args = parser.parse_args()
+
+    if args.banco.exists():
+        with sqlite3.connect(args.banco) as conn:
+            fim = date.fromisoformat(conn.execute("SELECT MAX(dtDataReferencia) FROM __Consolidado_Hist").fetchone()[0])
+    else:
+        fim = gerar_banco(args.banco, args.linhas)
+
+    sem_mmap = medir(args.banco, 0, args.repeticoes, fim)
+    com_mmap = medir(args.banco, MMAP_LIGADO, args.repeticoes, fim)
+
+    print(f"\n{'Consulta':<32} {'sem mmap (ms)':>14} {'com mmap (ms)':>14} {'ganho':>7}")
+    for nome in CONSULTAS:
+        print(f"{nome:<32} {sem_mmap[nome]:>14.1f} {com_mmap[nome]:>14.1f} {sem_mmap[nome] / com_mmap[nome]:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
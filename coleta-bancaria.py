@@ -3,14 +3,17 @@ Coleta e pivotagem de dados de layouts de auditoria usando SQLite local existent
 Extrai dados do banco 'banco_exp.sqlite' e gera Excel de pivotagem.
 """
 
+import argparse
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from datetime import datetime, timedelta
-from typing import List
+from datetime import date, datetime, timedelta
 import pandas as pd
-import sqlite3
 import sys
 
+from noc import armazenamento, assinaturas, dimensoes, kpis
+from noc.exportacao import exportar_dataframe, publicar_arrow
+
 # ==========================
 # Configurações iniciais
 # ==========================
@@ -24,77 +27,87 @@ BASE_DIR = Path(getattr(sys, "_MEIPASS", Path(__file__).parent))
 PASTA_RELATORIOS: Path = BASE_DIR / "Relatorios_validacao"
 PASTA_RELATORIOS.mkdir(exist_ok=True)
 CAMINHO_EXCEL: Path = PASTA_RELATORIOS / "tabela_bancaria_coleta.xlsx"
+REGISTRO_ASSINATURA: Path = CAMINHO_EXCEL.with_suffix(".assinatura.json")
 
 # Banco SQLite existente
 DB_PATH = BASE_DIR / "banco_exp.sqlite"
 
-# Layouts e empresas fictícias
-LAYOUTS: List[str] = ["Acionamentos", "Carteira", "Tempos"]
-
 # ==========================
 # Funções auxiliares
 # ==========================
 
-def obter_datas_referencia(dias: int = 7) -> tuple[str, str]:
-    """Retorna data de início e fim para filtro (últimos 'dias' dias, exceto hoje)."""
-    hoje = datetime.now()
+def obter_datas_referencia(dias: int = 7, hoje: date | None = None) -> tuple[str, str]:
+    """Retorna data de início e fim para filtro (últimos 'dias' dias, exceto hoje ou a data informada)."""
+    hoje = hoje or datetime.now()
     data_inicio = (hoje - timedelta(days=dias)).strftime('%Y-%m-%d')
     data_fim = (hoje - timedelta(days=1)).strftime('%Y-%m-%d')
     logging.info(f"Período de análise: {data_inicio} até {data_fim}")
     return data_inicio, data_fim
 
-def extrair_dados_sqlite(layouts: List[str], data_inicio: str, data_fim: str) -> pd.DataFrame:
-    """Extrai dados do banco SQLite existente para os layouts e período especificados."""
-    df_final = pd.DataFrame()
-    with sqlite3.connect(DB_PATH) as conn:
-        for layout in layouts:
-            query = f"""
-                SELECT *
-                FROM __Consolidado_Hist
-                WHERE dtDataReferencia >= '{data_inicio}'
-                  AND dtDataReferencia <= '{data_fim}'
-                  AND Layout = '{layout}'
-            """
-            df_layout = pd.read_sql(query, conn)
-            df_final = pd.concat([df_final, df_layout], ignore_index=True)
-    logging.info(f"{len(df_final)} registros extraídos do SQLite.")
-    return df_final
-
-def processar_pivot(df: pd.DataFrame) -> pd.DataFrame:
-    """Cria pivot table: linhas = Empresa, Layout; colunas = dtDataReferencia; valores = Qtd."""
-    if df.empty:
-        logging.warning("DataFrame vazio. Nenhum dado para processar.")
-        return df
-    tabela = df.pivot_table(
-        index=["dsNomeAssessoria", "Layout"],
-        columns="dtDataReferencia",
-        values="Qtd",
-        aggfunc="sum"
-    ).fillna(0).astype(int)
-    tabela_reset = tabela.reset_index()
-    logging.info("Pivot realizado com sucesso.")
-    return tabela_reset
+def extrair_pivot(data_inicio: str, data_fim: str) -> pd.DataFrame:
+    """
+    Pivot dos layouts não consórcio no período: linhas = Empresa, Layout;
+    colunas = dtDataReferencia; valores = Qtd. Feito pelo backend configurado (NOC_BACKEND).
+    """
+    with armazenamento.abrir(caminho=DB_PATH) as banco:
+        tabela = banco.pivot_diario(data_inicio, data_fim, grupo_layout=dimensoes.GRUPO_DEMAIS)
+    logging.info(f"Pivot realizado no backend {banco.nome}: {len(tabela)} linhas.")
+    return tabela
 
 def salvar_excel(df: pd.DataFrame, caminho: Path) -> None:
     """Salva DataFrame em Excel, caso não esteja vazio."""
     if df.empty:
         logging.warning("DataFrame vazio. Nenhum arquivo gerado.")
         return
-    df.to_excel(caminho, index=False)
+    exportar_dataframe(caminho, df)
     logging.info(f"Tabela salva em: {caminho}")
+    publicar_arrow(caminho, df)
+
+def caminho_periodo(referencia: date) -> Path:
+    """Excel de uma data reprocessada (o relatório do dia continua em CAMINHO_EXCEL)."""
+    return CAMINHO_EXCEL.with_name(f"{CAMINHO_EXCEL.stem}_{referencia.isoformat()}.xlsx")
+
+def gerar_periodo(datas: list[date], dias: int = 7) -> None:
+    """
+    Reprocessa o relatório como se tivesse sido gerado em cada uma das datas:
+    uma única leitura cobre as janelas de todas elas, e os Excel são gravados em paralelo.
+    """
+    inicio = (min(datas) - timedelta(days=dias)).isoformat()
+    fim = (max(datas) - timedelta(days=1)).isoformat()
+    with armazenamento.abrir(caminho=DB_PATH) as banco:
+        dados = banco.consolidado(inicio, fim, grupo_layout=dimensoes.GRUPO_DEMAIS)
+
+    tabelas = {}
+    for referencia in datas:
+        data_inicio, data_fim = obter_datas_referencia(dias, referencia)
+        janela = dados[dados["dtDataReferencia"].between(data_inicio, data_fim)]
+        tabelas[caminho_periodo(referencia)] = armazenamento.pivotar(janela)
+
+    with ThreadPoolExecutor() as executor:
+        list(executor.map(salvar_excel, tabelas.values(), tabelas.keys()))
 
 # ==========================
 # Fluxo principal
 # ==========================
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pivotagem de layouts gerais.")
+    parser.add_argument("--force", action="store_true", help="refaz mesmo sem mudanças nas fontes")
+    args = parser.parse_args(argv)
+
     data_inicio, data_fim = obter_datas_referencia()
-    df = extrair_dados_sqlite(LAYOUTS, data_inicio, data_fim)
-    if df.empty:
+    assinatura = assinaturas.calcular(DB_PATH, dimensoes.TABELAS, ["__Consolidado_Hist"],
+                                      data_inicio=data_inicio, data_fim=data_fim)
+    if assinaturas.pular(REGISTRO_ASSINATURA, assinatura, [CAMINHO_EXCEL], args.force):
+        return
+
+    tabela_final = extrair_pivot(data_inicio, data_fim)
+    if tabela_final.empty:
         logging.info("Nenhum dado retornado. Encerrando script.")
         return
-    tabela_final = processar_pivot(df)
     salvar_excel(tabela_final, CAMINHO_EXCEL)
+    kpis.registrar_zeros("Coletas", tabela_final)
+    assinaturas.gravar(REGISTRO_ASSINATURA, assinatura)
 
 if __name__ == "__main__":
     main()
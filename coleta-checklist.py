@@ -3,13 +3,20 @@ Checklist diário de auditoria usando SQLite local existente.
 Extrai dados do banco centralizado e gera relatórios diários e cumulativos.
 """
 
+import argparse
 import logging
+import operator
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import pandas as pd
 import sqlite3
 import sys
 
+from noc import agregados, assinaturas, dimensoes, historico, kpis, paralelo
+from noc.conexao import conectar_leitura
+from noc.exportacao import FORMATO_CABECALHO, exportar_excel, linhas_dataframe
+
 # ==========================
 # Configurações iniciais
 # ==========================
@@ -21,12 +28,7 @@ BASE_DIR = Path(getattr(sys, "_MEIPASS", Path(__file__).parent))
 
 PASTA_RELATORIOS = BASE_DIR / "Relatorios_Checklist"
 PASTA_RELATORIOS.mkdir(exist_ok=True)
-HISTORICO_PATH = PASTA_RELATORIOS / "historico_checklist.xlsx"
-
-# Layouts e empresas fictícias
-LAYOUTS = ["Acionamentos", "Carteira", "Tempos"]
-EMPRESAS = ['Empresa_1','Empresa_2','Empresa_3','Empresa_4','Empresa_5','Empresa_6',
-            'Empresa_7','Empresa_8','Empresa_9','Empresa_10','Empresa_11','Empresa_12']
+REGISTRO_ASSINATURA = PASTA_RELATORIOS / "checklist.assinatura.json"
 
 # Banco SQLite existente
 DB_PATH = BASE_DIR / "banco_exp.sqlite"
@@ -43,139 +45,209 @@ def obter_data_util_anterior() -> datetime:
     return data
 
 
-def montar_checklist(conn: sqlite3.Connection, data_sql: str, data_sql_ontem: str) -> pd.DataFrame:
-    """Gera DataFrame do checklist diário e cumulativo a partir de tabelas existentes."""
+def carregar_diferencas(conn: sqlite3.Connection, data_inicio: str, data_fim: str) -> dict[tuple[str, int, str], str]:
+    """
+    Última diferença registrada por (data, empresa, layout) no período, numa
+    única leitura de input_Auditoria em vez de uma consulta por empresa × layout.
+    """
+    linhas = conn.execute("""
+        SELECT dtDataReferenciaEPS, idCompanyDeep, LayoutDeep, diferenca
+        FROM input_Auditoria
+        WHERE dtDataReferenciaEPS BETWEEN ? AND ?
+        ORDER BY DeepInsert, Id
+    """, (data_inicio, data_fim))
+    return {(data, empresa_id, layout): diferenca for data, empresa_id, layout, diferenca in linhas}
+
+
+def checklist_empresas(empresas: list[tuple[int, str]], layouts: list[str], datas: list[tuple[str, str]],
+                       diferencas: dict[tuple[str, int, str], str],
+                       cumulativos: dict[tuple[str, int, str], int]) -> pd.DataFrame:
+    """
+    Linhas do checklist diário e cumulativo de um lote de empresas em cada
+    (data, dia anterior) de 'datas' (executado em um worker).
+    """
     checklist = []
-    cursor = conn.cursor()
-
-    for empresa_id, empresa_nome in enumerate(EMPRESAS, start=1):
-        for layout in LAYOUTS:
-            # Verifica status diário
-            cursor.execute("""
-                SELECT diferenca
-                FROM input_Auditoria
-                WHERE dtDataReferenciaEPS = ?
-                  AND idCompanyDeep = ?
-                  AND LayoutDeep = ?
-                ORDER BY DeepInsert DESC
-                LIMIT 1
-            """, (data_sql, empresa_id, layout))
-            row = cursor.fetchone()
-            if row:
-                status_input = "OK"
-                status_hoje = "OK"
-                diferenca = row[0]
-                obs_input = "Dados encontrados"
-            else:
-                status_input = "VALIDAR"
-                status_hoje = "VALIDAR"
-                diferenca = "Igual"
-                obs_input = f"Nenhum dado em {data_sql}"
-
-            # Cumulativo
-            cursor.execute("""
-                SELECT COUNT(*) FROM Auditoria_LayoutNew
-                WHERE IdCompany = ? AND layout = ? AND dtDataReferencia <= ?
-            """, (empresa_id, layout, data_sql))
-            cumulativo_hoje = cursor.fetchone()[0]
-
-            cursor.execute("""
-                SELECT COUNT(*) FROM Auditoria_LayoutNew
-                WHERE IdCompany = ? AND layout = ? AND dtDataReferencia <= ?
-            """, (empresa_id, layout, data_sql_ontem))
-            cumulativo_ontem = cursor.fetchone()[0]
-
-            if cumulativo_hoje == 0:
-                status_cum = "VALIDAR"
-                obs_cum = "Nenhum dado cumulativo na data referência"
-            elif cumulativo_hoje > cumulativo_ontem:
-                status_cum = "OK"
-                obs_cum = f"Crescimento cumulativo: {cumulativo_ontem} -> {cumulativo_hoje}"
-            else:
-                status_cum = "VALIDAR"
-                obs_cum = f"Sem crescimento cumulativo: {cumulativo_ontem} -> {cumulativo_hoje}"
-
-            checklist.append({
-                "Data_Referencia": data_sql,
-                "Empresa": empresa_nome,
-                "Layout": layout,
-                "Obs Check Diario": obs_input,
-                "Check Diario": status_hoje,
-                "Obs Vol Cumulativa": obs_cum,
-                "Qnt_Ontem": cumulativo_ontem,
-                "Qnt_Hoje": cumulativo_hoje,
-                "Diferenca": diferenca,
-                "Check Vol Cumulativa": status_cum
-            })
-
-    df_checklist = pd.DataFrame(checklist)
-    logging.info(f"Checklist diário gerado com {len(df_checklist)} registros.")
-    return df_checklist
-
-
-def atualizar_historico(df_dia: pd.DataFrame) -> pd.DataFrame:
-    """Atualiza histórico em Excel, removendo duplicados do dia."""
-    colunas_cumulativo = [
-        "Data_Referencia", "Empresa", "Layout", "Obs Check Diario",
-        "Check Diario", "Obs Vol Cumulativa", "Qnt_Ontem",
-        "Qnt_Hoje", "Diferenca", "Check Vol Cumulativa"
-    ]
-    df_dia_filtrado = df_dia[colunas_cumulativo].copy()
-
-    if HISTORICO_PATH.exists():
-        df_hist = pd.read_excel(HISTORICO_PATH)
-        df_hist = df_hist[df_hist['Data_Referencia'] != df_dia_filtrado['Data_Referencia'].iloc[0]]
-        df_hist = pd.concat([df_hist, df_dia_filtrado], ignore_index=True)
-    else:
-        df_hist = df_dia_filtrado.copy()
-
-    df_hist.to_excel(HISTORICO_PATH, index=False)
-    logging.info(f"Histórico atualizado: {HISTORICO_PATH}")
-    return df_hist
-
-
-def gerar_relatorios(df_dia: pd.DataFrame, data_nome_arquivo: str) -> None:
-    """Gera relatórios diários e cumulativos formatados em Excel."""
+
+    for data_sql, data_sql_ontem in datas:
+        for empresa_id, empresa_nome in empresas:
+            for layout in layouts:
+                # Verifica status diário
+                registrada = diferencas.get((data_sql, empresa_id, layout))
+                if registrada is not None:
+                    status_input = "OK"
+                    status_hoje = "OK"
+                    diferenca = registrada
+                    obs_input = "Dados encontrados"
+                else:
+                    status_input = "VALIDAR"
+                    status_hoje = "VALIDAR"
+                    diferenca = "Igual"
+                    obs_input = f"Nenhum dado em {data_sql}"
+
+                # Cumulativo: já lido para todas as datas do período
+                cumulativo_hoje = cumulativos.get((data_sql, empresa_id, layout), 0)
+                cumulativo_ontem = cumulativos.get((data_sql_ontem, empresa_id, layout), 0)
+
+                if cumulativo_hoje == 0:
+                    status_cum = "VALIDAR"
+                    obs_cum = "Nenhum dado cumulativo na data referência"
+                elif cumulativo_hoje > cumulativo_ontem:
+                    status_cum = "OK"
+                    obs_cum = f"Crescimento cumulativo: {cumulativo_ontem} -> {cumulativo_hoje}"
+                else:
+                    status_cum = "VALIDAR"
+                    obs_cum = f"Sem crescimento cumulativo: {cumulativo_ontem} -> {cumulativo_hoje}"
+
+                checklist.append({
+                    "Data_Referencia": data_sql,
+                    "Empresa": empresa_nome,
+                    "Layout": layout,
+                    "Obs Check Diario": obs_input,
+                    "Check Diario": status_hoje,
+                    "Obs Vol Cumulativa": obs_cum,
+                    "Qnt_Ontem": cumulativo_ontem,
+                    "Qnt_Hoje": cumulativo_hoje,
+                    "Diferenca": diferenca,
+                    "Check Vol Cumulativa": status_cum
+                })
+
+    return pd.DataFrame(checklist)
+
+
+def montar_periodo(conn: sqlite3.Connection, datas: list[tuple[str, str]], workers: int = 1) -> dict[str, pd.DataFrame]:
+    """
+    Checklist de cada (data, dia anterior) de 'datas', com as empresas divididas
+    entre 'workers' processos numa única distribuição para todo o período:
+    diferenças e cumulativos de todas as datas são lidos antes, uma vez cada, e
+    o resultado é separado por data no final.
+    """
+    # Empresas (IdCompany de origem) e layouts vêm das dimensões do banco
+    layouts = dimensoes.layouts(conn, dimensoes.GRUPO_DEMAIS)
+    empresas = dimensoes.empresas(conn, dimensoes.GRUPO_DEMAIS)
+    dias = [data for data, _ in datas]
+    diferencas = carregar_diferencas(conn, min(dias), max(dias))
+    cumulativos = agregados.cumulativos_em(conn, [data for par in datas for data in par])
+    df = paralelo.distribuir(checklist_empresas, empresas, workers, layouts, datas, diferencas, cumulativos)
+    logging.info(f"Checklist gerado com {len(df)} registros para {len(dias)} data(s).")
+    if df.empty:
+        return {data: df for data in dias}
+    # Cada lote traz as datas em sequência: o filtro mantém a ordem das empresas em cada data
+    return {data: df[df["Data_Referencia"] == data].reset_index(drop=True) for data in dias}
+
+
+def montar_checklist(conn: sqlite3.Connection, data_sql: str, data_sql_ontem: str, workers: int = 1) -> pd.DataFrame:
+    """Gera DataFrame do checklist diário e cumulativo de uma data."""
+    return montar_periodo(conn, [(data_sql, data_sql_ontem)], workers)[data_sql]
+
+
+# Colunas de cada saída; o histórico contém todas as demais
+COLUNAS_HISTORICO = historico.COLUNAS
+COLUNAS_CUMULATIVO = [
+    "Data_Referencia", "Empresa", "Layout", "Obs Vol Cumulativa",
+    "Qnt_Ontem", "Qnt_Hoje", "Check Vol Cumulativa"
+]
+COLUNAS_DIARIO = ["Data_Referencia", "Empresa", "Layout", "Obs Check Diario", "Check Diario"]
+
+
+def atualizar_historico(linhas_dia: list[tuple], data_sql: str) -> None:
+    """Grava o dia na partição mensal do histórico, sem reler o restante."""
+    with historico.abrir() as conn:
+        historico.migrar_excel_legado(conn)
+        total = historico.gravar_dia(conn, linhas_dia, data_sql)
+    logging.info(f"Histórico atualizado ({total} linhas em {historico.nome_particao(data_sql)}): {historico.HISTORICO_DB}")
+
+
+def gerar_relatorio(caminho: Path, linhas_dia: list[tuple], colunas: list[str]) -> None:
+    """Projeta as linhas do dia nas colunas do relatório e grava com cabeçalho formatado."""
+    projecao = operator.itemgetter(*(COLUNAS_HISTORICO.index(c) for c in colunas))
+    exportar_excel(caminho, {'Checklist': (colunas, map(projecao, linhas_dia))}, FORMATO_CABECALHO)
+
+
+def gravar_saidas(df_dia: pd.DataFrame, data_sql: str, data_nome_arquivo: str) -> None:
+    """
+    Renderiza histórico, relatório cumulativo e relatório diário a partir do
+    mesmo DataFrame, convertido em linhas uma única vez. As três saídas são
+    independentes e gravadas em paralelo.
+    """
+    linhas_dia = list(linhas_dataframe(df_dia, COLUNAS_HISTORICO))
     relatorio_cumulativo = PASTA_RELATORIOS / f"relatorio_cumulativo_{data_nome_arquivo}.xlsx"
     relatorio_diario = PASTA_RELATORIOS / f"relatorio_diario_{data_nome_arquivo}.xlsx"
 
-    # Relatório cumulativo
-    colunas_cumulativo = [
-        "Data_Referencia", "Empresa", "Layout", "Obs Vol Cumulativa",
-        "Qnt_Ontem", "Qnt_Hoje", "Check Vol Cumulativa"
-    ]
-    with pd.ExcelWriter(relatorio_cumulativo, engine='xlsxwriter') as writer:
-        df_dia.to_excel(writer, sheet_name='Checklist', index=False, columns=colunas_cumulativo)
-        workbook = writer.book
-        worksheet = writer.sheets['Checklist']
-        formato_header = workbook.add_format({'bold': True, 'bg_color': '#D7E4BC'})
-        worksheet.set_row(0, None, formato_header)
-
-    # Relatório diário
-    colunas_diario = ["Data_Referencia", "Empresa", "Layout", "Obs Check Diario", "Check Diario"]
-    with pd.ExcelWriter(relatorio_diario, engine='xlsxwriter') as writer:
-        df_dia.to_excel(writer, sheet_name='Checklist', index=False, columns=colunas_diario)
-        workbook = writer.book
-        worksheet = writer.sheets['Checklist']
-        worksheet.set_row(0, None, formato_header)
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        tarefas = [
+            executor.submit(atualizar_historico, linhas_dia, data_sql),
+            executor.submit(gerar_relatorio, relatorio_cumulativo, linhas_dia, COLUNAS_CUMULATIVO),
+            executor.submit(gerar_relatorio, relatorio_diario, linhas_dia, COLUNAS_DIARIO),
+        ]
+        for tarefa in tarefas:
+            tarefa.result()
 
+    kpis.registrar_checklist(df_dia)
     logging.info(f"Relatórios gerados: {relatorio_cumulativo} | {relatorio_diario}")
 
 
+def gerar_periodo(datas: list[date], workers: int = 1) -> None:
+    """
+    Reprocessa o checklist de cada data útil do período num único processo:
+    as datas são montadas juntas (montar_periodo), o histórico é gravado numa
+    única conexão e os relatórios diário/cumulativo de todas as datas em paralelo.
+    """
+    datas = [d for d in datas if d.weekday() != 6]
+    if not datas:
+        logging.info("Nenhuma data útil no período.")
+        return
+
+    with conectar_leitura(DB_PATH) as conn:
+        por_data = montar_periodo(conn, [(d.isoformat(), (d - timedelta(days=1)).isoformat()) for d in datas], workers)
+    checklists = {d: por_data[d.isoformat()] for d in datas}
+    linhas = {d: list(linhas_dataframe(df, COLUNAS_HISTORICO)) for d, df in checklists.items()}
+
+    with historico.abrir() as conn:
+        historico.migrar_excel_legado(conn)
+        for d, linhas_dia in linhas.items():
+            historico.gravar_dia(conn, linhas_dia, d.isoformat())
+    logging.info(f"Histórico atualizado com {len(linhas)} dia(s): {historico.HISTORICO_DB}")
+    kpis.registrar_checklist(pd.concat(checklists.values(), ignore_index=True))
+
+    with ThreadPoolExecutor() as executor:
+        tarefas = [
+            executor.submit(gerar_relatorio, PASTA_RELATORIOS / f"relatorio_{tipo}_{d.strftime('%d_%m_%Y')}.xlsx",
+                            linhas_dia, colunas)
+            for d, linhas_dia in linhas.items()
+            for tipo, colunas in (("cumulativo", COLUNAS_CUMULATIVO), ("diario", COLUNAS_DIARIO))
+        ]
+        for tarefa in tarefas:
+            tarefa.result()
+    logging.info(f"Relatórios gerados para {len(linhas)} dia(s) em {PASTA_RELATORIOS}")
+
+
 # ==========================
 # Fluxo principal
 # ==========================
 
-def main():
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Checklist diário de auditoria.")
+    parser.add_argument("--workers", type=int, default=1, help="processos para dividir as empresas (padrão: 1)")
+    parser.add_argument("--force", action="store_true", help="refaz mesmo sem mudanças nas fontes")
+    args = parser.parse_args(argv)
+
     data_atual = obter_data_util_anterior()
     data_sql = data_atual.strftime('%Y-%m-%d')
     data_sql_ontem = (data_atual - timedelta(days=1)).strftime('%Y-%m-%d')
     data_nome_arquivo = data_atual.strftime('%d_%m_%Y')
 
-    with sqlite3.connect(DB_PATH) as conn:
-        df_dia = montar_checklist(conn, data_sql, data_sql_ontem)
-        atualizar_historico(df_dia)
-        gerar_relatorios(df_dia, data_nome_arquivo)
+    # O cumulativo é derivado de Auditoria_LayoutNew; as dimensões definem empresas e layouts
+    assinatura = assinaturas.calcular(DB_PATH, ["input_Auditoria", "Auditoria_LayoutNew", *dimensoes.TABELAS],
+                                      data_sql=data_sql)
+    saidas = [historico.HISTORICO_DB, *(PASTA_RELATORIOS / f"relatorio_{tipo}_{data_nome_arquivo}.xlsx"
+                                         for tipo in ("cumulativo", "diario"))]
+    if assinaturas.pular(REGISTRO_ASSINATURA, assinatura, saidas, args.force):
+        return
+
+    with conectar_leitura(DB_PATH) as conn:
+        df_dia = montar_checklist(conn, data_sql, data_sql_ontem, args.workers)
+    gravar_saidas(df_dia, data_sql, data_nome_arquivo)
+    assinaturas.gravar(REGISTRO_ASSINATURA, assinatura)
 
 
 if __name__ == "__main__":
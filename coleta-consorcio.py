@@ -3,12 +3,17 @@ Extração e pivot de consórcio usando SQLite existente.
 Lê dados do banco centralizado e gera Excel final.
 """
 
+import argparse
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
 from pathlib import Path
 import pandas as pd
-import sqlite3
 import sys
 
+from noc import armazenamento, assinaturas, dimensoes, kpis
+from noc.exportacao import exportar_dataframe, publicar_arrow
+
 # ==========================
 # Configurações iniciais
 # ==========================
@@ -21,8 +26,7 @@ BASE_DIR = Path(getattr(sys, "_MEIPASS", Path(__file__).parent))
 PASTA_RELATORIOS = BASE_DIR / "Relatorios_validacao"
 PASTA_RELATORIOS.mkdir(exist_ok=True)
 CAMINHO_EXCEL = PASTA_RELATORIOS / "tabela_consorcio.xlsx"
-
-EMPRESAS_CONSORCIO = ["Empresa_A", "Empresa_B", "Empresa_C", "Empresa_D"]
+REGISTRO_ASSINATURA = CAMINHO_EXCEL.with_suffix(".assinatura.json")
 
 # Banco SQLite existente (unificado/centralizado)
 DB_PATH = BASE_DIR / "banco_exp.sqlite"
@@ -31,39 +35,24 @@ DB_PATH = BASE_DIR / "banco_exp.sqlite"
 # Funções auxiliares
 # ==========================
 
-def extrair_dados() -> pd.DataFrame:
-    """Extrai dados do banco SQLite apenas das empresas do consórcio."""
-    empresas_str = ",".join(f"'{e}'" for e in EMPRESAS_CONSORCIO)  # transforma lista em string SQL
-    query = f"""
-        SELECT *
-        FROM __Consolidado_Hist
-        WHERE dsNomeAssessoria IN ({empresas_str})
-    """
-    with sqlite3.connect(DB_PATH) as conn:
-        df = pd.read_sql(query, conn)
-    logging.info(f"{len(df)} registros extraídos do banco local para empresas do consórcio.")
-    return df
+def preencher_indice(tabela: pd.DataFrame) -> pd.DataFrame:
+    """Repete assessoria e layout nas linhas sem valor."""
+    if not tabela.empty:
+        tabela['dsNomeAssessoria'] = tabela['dsNomeAssessoria'].ffill()
+        tabela['Layout'] = tabela['Layout'].ffill()
+    return tabela
 
 
-def processar_pivot(df: pd.DataFrame) -> pd.DataFrame:
-    """Realiza pivot table."""
-    if df.empty:
-        logging.warning("DataFrame vazio. Nenhum dado para processar.")
-        return df
-
-    tabela = df.pivot_table(
-        index=["dsNomeAssessoria", "Layout"],
-        columns="dtDataReferencia",
-        values="Qtd",
-        aggfunc="sum"
-    ).fillna(0).astype(int)
+def extrair_pivot() -> pd.DataFrame:
+    """Pivot das empresas do consórcio, feito pelo backend configurado (NOC_BACKEND)."""
+    with armazenamento.abrir(caminho=DB_PATH) as banco:
+        tabela = banco.pivot_diario(grupo_empresa=dimensoes.GRUPO_CONSORCIO)
+    if tabela.empty:
+        return tabela
 
-    tabela_reset = tabela.reset_index()
-    tabela_reset['dsNomeAssessoria'] = tabela_reset['dsNomeAssessoria'].ffill()
-    tabela_reset['Layout'] = tabela_reset['Layout'].ffill()
-
-    logging.info("Pivot realizado com sucesso.")
-    return tabela_reset
+    tabela = preencher_indice(tabela)
+    logging.info(f"Pivot realizado no backend {banco.nome}: {len(tabela)} linhas.")
+    return tabela
 
 
 def salvar_excel(df: pd.DataFrame, caminho: Path) -> None:
@@ -71,22 +60,55 @@ def salvar_excel(df: pd.DataFrame, caminho: Path) -> None:
     if df.empty:
         logging.warning("DataFrame vazio. Nenhum arquivo gerado.")
         return
-    df.to_excel(caminho, index=False)
+    exportar_dataframe(caminho, df)
     logging.info(f"Tabela salva em: {caminho}")
+    publicar_arrow(caminho, df)
+
+
+def caminho_periodo(referencia: date) -> Path:
+    """Excel de uma data reprocessada (o relatório corrente continua em CAMINHO_EXCEL)."""
+    return CAMINHO_EXCEL.with_name(f"{CAMINHO_EXCEL.stem}_{referencia.isoformat()}.xlsx")
+
+
+def gerar_periodo(datas: list[date]) -> None:
+    """
+    Reprocessa o relatório como se tivesse sido gerado em cada uma das datas
+    (histórico até a data): uma única leitura até a maior data, Excel gravados em paralelo.
+    """
+    with armazenamento.abrir(caminho=DB_PATH) as banco:
+        dados = banco.consolidado(data_fim=max(datas).isoformat(), grupo_empresa=dimensoes.GRUPO_CONSORCIO)
+
+    tabelas = {
+        caminho_periodo(referencia): preencher_indice(
+            armazenamento.pivotar(dados[dados["dtDataReferencia"] <= referencia.isoformat()])
+        )
+        for referencia in datas
+    }
+    with ThreadPoolExecutor() as executor:
+        list(executor.map(salvar_excel, tabelas.values(), tabelas.keys()))
 
 
 # ==========================
 # Fluxo principal
 # ==========================
 
-def main() -> None:
-    df = extrair_dados()
-    if df.empty:
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Pivotagem de consórcio.")
+    parser.add_argument("--force", action="store_true", help="refaz mesmo sem mudanças nas fontes")
+    args = parser.parse_args(argv)
+
+    assinatura = assinaturas.calcular(DB_PATH, dimensoes.TABELAS, ["__Consolidado_Hist"])
+    if assinaturas.pular(REGISTRO_ASSINATURA, assinatura, [CAMINHO_EXCEL], args.force):
+        return
+
+    tabela_final = extrair_pivot()
+    if tabela_final.empty:
         logging.info("Nenhum dado retornado. Encerrando script.")
         return
 
-    tabela_final = processar_pivot(df)
     salvar_excel(tabela_final, CAMINHO_EXCEL)
+    kpis.registrar_zeros("Consorcio", tabela_final)
+    assinaturas.gravar(REGISTRO_ASSINATURA, assinatura)
 
 
 if __name__ == "__main__":
@@ -3,13 +3,20 @@ Extração horária de acionamentos usando SQLite existente.
 Atualiza Excel incrementalmente apenas com dados reais do banco centralizado.
 """
 
-import sqlite3
+import argparse
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 import logging
 import sys
 
+from noc import assinaturas, dimensoes, kpis, paralelo, shards
+from noc.agregados import atualizar_hora
+from noc.anomalias import atualizar_baseline, carregar_baseline, detectar_quedas
+from noc.conexao import conectar_escrita, conectar_leitura
+from noc.exportacao import exportar_dataframe, publicar_arrow
+
 # ==========================
 # Configurações iniciais
 # ==========================
@@ -21,8 +28,7 @@ BASE_DIR = Path(getattr(sys, "_MEIPASS", Path(__file__).parent))
 
 PASTA_RELATORIOS = BASE_DIR / "Relatorios_hora"
 PASTA_RELATORIOS.mkdir(exist_ok=True)
-
-EMPRESAS = [f'Empresa_{i}' for i in range(1, 13)]
+REGISTRO_ASSINATURA = PASTA_RELATORIOS / "hora.assinatura.json"
 
 # Banco SQLite existente (centralizado)
 DB_PATH = BASE_DIR / "banco_exp.sqlite"
@@ -31,6 +37,14 @@ DB_PATH = BASE_DIR / "banco_exp.sqlite"
 # Funções auxiliares
 # ==========================
 
+def pivotar_empresa(df, empresa):
+    """Uma linha por empresa, com as horas (Hora, Qtde) em colunas."""
+    if df.empty:
+        return pd.DataFrame()
+    df_pivot = df.pivot_table(index=None, columns="Hora", values="Qtde", fill_value=0)
+    df_pivot.insert(0, 'Empresa', empresa)
+    return df_pivot
+
 def consultar_empresa(conn, empresa, data_referencia):
     """Retorna DataFrame pivotado por hora de acionamentos."""
     df = pd.read_sql(f"""
@@ -39,13 +53,38 @@ def consultar_empresa(conn, empresa, data_referencia):
         WHERE dtDataReferencia >= '{data_referencia}'
         GROUP BY hrHoraInicio
     """, conn)
-    if df.empty:
-        return pd.DataFrame()
-    df_pivot = df.pivot_table(index=None, columns="Hora", values="Qtde", fill_value=0)
-    df_pivot.insert(0, 'Empresa', empresa)
-    return df_pivot
-
-def atualizar_excel_incremental(arquivo_excel):
+    return pivotar_empresa(df, empresa)
+
+def consultar_empresas(empresas, data_referencia):
+    """Pivots por hora de um lote de empresas, cada uma lida do seu shard (executado em um worker)."""
+    roteador = shards.roteador(DB_PATH)
+    dados = []
+    for _, empresa in empresas:
+        try:
+            dados.append(consultar_empresa(paralelo.conexao(roteador.shard_de(empresa)), empresa, data_referencia))
+        except Exception as e:
+            logging.error(f"Erro ao consultar {empresa}: {e}")
+    dados = [df for df in dados if not df.empty]
+    return pd.concat(dados, ignore_index=True) if dados else pd.DataFrame()
+
+def verificar_quedas(conn, data_referencia):
+    """Atualiza as linhas de base com os dias fechados e registra quedas significativas de hoje."""
+    atualizar_baseline(conn, data_referencia)
+    hoje = pd.read_sql("""
+        SELECT e.Nome AS Empresa, a.dtDataReferencia AS Data, a.hrHoraInicio AS Hora, a.Qtde
+        FROM Acionamentos_Hora_Agregado a
+        JOIN Dim_Empresa e ON e.IdEmpresa = a.IdEmpresa
+        WHERE a.dtDataReferencia = ?
+    """, conn, params=(data_referencia,))
+    if hoje.empty:
+        return
+    quedas = detectar_quedas(hoje, carregar_baseline(conn), datetime.now().strftime("%H:00"))
+    quedas = quedas[quedas["Queda"]]
+    for linha in quedas.itertuples(index=False):
+        logging.warning(f"Queda em {linha.Empresa} às {linha.Hora}: {linha.Qtde} (média {linha.Media:.1f}, z={linha.Z})")
+    logging.info(f"{len(quedas)} queda(s) significativa(s) detectada(s) em {data_referencia}.")
+
+def atualizar_excel_incremental(arquivo_excel, workers=1):
     """Atualiza o Excel incrementando dados do dia."""
     try:
         df_existente = pd.read_excel(arquivo_excel)
@@ -54,36 +93,119 @@ def atualizar_excel_incremental(arquivo_excel):
 
     data_referencia = datetime.today().strftime('%Y-%m-%d')
 
-    with sqlite3.connect(DB_PATH) as conn:
-        all_data = []
-        for empresa in EMPRESAS:
-            try:
-                df = consultar_empresa(conn, empresa, data_referencia)
-                if not df.empty:
-                    all_data.append(df)
-            except Exception as e:
-                logging.error(f"Erro ao consultar {empresa}: {e}")
-
-        if all_data:
-            df_novo = pd.concat(all_data, ignore_index=True)
-            if not df_existente.empty:
-                df_final = pd.concat([df_existente, df_novo], ignore_index=True).drop_duplicates()
-            else:
-                df_final = df_novo
-
-            df_final.to_excel(arquivo_excel, index=False)
-            logging.info(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Excel atualizado com novos dados.")
+    with conectar_leitura(DB_PATH) as catalogo:
+        empresas = dimensoes.empresas_hora(catalogo)
+    roteador = shards.roteador(DB_PATH)
+    por_shard = roteador.agrupar(empresas)
+
+    # Leituras por empresa divididas entre processos (conexões somente leitura)
+    df_novo = paralelo.distribuir(consultar_empresas, empresas, workers, data_referencia)
+
+    def atualizar_shard(caminho):
+        """Agrega e verifica quedas das empresas de um shard (shards em paralelo)."""
+        with conectar_escrita(caminho) as conn:
+            for id_empresa, empresa in por_shard[caminho]:
+                try:
+                    linhas = atualizar_hora(conn, id_empresa, empresa)
+                    logging.info(f"{empresa}: {linhas} linhas (data, hora) agregadas.")
+                except Exception as e:
+                    logging.error(f"Erro ao agregar {empresa}: {e}")
+            conn.commit()
+            verificar_quedas(conn, data_referencia)
+
+    roteador.paralelo(atualizar_shard, por_shard)
+
+    if not df_novo.empty:
+        if not df_existente.empty:
+            df_final = pd.concat([df_existente, df_novo], ignore_index=True).drop_duplicates()
         else:
-            logging.info("Nenhum dado novo encontrado para atualização.")
+            df_final = df_novo
+
+        exportar_dataframe(arquivo_excel, df_final)
+        publicar_arrow(arquivo_excel, df_final)
+        # Só as empresas relidas nesta execução têm as contagens trocadas
+        kpis.registrar_horas(df_final, data_referencia, datetime.now().strftime("%H:00"), df_novo["Empresa"].unique())
+        logging.info(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Excel atualizado com novos dados.")
+    else:
+        logging.info("Nenhum dado novo encontrado para atualização.")
+
+def consultar_periodo(empresas, data_inicio, data_fim):
+    """Acionamentos por (data, hora) de um lote de empresas no período, lidos do shard de cada uma (worker)."""
+    roteador = shards.roteador(DB_PATH)
+    dados = []
+    for _, empresa in empresas:
+        try:
+            df = pd.read_sql(f"""
+                SELECT dtDataReferencia, hrHoraInicio AS Hora, SUM(Qtde) AS Qtde
+                FROM __{empresa}_input_Acionamentos
+                WHERE dtDataReferencia BETWEEN ? AND ?
+                GROUP BY dtDataReferencia, hrHoraInicio
+            """, paralelo.conexao(roteador.shard_de(empresa)), params=(data_inicio, data_fim))
+            df.insert(0, 'Empresa', empresa)
+            dados.append(df)
+        except Exception as e:
+            logging.error(f"Erro ao consultar {empresa}: {e}")
+    dados = [df for df in dados if not df.empty]
+    return pd.concat(dados, ignore_index=True) if dados else pd.DataFrame()
+
+def gerar_periodo(datas, workers=1):
+    """
+    Regera o relatório horário de cada data do período: uma leitura por
+    empresa cobrindo o período todo (empresas divididas entre 'workers'
+    processos) e os Excel gravados em paralelo. Não altera agregados nem linhas de base.
+    """
+    with conectar_leitura(DB_PATH) as catalogo:
+        empresas = dimensoes.empresas_hora(catalogo)
+    dados = paralelo.distribuir(consultar_periodo, empresas, workers, min(datas).isoformat(), max(datas).isoformat())
+    if dados.empty:
+        logging.info("Nenhum dado horário no período.")
+        return
+
+    # Empresas na mesma ordem do relatório do dia
+    relatorios = {
+        data_iso: pd.concat(
+            [pivotar_empresa(df[["Hora", "Qtde"]], empresa) for empresa, df in do_dia.groupby("Empresa", sort=False)],
+            ignore_index=True
+        )
+        for data_iso, do_dia in dados.groupby("dtDataReferencia")
+    }
+
+    def gravar(data_iso, df):
+        arquivo_excel = PASTA_RELATORIOS / f"Acionamentos_hora_{data_iso}.xlsx"
+        exportar_dataframe(arquivo_excel, df)
+        publicar_arrow(arquivo_excel, df)
+
+    with ThreadPoolExecutor() as executor:
+        list(executor.map(gravar, relatorios.keys(), relatorios.values()))
+
+    hoje = datetime.today().strftime('%Y-%m-%d')
+    for data_iso, df in relatorios.items():
+        kpis.registrar_horas(df, data_iso, datetime.now().strftime("%H:00") if data_iso == hoje else None)
+    logging.info(f"{len(relatorios)} relatório(s) horário(s) regerado(s) em {PASTA_RELATORIOS}")
 
 # ==========================
 # Fluxo principal
 # ==========================
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extração horária de acionamentos.")
+    parser.add_argument("--workers", type=int, default=1, help="processos para dividir as empresas (padrão: 1)")
+    parser.add_argument("--force", action="store_true", help="refaz mesmo sem mudanças nas fontes")
+    args = parser.parse_args(argv)
+
     hoje = datetime.today().strftime('%Y-%m-%d')
     arquivo_excel = PASTA_RELATORIOS / f"Acionamentos_hora_{hoje}.xlsx"
-    atualizar_excel_incremental(arquivo_excel)
+
+    # A hora entra na assinatura: a detecção de quedas muda com a hora corrente mesmo sem dados novos
+    with conectar_leitura(DB_PATH) as catalogo:
+        tabelas = [f"__{empresa}_input_Acionamentos" for _, empresa in dimensoes.empresas_hora(catalogo)]
+    assinatura = assinaturas.calcular(DB_PATH, ["Dim_Empresa"], tabelas,
+                                      data=hoje, hora=datetime.now().strftime("%H:00"))
+    if assinaturas.pular(REGISTRO_ASSINATURA, assinatura, forcar=args.force):
+        return
+
+    atualizar_excel_incremental(arquivo_excel, args.workers)
+    assinaturas.gravar(REGISTRO_ASSINATURA, assinatura)
 
 if __name__ == "__main__":
     main()
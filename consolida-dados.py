@@ -4,6 +4,7 @@ Alimenta todas as tabelas do banco profissional com dados fictícios.
 Inclui alguns erros simulados (0s) e diferenças de auditoria.
 """
 
+import argparse
 import sqlite3
 import sys
 from pathlib import Path
@@ -11,6 +12,8 @@ from datetime import datetime, timedelta
 import random
 import logging
 
+from noc import agregados, assinaturas, shards
+
 logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
 
 # ==========================================
@@ -18,6 +21,7 @@ logging.basicConfig(level=logging.INFO, format="[%(levelname)s] %(message)s")
 # ==========================================
 BASE_DIR = Path(getattr(sys, "_MEIPASS", Path(__file__).parent))
 DB_PATH = BASE_DIR / "banco_exp.sqlite"
+REGISTRO_ASSINATURA = DB_PATH.with_suffix(".assinatura.json")
 
 # Layouts e empresas
 LAYOUTS_CONSORCIO = ["Consorcio"]
@@ -37,7 +41,15 @@ datas = [start_date + timedelta(days=i) for i in range((end_date - start_date).d
 # Funções auxiliares
 # ==========================
 
-def inserir_consolidado(cursor):
+def assinatura_carga():
+    """Estado das tabelas carregadas e período: igual ao da última carga = período já carregado."""
+    return assinaturas.calcular(
+        DB_PATH, ["Auditoria_LayoutNew", "input_Auditoria"],
+        ["__Consolidado_Hist", *(f"__{empresa}_input_Acionamentos" for empresa in EMPRESAS_DEMAIS)],
+        data_inicio=datas[0].strftime("%Y-%m-%d"), data_fim=datas[-1].strftime("%Y-%m-%d")
+    )
+
+def inserir_consolidado(conexoes):
     registros = []
     for dt_ref in datas:
         # Consórcio
@@ -53,11 +65,13 @@ def inserir_consolidado(cursor):
                 registros.append((dt_ref.strftime("%Y-%m-%d"), empresa, empresa_id, qtd, layout,
                                   datetime.now().strftime("%Y-%m-%d")))
 
-    cursor.executemany("""
-        INSERT INTO __Consolidado_Hist
-        (dtDataReferencia, dsNomeAssessoria, IdCompany, Qtd, Layout, Data_Coleta)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, registros)
+    # Cada empresa vai para o seu shard (o próprio banco quando não fragmentado)
+    for caminho, registros_shard in roteador.agrupar((r, r[1]) for r in registros).items():
+        conexoes[caminho].executemany("""
+            INSERT INTO __Consolidado_Hist
+            (dtDataReferencia, dsNomeAssessoria, IdCompany, Qtd, Layout, Data_Coleta)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, [r for r, _ in registros_shard])
     logging.info(f"{len(registros)} registros inseridos em __Consolidado_Hist.")
 
 def inserir_auditoria_layoutnew(cursor):
@@ -87,7 +101,7 @@ def inserir_input_auditoria(cursor):
     """, registros)
     logging.info(f"{len(registros)} registros inseridos em input_Auditoria.")
 
-def inserir_acionamentos_hora(cursor):
+def inserir_acionamentos_hora(conexoes):
     for empresa in EMPRESAS_DEMAIS:
         registros = []
         for dt_ref in datas:
@@ -95,7 +109,7 @@ def inserir_acionamentos_hora(cursor):
                 qtd = random.choice([0, random.randint(0, 10)])
                 registros.append((dt_ref.strftime("%Y-%m-%d"), hora, qtd))
 
-        cursor.executemany(f"""
+        conexoes[roteador.shard_de(empresa)].executemany(f"""
             INSERT INTO __{empresa}_input_Acionamentos (dtDataReferencia, hrHoraInicio, Qtde)
             VALUES (?, ?, ?)
         """, registros)
@@ -104,14 +118,35 @@ def inserir_acionamentos_hora(cursor):
 # ==========================
 # Execução ETL
 # ==========================
+parser = argparse.ArgumentParser(description="Carga de dados fictícios no banco.")
+parser.add_argument("--force", action="store_true", help="carrega mesmo que o período já tenha sido carregado")
+args = parser.parse_args()
+
+# Reexecuções sem mudança no banco nem no período não duplicam a carga
+if assinaturas.pular(REGISTRO_ASSINATURA, assinatura_carga(), forcar=args.force):
+    sys.exit(0)
+
+roteador = shards.roteador(DB_PATH)
 conn = sqlite3.connect(DB_PATH)
 cursor = conn.cursor()
+conexoes = shards.conectar_shards(roteador, conn)
 
-inserir_consolidado(cursor)
+inserir_consolidado(conexoes)
 inserir_auditoria_layoutnew(cursor)
 inserir_input_auditoria(cursor)
-inserir_acionamentos_hora(cursor)
+inserir_acionamentos_hora(conexoes)
+
+# Shards confirmados antes dos agregados, que releem os dados brutos
+if roteador.fragmentado:
+    for shard in conexoes.values():
+        shard.commit()
+        shard.close()
+
+# Agregados diários recalculados só a partir da primeira data carregada
+linhas = agregados.atualizar_todos(conn, datas[0].strftime("%Y-%m-%d"))
+logging.info(f"Agregados diários atualizados: {linhas}")
 
 conn.commit()
 conn.close()
+assinaturas.gravar(REGISTRO_ASSINATURA, assinatura_carga())
 logging.info("ETL completo concluído com sucesso.")
@@ -4,22 +4,49 @@ Configurações de página, estilo global, sidebar, footer e funções auxiliare
 """
 
 import os
+import re
 import base64
+import html
+import sqlite3
+import time
 from datetime import datetime, timedelta
 import pandas as pd
 import streamlit as st
 import warnings
 from pathlib import Path
+from dataclasses import dataclass
+import numpy as np
+
+from noc.anomalias import carregar_baseline, detectar_quedas
+from noc import fila, historico, kpis, shards
+from noc.cache import CACHE
+from noc.conexao import pool_leitura
+from noc.exportacao import caminho_arrow, exportar_dataframe, ler_arrow, linhas_dataframe
+from noc.observador import OBSERVADOR, Observador
 
 warnings.filterwarnings(
     "ignore", category=UserWarning, message="pandas only supports SQLAlchemy.*"
 )
 
+# Os DataFrames do cache compartilhado são lidos por todas as sessões: com
+# copy-on-write, filtros e edições de uma sessão nunca alteram o dado comum.
+# (No pandas >= 3 o copy-on-write já é sempre ativo.)
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
 # =========================================================
 # CONFIGURAÇÃO DE PÁGINA
 # =========================================================
 ICON_PNG = "img/chart_icon.png"
 ICON_SVG = "img/chart_icon.svg"
+DB_PATH = "banco_exp.sqlite"
+ARQUIVO_CONSORCIO = "Relatorios_validacao/tabela_consorcio.xlsx"
+ARQUIVO_COLETAS = "Relatorios_validacao/tabela_bancaria_coleta.xlsx"
+FILTROS_VALIDACAO = (("Layout", "Layout"), ("Empresa", "dsNomeAssessoria"))
+FILTROS_HORA = (("Empresa", "Empresa"),)
+
+def arquivo_hora(data_iso: str) -> str:
+    return f"./Relatorios_hora/Acionamentos_hora_{data_iso}.xlsx"
 
 def _pick_page_icon():
     if os.path.exists(ICON_PNG):
@@ -43,14 +70,157 @@ def get_base64_file(path: str) -> str:
     with open(path, "rb") as f:
         return base64.b64encode(f.read()).decode()
 
-@st.cache_data
+def _mtime(path: str):
+    """Retorna o mtime do arquivo ou None se ele não existir."""
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+LIMITE_CATEGORICO = 0.5  # fração máxima de valores distintos para virar categoria
+
+def compactar_tipos(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converte colunas de texto com poucos valores distintos em categorias e
+    rebaixa contagens inteiras (inclusive floats sem casas decimais) para o
+    menor inteiro que as comporta.
+    """
+    for coluna in df.columns:
+        serie = df[coluna]
+        if pd.api.types.is_string_dtype(serie.dtype):
+            if (pd.api.types.infer_dtype(serie, skipna=True) == "string"
+                    and serie.nunique() <= len(serie) * LIMITE_CATEGORICO):
+                df[coluna] = serie.astype("category")
+        elif pd.api.types.is_integer_dtype(serie):
+            df[coluna] = pd.to_numeric(serie, downcast="integer")
+        elif pd.api.types.is_float_dtype(serie) and serie.notna().all() and (serie % 1 == 0).all():
+            df[coluna] = pd.to_numeric(serie.astype("int64"), downcast="integer")
+    return df
+
+def descompactar_tipos(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Volta categorias para texto livre e inteiros rebaixados para int64: edição
+    e gravação aceitam valores novos, inclusive fora da faixa dos atuais.
+    """
+    tipos = {coluna: object for coluna in df.select_dtypes("category").columns}
+    tipos.update({coluna: "int64" for coluna in df.select_dtypes("integer").columns if df[coluna].dtype.itemsize < 8})
+    return df.astype(tipos)
+
+def bytes_por_linha(df: pd.DataFrame) -> float:
+    """Memória real (deep) do DataFrame dividida pelo número de linhas."""
+    if df.empty:
+        return 0.0
+    return df.memory_usage(deep=True).sum() / len(df)
+
+def _registro_memoria() -> dict:
+    """Relatório de memória por tipo de relatório, compartilhado entre reruns e threads."""
+    return CACHE.memoria
+
 def carregar_dados(path: str) -> pd.DataFrame:
-    """Carrega Excel e converte coluna Data_Referencia em datetime."""
-    df = pd.read_excel(path)
+    """
+    Carrega o relatório, converte Data_Referencia em datetime (uma única vez) e
+    compacta os tipos. Se o coletor publicou um .arrow mais novo que o Excel
+    (o Excel é regravado pelas edições do dashboard), usa-o via memory-map,
+    sem parse e já com tipos compactos; nesse caso não há linha de base sem
+    compactação e o relatório de memória não traz o "antes".
+    """
+    if not os.path.exists(path):
+        return pd.DataFrame()
+    arrow = caminho_arrow(path)
+    if arrow.exists() and _mtime(str(arrow)) >= _mtime(path):
+        df = ler_arrow(arrow)
+        origem, antes = "Arrow", None
+    else:
+        df = pd.read_excel(path)
+        df.columns = df.columns.astype(str).str.strip()
+        origem, antes = "Excel", bytes_por_linha(df)
     if "Data_Referencia" in df.columns:
         df["Data_Referencia"] = pd.to_datetime(df["Data_Referencia"], errors="coerce")
+    df = compactar_tipos(df)
+    _registrar_memoria(Path(path).name, origem, antes, df)
     return df
 
+def _registrar_memoria(nome: str, origem: str, antes: float | None, df: pd.DataFrame) -> None:
+    _registro_memoria()[nome] = {
+        "Origem": origem,
+        "Linhas": len(df),
+        "Bytes/linha (antes)": None if antes is None else round(antes, 1),
+        "Bytes/linha (depois)": round(bytes_por_linha(df), 1),
+    }
+
+def exibir_relatorio_memoria():
+    """Tabela com bytes por linha antes/depois da compactação de cada relatório carregado."""
+    registro = _registro_memoria()
+    if not registro:
+        st.info("Nenhum relatório carregado ainda nesta sessão do servidor.")
+        return
+    st.dataframe(pd.DataFrame.from_dict(registro, orient="index"), width='stretch')
+    st.caption("Relatórios lidos do .arrow já chegam compactos: sem medição antes da compactação.")
+
+# =========================================================
+# ÍNDICE DE DOMÍNIOS DOS FILTROS
+# =========================================================
+@dataclass
+class DominioFiltro:
+    """Valores distintos de uma coluna de filtro e o bitmap de linhas de cada valor."""
+    valores: list[str]
+    bitmaps: dict[str, np.ndarray]
+    nao_nulos: np.ndarray
+
+    def mascara(self, selecionados) -> np.ndarray:
+        """União (OR) dos bitmaps dos valores selecionados."""
+        if len(selecionados) == len(self.valores):
+            return self.nao_nulos
+        mascara = np.zeros(len(self.nao_nulos), dtype=bool)
+        for valor in selecionados:
+            bitmap = self.bitmaps.get(valor)
+            if bitmap is not None:
+                mascara |= bitmap
+        return mascara
+
+def construir_dominio(valores: pd.Series) -> DominioFiltro:
+    """Fatoriza a coluna uma única vez e gera um bitmap por valor distinto."""
+    if pd.api.types.is_datetime64_any_dtype(valores):
+        valores = valores.dt.date
+    texto = valores.astype(str).where(valores.notna())
+    codigos, distintos = pd.factorize(texto, sort=True)
+    bitmaps = {str(valor): codigos == i for i, valor in enumerate(distintos)}
+    return DominioFiltro(list(bitmaps), bitmaps, codigos >= 0)
+
+def carregar_indexado(path: str, colunas: tuple[tuple[str, str], ...]):
+    """
+    Carrega o relatório, codifica as colunas de filtro como categóricas e monta
+    o índice {nome do filtro: DominioFiltro}. Passa pelo cache compartilhado:
+    recalculado apenas quando o mtime muda e reaproveita pré-cargas.
+    """
+    return agendar_indexado(path, colunas).result()
+
+def agendar_indexado(path: str, colunas: tuple[tuple[str, str], ...]):
+    """Agenda (sem bloquear) a carga indexada do relatório no cache compartilhado."""
+    return CACHE.agendar(("indexado", path, _mtime(path), colunas), _carregar_indexado, path, colunas)
+
+def _carregar_indexado(path: str, colunas: tuple[tuple[str, str], ...]):
+    return indexar(carregar_dados(path), colunas)
+
+def indexar(df: pd.DataFrame, colunas: tuple[tuple[str, str], ...]):
+    """Codifica as colunas de filtro como categóricas e devolve (df, índice de domínios)."""
+    indice = {}
+    if df.empty:
+        return df, indice
+    for nome, coluna in colunas:
+        if not pd.api.types.is_datetime64_any_dtype(df[coluna]):
+            df[coluna] = df[coluna].astype("category")
+        indice[nome] = construir_dominio(df[coluna])
+    return df, indice
+
+def aplicar_filtros(df: pd.DataFrame, indice: dict, filtro_selecionado: dict) -> pd.DataFrame:
+    """Filtra o DataFrame pela interseção (AND) dos bitmaps de cada filtro."""
+    mascara = np.ones(len(df), dtype=bool)
+    for nome, selecionados in filtro_selecionado.items():
+        if nome in indice:
+            mascara &= indice[nome].mascara(selecionados)
+    return df[mascara]
+
 def obter_data_util_anterior(base_date=None) -> datetime:
     """Retorna a última data útil (não domingo)."""
     if base_date is None:
@@ -63,95 +233,113 @@ def obter_data_util_anterior(base_date=None) -> datetime:
 # =========================================================
 # ESTILO GLOBAL + SIDEBAR
 # =========================================================
+CSS_TEMPLATE = """
+<style>
+header[data-testid="stHeader"] { background: transparent; }
+.block-container { padding-top: 1rem; }
+.stApp {
+    background: linear-gradient(135deg, #0f172a, #1e293b);
+    color: #e2e8f0;
+}
+h1, h2, h3 {
+    color: #e2e8f0;
+    font-weight: 700;
+}
+h1 { font-size: 2.2rem; }
+h2 { font-size: 1.6rem; margin-top: 14px; }
+h3 { font-size: 1.2rem; }
+
+section[data-testid="stSidebar"] {
+    background: #1e293b;
+    padding: 18px 12px 70px 12px;
+}
+.sidebar-logo {
+    text-align: center;
+    margin-bottom: 14px;
+}
+.sidebar-logo img { width: 160px; }
+.sidebar-title {
+    text-align: center;
+    font-size: 1.2rem;
+    letter-spacing: .5px;
+    color: #e2e8f0;
+    margin-bottom: 10px;
+}
+
+.nav-item {
+    display: block;
+    width: 100%;
+    text-align: left;
+    padding: 8px 10px;
+    margin: 2px 0;
+    background: transparent;
+    border: none;
+    color: #e2e8f0;
+    font-weight: 500;
+    cursor: pointer;
+    border-radius: 6px;
+}
+.nav-item:hover {
+    background: rgba(255,255,255,0.06);
+}
+.nav-item.active {
+    color: #ef4444;
+    text-decoration: underline;
+}
+
+div[data-testid="stDataFrame"], div[data-testid="stPlotlyChart"] {
+    background: rgba(30,41,59,0.85);
+    border-radius: 14px;
+    padding: 10px;
+    border: 1px solid rgba(255,255,255,0.08);
+    box-shadow: 0 4px 18px rgba(0,0,0,0.35);
+}
+
+.global-footer {
+    position: fixed;
+    bottom: 10px;
+    left: 0;
+    width: 100%;
+    text-align: center;
+    font-size: 0.9rem;
+    color: #94a3b8;
+    pointer-events: none;
+}
+</style>
+"""
+
+def _minificar_css(css: str) -> str:
+    """Remove quebras de linha e espaços redundantes do bloco de estilo."""
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r"\s*([{};:,>])\s*", r"\1", css)
+    return css.replace(";}", "}").strip()
+
+@st.cache_resource(show_spinner=False)
+def _base64_estatico(path: str, mtime: float) -> str:
+    """Lê e codifica o arquivo uma única vez por processo (chave: caminho + mtime)."""
+    return get_base64_file(path)
+
+@st.cache_resource(show_spinner=False)
+def _montar_estilo(logo_path: str, logo_mtime, svg_mtime) -> tuple[str, str]:
+    """Monta o bloco <style> minificado e o HTML do logo; reconstruído só se os arquivos mudarem."""
+    estilo = _minificar_css(CSS_TEMPLATE)
+    if svg_mtime is not None:
+        svg_b64 = _base64_estatico(ICON_SVG, svg_mtime)
+        estilo += f'<link rel="icon" type="image/svg+xml" href="data:image/svg+xml;base64,{svg_b64}">'
+
+    logo_html = ""
+    if logo_mtime is not None:
+        logo_b64 = _base64_estatico(logo_path, logo_mtime)
+        logo_html = f'<div class="sidebar-logo"><img src="data:image/png;base64,{logo_b64}" /></div>'
+    return estilo, logo_html
+
 def aplicar_estilo_css(logo_path="img/KrownCode.png", pagina_ativa: str = "Home"):
-    logo_b64 = get_base64_file(logo_path) if os.path.exists(logo_path) else None
-    svg_favicon_tag = ""
-    if os.path.exists(ICON_SVG):
-        svg_b64 = get_base64_file(ICON_SVG)
-        svg_favicon_tag = f"""<link rel="icon" type="image/svg+xml" href="data:image/svg+xml;base64,{svg_b64}">"""
-
-    st.markdown(f"""
-        <style>
-        header[data-testid="stHeader"] {{ background: transparent; }}
-        .block-container {{ padding-top: 1rem; }}
-        .stApp {{
-            background: linear-gradient(135deg, #0f172a, #1e293b);
-            color: #e2e8f0;
-        }}
-        h1, h2, h3 {{
-            color: #e2e8f0;
-            font-weight: 700;
-        }}
-        h1 {{ font-size: 2.2rem; }}
-        h2 {{ font-size: 1.6rem; margin-top: 14px; }}
-        h3 {{ font-size: 1.2rem; }}
-
-        section[data-testid="stSidebar"] {{
-            background: #1e293b;
-            padding: 18px 12px 70px 12px;
-        }}
-        .sidebar-logo {{
-            text-align: center;
-            margin-bottom: 14px;
-        }}
-        .sidebar-logo img {{ width: 160px; }}
-        .sidebar-title {{
-            text-align: center;
-            font-size: 1.2rem;
-            letter-spacing: .5px;
-            color: #e2e8f0;
-            margin-bottom: 10px;
-        }}
-
-        .nav-item {{
-            display: block;
-            width: 100%;
-            text-align: left;
-            padding: 8px 10px;
-            margin: 2px 0;
-            background: transparent;
-            border: none;
-            color: #e2e8f0;
-            font-weight: 500;
-            cursor: pointer;
-            border-radius: 6px;
-        }}
-        .nav-item:hover {{
-            background: rgba(255,255,255,0.06);
-        }}
-        .nav-item.active {{
-            color: #ef4444;
-            text-decoration: underline;
-        }}
-
-        div[data-testid="stDataFrame"], div[data-testid="stPlotlyChart"] {{
-            background: rgba(30,41,59,0.85);
-            border-radius: 14px;
-            padding: 10px;
-            border: 1px solid rgba(255,255,255,0.08);
-            box-shadow: 0 4px 18px rgba(0,0,0,0.35);
-        }}
-
-        .global-footer {{
-            position: fixed;
-            bottom: 10px;
-            left: 0;
-            width: 100%;
-            text-align: center;
-            font-size: 0.9rem;
-            color: #94a3b8;
-            pointer-events: none;
-        }}
-        </style>
-        {svg_favicon_tag}
-    """, unsafe_allow_html=True)
+    estilo, logo_html = _montar_estilo(logo_path, _mtime(logo_path), _mtime(ICON_SVG))
+    st.markdown(estilo, unsafe_allow_html=True)
 
     with st.sidebar:
-        if logo_b64:
-            st.markdown(
-                f'<div class="sidebar-logo"><img src="data:image/png;base64,{logo_b64}" /></div>',
-                unsafe_allow_html=True
-            )
+        if logo_html:
+            st.markdown(logo_html, unsafe_allow_html=True)
         st.markdown('<div class="sidebar-title">Menu</div>', unsafe_allow_html=True)
 
 def footer_global():
@@ -201,6 +389,9 @@ def pagina_home():
         """, unsafe_allow_html=True
     )
 
+    # ======== Resumo das pendências ========
+    resumo_pendencias()
+
     st.write("\n")
 
     # ======== Introdução ========
@@ -265,6 +456,27 @@ def pagina_home():
 
 
     
+def resumo_pendencias():
+    """Indicadores atuais de cada fonte, lidos do resumo mantido pelos coletores (noc/kpis.py)."""
+    resumo = kpis.resumo()
+    if resumo.empty:
+        st.info("Indicadores ainda não calculados. Execute os coletores para preencher o resumo.")
+        return
+    por_indicador = {(linha.Fonte, linha.Indicador): linha for linha in resumo.itertuples(index=False)}
+    fontes = {linha.Fonte: linha for linha in resumo.itertuples(index=False)}
+
+    st.markdown("### 📋 Pendências atuais")
+    colunas = st.columns(len(kpis.INDICADORES), gap="small")
+    for coluna, ((fonte, indicador), rotulo) in zip(colunas, kpis.INDICADORES.items()):
+        with coluna:
+            if fonte not in fontes:
+                st.metric(rotulo, "—", help="Coletor ainda não executado")
+                continue
+            linha = por_indicador.get((fonte, indicador))
+            total, empresas = (int(linha.Total), int(linha.Empresas)) if linha else (0, 0)
+            st.metric(rotulo, total, help=f"Atualizado em {fontes[fonte].Atualizado}")
+            st.caption(f"{empresas} empresa(s) · ref. {fontes[fonte].Data}")
+
 def pagina_help():
     st.set_page_config(page_title="NOC Dashboards - Documentação", layout="wide")
 
@@ -371,18 +583,65 @@ def pagina_help():
         """, unsafe_allow_html=True
     )
 
+    # ======== Memória ========
+    with st.expander("📊 Uso de memória dos relatórios (bytes por linha)"):
+        exibir_relatorio_memoria()
+
+def carregar_checklist(inicio: str, fim: str):
+    """Histórico do checklist do período, via cache compartilhado (versão = mtime do histórico)."""
+    return agendar_checklist(inicio, fim).result()
+
+def agendar_checklist(inicio: str, fim: str):
+    """Agenda (sem bloquear) a leitura do período do histórico no cache compartilhado."""
+    chave = ("checklist", inicio, fim, _mtime(str(historico.HISTORICO_DB)))
+    return CACHE.agendar(chave, _carregar_checklist, inicio, fim)
+
+def periodo_padrao_checklist():
+    """(primeira data, última data, início padrão = últimos 30 dias) do histórico, ou None."""
+    if not historico.HISTORICO_DB.exists():
+        return None
+    with historico.abrir() as conn:
+        limites = historico.limites(conn)
+    if limites is None:
+        return None
+    primeira_data, ultima_data = limites
+    return primeira_data, ultima_data, max(primeira_data, ultima_data - timedelta(days=30))
+
+def _carregar_checklist(inicio: str, fim: str):
+    """Lê do histórico particionado só os meses do período e indexa os filtros."""
+    with historico.abrir() as conn:
+        df = historico.ler_periodo(conn, inicio, fim)
+    antes = bytes_por_linha(df)
+    df["Data_Referencia"] = pd.to_datetime(df["Data_Referencia"], errors="coerce")
+    df = compactar_tipos(df)
+    _registrar_memoria(historico.HISTORICO_DB.name, "SQLite", antes, df)
+    return indexar(df, (("Empresa", "Empresa"), ("Layout", "Layout"), ("Data", "Data_Referencia")))
+
 def pagina_checklist():
     st.title("Checklist Diário")
 
-    HISTORICO_PATH = "Relatorios_Checklist/historico_checklist.xlsx"
-    if not os.path.exists(HISTORICO_PATH):
-        st.warning(f"Arquivo de histórico não encontrado em '{HISTORICO_PATH}'.")
+    limites = periodo_padrao_checklist()
+    if limites is None:
+        st.warning(f"Histórico não encontrado ou vazio em '{historico.HISTORICO_DB}'. Execute 'coleta-checklist.py'.")
         return
 
-    df = carregar_dados(HISTORICO_PATH)
+    # Período: define quais partições mensais são lidas
+    primeira_data, ultima_data, inicio_padrao = limites
+    periodo = st.date_input(
+        "Período",
+        value=(inicio_padrao, ultima_data),
+        min_value=primeira_data,
+        max_value=ultima_data,
+        key="checklist_periodo"
+    )
+    if not isinstance(periodo, (tuple, list)) or len(periodo) != 2:
+        st.info("Selecione a data inicial e a data final.")
+        return
 
-    # Garantir que Data_Referencia é datetime
-    df["Data_Referencia"] = pd.to_datetime(df["Data_Referencia"], errors="coerce")
+    df, indice = carregar_checklist(periodo[0].strftime("%Y-%m-%d"), periodo[1].strftime("%Y-%m-%d"))
+    if df.empty:
+        st.warning("Nenhum registro no período selecionado.")
+        return
 
     # ===========================
     # Filtros
@@ -392,13 +651,9 @@ def pagina_checklist():
         c1, c2, c3 = st.columns(3, gap="small")
         filtro_selecionado = {}
 
-        for idx, (col, nome, valores) in enumerate(zip(
-            [c1, c2, c3],
-            ["Empresa", "Layout", "Data"],
-            [df["Empresa"], df["Layout"], df["Data_Referencia"].dt.date]
-        )):
+        for idx, (col, nome) in enumerate(zip([c1, c2, c3], ["Empresa", "Layout", "Data"])):
             with col:
-                unique_vals = sorted(valores.dropna().astype(str).unique())
+                unique_vals = indice[nome].valores
                 with st.expander(nome):
                     selecionados = st.multiselect(
                         nome,
@@ -411,11 +666,7 @@ def pagina_checklist():
     # ===========================
     # Aplicar filtros
     # ===========================
-    df_filtrado = df[
-        (df["Empresa"].astype(str).isin(filtro_selecionado["Empresa"])) &
-        (df["Layout"].astype(str).isin(filtro_selecionado["Layout"])) &
-        (df["Data_Referencia"].dt.date.astype(str).isin(filtro_selecionado["Data"]))
-    ]
+    df_filtrado = aplicar_filtros(df, indice, filtro_selecionado)
 
     st.subheader("Dados em Análise")
     st.dataframe(df_filtrado, width='stretch')
@@ -427,7 +678,7 @@ def pagina_checklist():
     problemas_diario = df_filtrado[df_filtrado["Check Diario"] == "VALIDAR"]
     if not problemas_diario.empty:
         edited_diario = st.data_editor(
-            problemas_diario[["Data_Referencia", "Empresa", "Layout", "Obs Check Diario", "Check Diario"]],
+            descompactar_tipos(problemas_diario[["Data_Referencia", "Empresa", "Layout", "Obs Check Diario", "Check Diario"]]),
             width='stretch')
     else:
         st.success("✅ Tudo Feito! Sem erros nas Pendências Diárias.")
@@ -440,7 +691,7 @@ def pagina_checklist():
     problemas_volum = df_filtrado[df_filtrado["Check Vol Cumulativa"] == "VALIDAR"]
     if not problemas_volum.empty:
         edited_volum = st.data_editor(
-            problemas_volum[["Data_Referencia", "Empresa", "Layout", "Obs Vol Cumulativa", "Qnt_Ontem", "Qnt_Hoje", "Check Vol Cumulativa"]],
+            descompactar_tipos(problemas_volum[["Data_Referencia", "Empresa", "Layout", "Obs Vol Cumulativa", "Qnt_Ontem", "Qnt_Hoje", "Check Vol Cumulativa"]]),
             width='stretch')
     else:
         st.success("✅ Tudo Feito! Sem erros nas Pendências de Volumetria.")
@@ -450,6 +701,10 @@ def pagina_checklist():
     # Botão para salvar alterações
     # ===========================
     if st.button("💾 Salvar alterações"):
+        # Categorias não aceitam textos novos: volta para texto livre antes de editar
+        df = descompactar_tipos(df)
+        alterados = set()
+
         # Atualiza df original
         if not edited_diario.empty:
             for idx, row in edited_diario.iterrows():
@@ -459,6 +714,7 @@ def pagina_checklist():
                     (df["Layout"] == row["Layout"])
                 ].index
                 df.loc[df_idx, ["Obs Check Diario", "Check Diario"]] = row[["Obs Check Diario", "Check Diario"]].values
+                alterados.update(df_idx)
 
         if not edited_volum.empty:
             for idx, row in edited_volum.iterrows():
@@ -469,9 +725,13 @@ def pagina_checklist():
                 ].index
                 df.loc[df_idx, ["Obs Vol Cumulativa", "Qnt_Ontem", "Qnt_Hoje", "Check Vol Cumulativa"]] = \
                     row[["Obs Vol Cumulativa", "Qnt_Ontem", "Qnt_Hoje", "Check Vol Cumulativa"]].values
+                alterados.update(df_idx)
 
-        # Salva de volta no Excel
-        df.to_excel(HISTORICO_PATH, index=False)
+        # Regrava só as linhas alteradas, nas partições dos seus meses
+        with historico.abrir() as conn:
+            historico.gravar_linhas(conn, linhas_dataframe(df.loc[sorted(alterados)], historico.COLUNAS))
+        datas_alteradas = df.loc[sorted(alterados), "Data_Referencia"].unique()
+        kpis.registrar_checklist(df[df["Data_Referencia"].isin(datas_alteradas)])
         st.success("✅ Alterações salvas com sucesso!")
 
     # ===========================
@@ -489,20 +749,15 @@ def pagina_checklist():
     else:
         st.success("Nenhuma observação encontrada. Tudo OK ou VALIDAR!")
 
-def carregar_dados(caminho_excel):
-    if os.path.exists(caminho_excel):
-        return pd.read_excel(caminho_excel)
-    return pd.DataFrame()
-
 def pagina_consorcio():
     st.title("Coletas Consórcio")
 
-    HISTORICO_PATH = "Relatorios_validacao/tabela_consorcio.xlsx"
+    HISTORICO_PATH = ARQUIVO_CONSORCIO
     if not os.path.exists(HISTORICO_PATH):
         st.info("Página em preparação. Arquivo 'Relatorios_validacao/tabela_consorcio.xlsx' não encontrado.")
         return
 
-    df = carregar_dados(HISTORICO_PATH)
+    df, indice = carregar_indexado(HISTORICO_PATH, FILTROS_VALIDACAO)
     if df.empty:
         st.warning("Nenhum dado disponível.")
         return
@@ -515,18 +770,15 @@ def pagina_consorcio():
         c1, c2 = st.columns(2, gap="small")
         filtro_selecionado = {}
 
-        for col, nome, valores in zip([c1, c2], ["Layout", "Empresa"], [df["Layout"], df["dsNomeAssessoria"]]):
+        for col, nome in zip([c1, c2], ["Layout", "Empresa"]):
             with col:
-                unique_vals = sorted(valores.dropna().astype(str).unique())
+                unique_vals = indice[nome].valores
                 with st.expander(nome):
                     selecionados = st.multiselect(nome, unique_vals, default=unique_vals)
                     filtro_selecionado[nome] = selecionados
 
     # Aplica filtros
-    df_filtrado = df[
-        (df["Layout"].astype(str).isin(filtro_selecionado["Layout"])) &
-        (df["dsNomeAssessoria"].astype(str).isin(filtro_selecionado["Empresa"]))
-    ]
+    df_filtrado = aplicar_filtros(df, indice, filtro_selecionado)
 
     st.subheader("Tabela de Coletas (Filtrada)")
     st.dataframe(df_filtrado, width='stretch')
@@ -562,7 +814,7 @@ def pagina_consorcio():
 
     if not df_zeros.empty:
         edited_zeros = st.data_editor(
-            df_zeros[["dsNomeAssessoria", "Layout", "Data_str", "Valor"]].reset_index(drop=True),
+            descompactar_tipos(df_zeros[["dsNomeAssessoria", "Layout", "Data_str", "Valor"]].reset_index(drop=True)),
             width='stretch',
             disabled=[]
         )
@@ -577,12 +829,111 @@ def obter_data_util_hoje(base_date=None) -> datetime:
         data -= timedelta(days=2)  # volta para sexta
     return data
 
+def carregar_historico_hora(data_inicio: str, data_fim: str) -> pd.DataFrame:
+    """Intervalo do agregado horário via cache compartilhado (versão = mtime do banco e dos shards)."""
+    chave = ("historico_hora", data_inicio, data_fim, shards.roteador(DB_PATH).versao())
+    return CACHE.obter(chave, _carregar_historico_hora, data_inicio, data_fim)
+
+def _carregar_historico_hora(data_inicio: str, data_fim: str) -> pd.DataFrame:
+    """
+    Lê do agregado (empresa, data, hora) apenas o intervalo pedido, em todos os
+    shards; o cache persistente de resultados evita repetir a leitura ao reiniciar.
+    """
+    df = shards.roteador(DB_PATH).consultar("""
+        SELECT e.Nome AS Empresa, a.dtDataReferencia AS Data, a.hrHoraInicio AS Hora, a.Qtde
+        FROM Acionamentos_Hora_Agregado a
+        JOIN Dim_Empresa e ON e.IdEmpresa = a.IdEmpresa
+        WHERE a.dtDataReferencia BETWEEN ? AND ?
+    """, (data_inicio, data_fim), tabelas_cache=("Acionamentos_Hora_Agregado", "Dim_Empresa"))
+    df["Data"] = pd.to_datetime(df["Data"])
+    return compactar_tipos(df)
+
+def carregar_baseline_hora() -> pd.DataFrame:
+    """Linhas de base por (empresa, dia da semana, hora) via cache compartilhado."""
+    return CACHE.obter(("baseline_hora", shards.roteador(DB_PATH).versao()), _carregar_baseline_hora)
+
+def _carregar_baseline_hora() -> pd.DataFrame:
+    def ler_shard(caminho) -> pd.DataFrame:
+        with pool_leitura(caminho).conexao() as conn:
+            return carregar_baseline(conn)
+    return pd.concat(shards.roteador(DB_PATH).paralelo(ler_shard), ignore_index=True)
+
+def calcular_tendencia(df_hora: pd.DataFrame) -> pd.DataFrame:
+    """
+    Totais diários por empresa com comparação contra o dia útil anterior e contra
+    o mesmo dia da semana anterior. Tudo vetorizado (groupby/shift/merge).
+    """
+    diario = (
+        df_hora.groupby(["Empresa", "Data"], observed=True, as_index=False)["Qtde"].sum()
+        .sort_values(["Empresa", "Data"])
+    )
+    diario["Qtde"] = diario["Qtde"].astype("int64")
+    diario["Qtde_Dia_Anterior"] = diario.groupby("Empresa", observed=True)["Qtde"].shift(1)
+
+    semana_anterior = diario[["Empresa", "Data", "Qtde"]].rename(columns={"Qtde": "Qtde_Semana_Anterior"})
+    semana_anterior["Data"] = semana_anterior["Data"] + pd.Timedelta(days=7)
+    diario = diario.merge(semana_anterior, on=["Empresa", "Data"], how="left")
+
+    diario["Var_Dia_%"] = (diario["Qtde"] / diario["Qtde_Dia_Anterior"] - 1) * 100
+    diario["Var_Semana_%"] = (diario["Qtde"] / diario["Qtde_Semana_Anterior"] - 1) * 100
+    return diario.replace([np.inf, -np.inf], np.nan).round({"Var_Dia_%": 1, "Var_Semana_%": 1})
+
+def pagina_hora_historico():
+    st.subheader("Histórico Hora a Hora")
+
+    hoje = obter_data_util_hoje().date()
+    periodo = st.date_input("Período", value=(hoje - timedelta(days=30), hoje), key="hora_periodo")
+    if not isinstance(periodo, (tuple, list)) or len(periodo) != 2:
+        st.info("Selecione a data inicial e a data final.")
+        return
+    data_inicio, data_fim = periodo
+
+    # Busca 7 dias antes do início para comparar com o mesmo dia da semana anterior
+    try:
+        df = carregar_historico_hora(
+            (data_inicio - timedelta(days=7)).strftime("%Y-%m-%d"),
+            data_fim.strftime("%Y-%m-%d")
+        )
+    except sqlite3.OperationalError:
+        st.info("Agregado horário não encontrado. Execute 'coleta-hora.py' para gerá-lo.")
+        return
+    if df.empty:
+        st.warning("Nenhum acionamento no período selecionado.")
+        return
+
+    empresas = list(df["Empresa"].cat.categories)
+    with st.expander("Empresa"):
+        selecionadas = st.multiselect("Empresa", empresas, default=empresas, key="hora_hist_empresa")
+    df = df[df["Empresa"].isin(selecionadas)]
+
+    tendencia = calcular_tendencia(df)
+    tendencia = tendencia[tendencia["Data"] >= pd.Timestamp(data_inicio)]
+    df = df[df["Data"] >= pd.Timestamp(data_inicio)]
+
+    st.subheader("Total diário por empresa")
+    st.line_chart(tendencia.pivot(index="Data", columns="Empresa", values="Qtde"))
+
+    st.subheader("Comparativos (dia anterior e mesmo dia da semana anterior)")
+    st.dataframe(
+        tendencia.assign(Data=tendencia["Data"].dt.date).sort_values(["Data", "Empresa"], ascending=[False, True]),
+        width='stretch'
+    )
+
+    st.subheader("Perfil médio por hora")
+    perfil = df.pivot_table(index="Empresa", columns="Hora", values="Qtde", aggfunc="mean", observed=True)
+    st.dataframe(perfil.round(1), width='stretch')
+
 def pagina_hora():
     st.title("Hora a Hora")
 
+    modo = st.radio("Modo", ["Hoje", "Histórico"], horizontal=True, key="hora_modo")
+    if modo == "Histórico":
+        pagina_hora_historico()
+        return
+
     # Obtém a data de hoje como string YYYY-MM-DD
     hoje = obter_data_util_hoje().strftime("%Y-%m-%d")
-    arquivo_excel = Path(f"./Relatorios_hora/Acionamentos_hora_{hoje}.xlsx")
+    arquivo_excel = Path(arquivo_hora(hoje))
     
     if not arquivo_excel.exists():
         st.info(f"Arquivo do dia {hoje} não encontrado: {arquivo_excel}")
@@ -590,15 +941,12 @@ def pagina_hora():
 
     st.success(f"Arquivo encontrado: {arquivo_excel}")
 
-    # Carrega os dados
-    df = pd.read_excel(arquivo_excel)
+    # Carrega os dados (nomes de colunas já normalizados no loader)
+    df, indice = carregar_indexado(str(arquivo_excel), FILTROS_HORA)
     if df.empty:
         st.warning("Nenhum dado disponível na planilha de hoje.")
         return
 
-    # Normaliza nomes de colunas
-    df.columns = df.columns.str.strip()
-
     # ===========================
     # Filtros dinâmicos
     # ===========================
@@ -608,7 +956,7 @@ def pagina_hora():
     # Filtro Empresa
     c1, c2 = st.columns(2, gap="small")
     with c1:
-        unique_empresas = sorted(df["Empresa"].dropna().astype(str).unique())
+        unique_empresas = indice["Empresa"].valores
         with st.expander("Empresa"):
             selecionados = st.multiselect("Empresa", unique_empresas, default=unique_empresas)
             filtro_selecionado["Empresa"] = selecionados
@@ -623,7 +971,7 @@ def pagina_hora():
     # ===========================
     # Monta DataFrame filtrado
     # ===========================
-    df_filtrado = df[df["Empresa"].astype(str).isin(filtro_selecionado["Empresa"])]
+    df_filtrado = aplicar_filtros(df, indice, {"Empresa": filtro_selecionado["Empresa"]})
     
     # Seleciona apenas as colunas de hora escolhidas
     df_filtrado = df_filtrado[["Empresa"] + filtro_selecionado["Hora"]]
@@ -632,36 +980,46 @@ def pagina_hora():
     st.dataframe(df_filtrado, width='stretch')
 
     # ===========================
-    # Pendências (Qtde igual a 0)
+    # Pendências (quedas significativas)
     # ===========================
-    st.subheader("Pendências (Qtde = 0)")
-    # Aqui assumindo que cada coluna de hora é uma quantidade
+    st.subheader("Pendências (Quedas Significativas)")
+    try:
+        baseline = carregar_baseline_hora()
+    except sqlite3.OperationalError:
+        baseline = pd.DataFrame()
+    if baseline.empty:
+        st.info("Linha de base horária ainda não calculada. Execute 'coleta-hora.py'.")
+        return
+
+    # Horas da hora corrente em diante ainda estão abertas e não são avaliadas
+    hora_limite = datetime.now().strftime("%H:00") if hoje == datetime.now().strftime("%Y-%m-%d") else None
     colunas_qtde = [col for col in df_filtrado.columns if col != "Empresa"]
-    df_zeros = df_filtrado[df_filtrado[colunas_qtde].eq(0).any(axis=1)]
-    
-    if not df_zeros.empty:
-        edited_zeros = st.data_editor(
-            df_zeros.reset_index(drop=True),
-            width='stretch',
-            disabled=[]
+    # O coleta-hora acrescenta um retrato por empresa a cada execução: só o último é avaliado
+    # (mesmo critério de kpis.registrar_horas)
+    ultimo_retrato = df_filtrado.drop_duplicates("Empresa", keep="last")
+    observado = ultimo_retrato.melt(id_vars="Empresa", value_vars=colunas_qtde, var_name="Hora", value_name="Qtde")
+    observado["Data"] = hoje
+    quedas = detectar_quedas(observado, baseline, hora_limite)
+    quedas = quedas[quedas["Queda"]]
+
+    if not quedas.empty:
+        st.dataframe(
+            quedas[["Empresa", "Hora", "Qtde", "Media", "Z", "Amostras"]]
+            .round({"Media": 1}).reset_index(drop=True),
+            width='stretch'
         )
     else:
-        st.success("Tudo certo! Nenhum valor zero encontrado.")
-
-def carregar_dados(caminho_excel):
-    if os.path.exists(caminho_excel):
-        return pd.read_excel(caminho_excel)
-    return pd.DataFrame()
+        st.success("Tudo certo! Nenhuma queda significativa em relação à linha de base.")
 
 def pagina_coleta():
     st.title("Coletas Bancárias")
 
-    HISTORICO_PATH = "Relatorios_validacao/tabela_bancaria_coleta.xlsx"
+    HISTORICO_PATH = ARQUIVO_COLETAS
     if not os.path.exists(HISTORICO_PATH):
         st.info(f"Arquivo '{HISTORICO_PATH}' não encontrado.")
         return
 
-    df = carregar_dados(HISTORICO_PATH)
+    df, indice = carregar_indexado(HISTORICO_PATH, FILTROS_VALIDACAO)
     if df.empty:
         st.warning("Nenhum dado disponível.")
         return
@@ -674,18 +1032,15 @@ def pagina_coleta():
         c1, c2 = st.columns(2, gap="small")
         filtro_selecionado = {}
 
-        for col, nome, valores in zip([c1, c2], ["Layout", "Empresa"], [df["Layout"], df["dsNomeAssessoria"]]):
+        for col, nome in zip([c1, c2], ["Layout", "Empresa"]):
             with col:
-                unique_vals = sorted(valores.dropna().astype(str).unique())
+                unique_vals = indice[nome].valores
                 with st.expander(nome):
                     selecionados = st.multiselect(nome, unique_vals, default=unique_vals)
                     filtro_selecionado[nome] = selecionados
 
     # Aplica filtros
-    df_filtrado = df[
-        (df["Layout"].astype(str).isin(filtro_selecionado["Layout"])) &
-        (df["dsNomeAssessoria"].astype(str).isin(filtro_selecionado["Empresa"]))
-    ]
+    df_filtrado = aplicar_filtros(df, indice, filtro_selecionado)
 
     st.subheader("Tabela de Coletas (Filtrada)")
     st.dataframe(df_filtrado, width='stretch')
@@ -717,7 +1072,7 @@ def pagina_coleta():
 
     if not df_zeros.empty:
         edited_zeros = st.data_editor(
-            df_zeros[["dsNomeAssessoria", "Layout", "Data_str", "Valor"]].reset_index(drop=True),
+            descompactar_tipos(df_zeros[["dsNomeAssessoria", "Layout", "Data_str", "Valor"]].reset_index(drop=True)),
             width='stretch',
             disabled=[]
         )
@@ -734,7 +1089,7 @@ def pagina_coleta():
 
     if not df_ausencias.empty:
         edited_ausencias = st.data_editor(
-            df_ausencias[["dsNomeAssessoria", "Layout", "Data_str", "Valor"]].reset_index(drop=True),
+            descompactar_tipos(df_ausencias[["dsNomeAssessoria", "Layout", "Data_str", "Valor"]].reset_index(drop=True)),
             width='stretch',
             disabled=[]
         )
@@ -746,6 +1101,8 @@ def pagina_coleta():
     # Botão para salvar alterações
     # ===========================
     if st.button("💾 Salvar alterações"):
+        df = descompactar_tipos(df)
+
         # Atualiza df original com valores editados de zeros
         if not edited_zeros.empty:
             for idx, row in edited_zeros.iterrows():
@@ -767,7 +1124,8 @@ def pagina_coleta():
                     df.loc[df_idx, row["Data_str"]] = row["Valor"]
 
         # Salva no Excel
-        df.to_excel(HISTORICO_PATH, index=False)
+        exportar_dataframe(HISTORICO_PATH, df)
+        kpis.registrar_zeros("Coletas", df)
         st.success("✅ Alterações salvas com sucesso!")
 
 
@@ -775,6 +1133,215 @@ def pagina_dts():
     st.title("Coletas DTS")
     st.info("Em desenvolvimento.")
 
+# =========================================================
+#  PRÉ-CARREGAMENTO
+# =========================================================
+# Ordem típica de navegação do operador: pré-carrega a próxima página
+PROXIMA_PAGINA = {
+    "Home": "Checklist",
+    "Checklist": "Consorcio",
+    "Consorcio": "Coletas",
+    "Coletas": "Hora",
+}
+
+def agendar_carga_pagina(pagina: str):
+    """Agenda no cache compartilhado a carga padrão da página; devolve o Future (ou None)."""
+    if pagina == "Checklist":
+        limites = periodo_padrao_checklist()
+        if limites is None:
+            return None
+        _, ultima_data, inicio_padrao = limites
+        return agendar_checklist(inicio_padrao.strftime("%Y-%m-%d"), ultima_data.strftime("%Y-%m-%d"))
+
+    relatorio = relatorio_pagina(pagina)
+    if relatorio is None or not os.path.exists(relatorio[0]):
+        return None
+    return agendar_indexado(*relatorio)
+
+def relatorio_pagina(pagina: str):
+    """(arquivo, colunas de filtro) do relatório padrão da página, ou None."""
+    caminhos = {
+        "Consorcio": (ARQUIVO_CONSORCIO, FILTROS_VALIDACAO),
+        "Coletas": (ARQUIVO_COLETAS, FILTROS_VALIDACAO),
+        "Hora": (arquivo_hora(obter_data_util_hoje().strftime("%Y-%m-%d")), FILTROS_HORA),
+    }
+    return caminhos.get(pagina)
+
+# Aquecimento: carrega as quatro fontes em paralelo na subida do processo (NOC_AQUECER=0 desliga)
+AQUECIMENTO_ATIVO = os.environ.get("NOC_AQUECER", "1") != "0"
+FONTES_AQUECIMENTO = ["Checklist", "Consorcio", "Coletas", "Hora"]
+
+@st.cache_resource(show_spinner=False)
+def aquecer_cache() -> dict:
+    """
+    Executado uma única vez por processo: agenda todas as fontes no pool do cache
+    compartilhado e registra o tempo de cada uma quando termina.
+    """
+    estado = {}
+    for fonte in FONTES_AQUECIMENTO:
+        registro = {"inicio": time.perf_counter(), "fim": None, "futuro": agendar_carga_pagina(fonte)}
+        if registro["futuro"] is not None:
+            registro["futuro"].add_done_callback(
+                lambda _f, r=registro: r.update(fim=time.perf_counter())
+            )
+        estado[fonte] = registro
+    return estado
+
+def _status_fonte(registro: dict) -> str:
+    futuro = registro["futuro"]
+    if futuro is None:
+        return "➖ sem arquivo"
+    if not futuro.done():
+        return f"⏳ {time.perf_counter() - registro['inicio']:.1f}s"
+    if futuro.exception() is not None:
+        return "⚠️ erro"
+    return f"✅ {registro['fim'] - registro['inicio']:.2f}s"
+
+def indicador_aquecimento():
+    """Status de prontidão de cada fonte no sidebar; atualiza sozinho enquanto houver carga pendente."""
+    estado = aquecer_cache()
+    pendente = any(r["futuro"] is not None and not r["futuro"].done() for r in estado.values())
+
+    @st.fragment(run_every=1 if pendente else None)
+    def _painel():
+        linhas = "<br>".join(
+            f"{dict(MENU_ITEMS)[fonte]}: {_status_fonte(registro)}" for fonte, registro in estado.items()
+        )
+        st.markdown(f'<div style="font-size:0.8rem; color:#94a3b8;">{linhas}</div>', unsafe_allow_html=True)
+
+    with st.sidebar:
+        st.markdown('<div class="sidebar-title">Dados</div>', unsafe_allow_html=True)
+        _painel()
+
+# Recoleta sob demanda: coletor (python -m noc collect) que alimenta cada página
+COLETOR_PAGINA = {
+    "Checklist": "checklist",
+    "Consorcio": "consorcio",
+    "Coletas": "bancaria",
+    "Hora": "hora",
+}
+ICONE_TAREFA = {fila.PENDENTE: "🕒", fila.EXECUTANDO: "⏳", fila.CONCLUIDA: "✅", fila.ERRO: "⚠️"}
+
+@st.cache_resource(show_spinner=False)
+def iniciar_fila() -> fila.Fila:
+    """Worker da fila de recoletas: um por processo do servidor, compartilhado pelas sessões."""
+    fila.FILA.iniciar_worker()
+    return fila.FILA
+
+def painel_recoleta():
+    """
+    Enfileira 'recoletar X (para a data Y)' sem bloquear a página; o andamento
+    é atualizado sozinho e, ao terminar uma tarefa acompanhada, a página recarrega
+    (o cache compartilhado detecta os arquivos regravados pelo mtime).
+    """
+    fila_tarefas = iniciar_fila()
+    coletores = list(COLETOR_PAGINA.values())
+    padrao = COLETOR_PAGINA.get(st.session_state.page, coletores[0])
+
+    with st.sidebar:
+        st.markdown('<div class="sidebar-title">Recoleta</div>', unsafe_allow_html=True)
+        coletor = st.selectbox("Coletor", coletores, index=coletores.index(padrao), key="recoleta_coletor")
+        # Bancária e consórcio regravam o relatório atual; checklist e hora aceitam uma data passada
+        data = None
+        if coletor in ("checklist", "hora") and st.checkbox("Reprocessar outra data", key="recoleta_outra_data"):
+            data = st.date_input("Data", value=obter_data_util_anterior().date(),
+                                 max_value=datetime.now().date(), format="DD/MM/YYYY", key="recoleta_data")
+        if st.button("Recoletar", key="recoleta_enfileirar"):
+            id_tarefa = fila_tarefas.enfileirar(coletor, data)
+            st.session_state.setdefault("recoleta_acompanhadas", set()).add(id_tarefa)
+
+    tarefas = fila_tarefas.listar(limite=5)
+    ativa = any(t.ativa for t in tarefas)
+
+    @st.fragment(run_every=2 if ativa else None)
+    def _andamento():
+        tarefas = fila_tarefas.listar(limite=5)
+        acompanhadas = st.session_state.get("recoleta_acompanhadas", set())
+        terminadas = {t.id for t in tarefas if t.id in acompanhadas and not t.ativa}
+        if terminadas:
+            acompanhadas -= terminadas
+            st.rerun(scope="app")
+        if not any(t.ativa for t in tarefas) and ativa:
+            # Tarefa de outra sessão terminou: sai do modo de atualização periódica
+            st.rerun(scope="app")
+        linhas = []
+        for t in tarefas:
+            alvo = f"{t.coletor} {datetime.strptime(t.data, '%Y-%m-%d').strftime('%d/%m')}" if t.data else t.coletor
+            detalhe = t.progresso if t.ativa or t.estado == fila.ERRO else (t.concluida or "")[11:16]
+            linhas.append(f"{ICONE_TAREFA.get(t.estado, '')} {alvo}: {html.escape(detalhe)}")
+        if linhas:
+            st.markdown(f'<div style="font-size:0.75rem; color:#94a3b8;">{"<br>".join(linhas)}</div>',
+                        unsafe_allow_html=True)
+
+    with st.sidebar:
+        _andamento()
+
+# Observação dos relatórios (noc/observador.py): quando um coletor regrava uma
+# fonte, só as entradas dela saem do cache, a nova versão é pré-carregada e as
+# sessões que a exibem recarregam a página
+FONTES_OBSERVADAS = ["Home", *FONTES_AQUECIMENTO]
+
+# As sessões só comparam a geração já atualizada pelo observador; conferir num
+# ritmo mais lento que o da observação poupa reruns do fragmento em cada sessão
+# aberta (o cache já foi invalidado e pré-carregado quando a sessão percebe)
+INTERVALO_AVISO_S = float(os.environ.get("NOC_AVISO_S", 15))
+
+def arquivos_fonte(fonte: str) -> list[str]:
+    if fonte == "Home":
+        return [str(kpis.KPI_DB)]
+    if fonte == "Checklist":
+        return [str(historico.HISTORICO_DB)]
+    caminho = relatorio_pagina(fonte)[0]
+    return [caminho, str(caminho_arrow(Path(caminho)))]
+
+def _entradas_da_fonte(fonte: str):
+    """Predicado das chaves do cache compartilhado que dependem da fonte."""
+    if fonte == "Home":
+        return lambda chave: False
+    if fonte == "Checklist":
+        return lambda chave: chave[0] == "checklist"
+    arquivo = Path(relatorio_pagina(fonte)[0])
+    return lambda chave: chave[0] == "indexado" and Path(chave[1]) == arquivo
+
+def _ao_mudar_fonte(fonte: str):
+    CACHE.invalidar(_entradas_da_fonte(fonte))
+    agendar_carga_pagina(fonte)
+
+@st.cache_resource(show_spinner=False)
+def iniciar_observador() -> Observador:
+    """Observador de arquivos: um por processo do servidor, compartilhado pelas sessões."""
+    OBSERVADOR.ao_mudar(_ao_mudar_fonte)
+    OBSERVADOR.iniciar()
+    return OBSERVADOR
+
+def aviso_atualizacao(pagina: str):
+    """Recarrega a página quando a fonte exibida muda (verificação leve em memória)."""
+    observador = iniciar_observador()
+    if not observador.ativo or pagina not in FONTES_OBSERVADAS:
+        return
+    # O arquivo do Hora muda de nome a cada dia: registrar a cada rerun mantém o atual
+    for fonte in FONTES_OBSERVADAS:
+        observador.observar(fonte, *arquivos_fonte(fonte))
+
+    vistas = st.session_state.setdefault("geracoes_vistas", {})
+    vistas[pagina] = observador.geracao(pagina)
+    if st.session_state.pop("fonte_atualizada", False):
+        st.toast(f"{dict(MENU_ITEMS)[pagina]}: dados atualizados")
+
+    @st.fragment(run_every=max(observador.intervalo_s, INTERVALO_AVISO_S))
+    def _verificar():
+        if observador.geracao(pagina) != vistas.get(pagina):
+            st.session_state.fonte_atualizada = True
+            st.rerun(scope="app")
+
+    _verificar()
+
+def precarregar_proxima(pagina_atual: str):
+    """Dispara em segundo plano a carga da provável próxima página (não bloqueia o rerun)."""
+    proxima = PROXIMA_PAGINA.get(pagina_atual)
+    if proxima:
+        agendar_carga_pagina(proxima)
+
 # =========================================================
 #  EXECUÇÃO
 # =========================================================
@@ -789,8 +1356,16 @@ def main():
     # Menu lateral (botões transparentes, sem bolinha)
     sidebar_menu()
 
+    # Prontidão das fontes carregadas na subida do processo
+    if AQUECIMENTO_ATIVO:
+        indicador_aquecimento()
+
+    # Recoleta em segundo plano (fila local, sem bloquear a página)
+    painel_recoleta()
+
     # Render da página
     page = st.session_state.page
+    aviso_atualizacao(page)
     if page == "Ajuda":
         pagina_help()
     elif page == "Checklist":
@@ -811,5 +1386,8 @@ def main():
     # Footer global
     footer_global()
 
+    # Pré-carrega a página que o operador provavelmente abrirá em seguida
+    precarregar_proxima(page)
+
 if __name__ == "__main__":
     main()
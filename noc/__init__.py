@@ -0,0 +1,3 @@
+"""
+Módulos compartilhados entre os scripts de coleta e o dashboard do NOC.
+"""
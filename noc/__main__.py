@@ -0,0 +1,4 @@
+from noc.cli import main
+
+if __name__ == "__main__":
+    main()
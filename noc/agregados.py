@@ -0,0 +1,185 @@
+"""
+Tabelas de agregados diários mantidas no momento da carga.
+Os coletores liam as tabelas brutas e agregavam a cada execução (SUM de Qtd por
+assessoria/layout/dia, COUNT acumulado por empresa/layout até uma data, SUM de
+Qtde por hora). Aqui esses agregados são recalculados só a partir da menor
+data afetada por uma carga, e o cumulativo do checklist vira uma leitura de
+uma única linha pela chave primária. Empresas e layouts são guardados pelas
+chaves inteiras de Dim_Empresa e Dim_Layout (noc/dimensoes.py). Com shards
+(noc/shards.py), o cumulativo do checklist fica no catálogo e os agregados por
+empresa ficam no shard de cada empresa.
+"""
+
+import sqlite3
+from typing import Iterable
+
+from noc import dimensoes, shards
+
+# ==========================
+# Manutenção
+# ==========================
+
+def atualizar_consolidado_diario(conn: sqlite3.Connection, desde: str = "0000-00-00") -> int:
+    """Recalcula Consolidado_Diario (SUM(Qtd) por dia, layout e assessoria) a partir de 'desde'."""
+    conn.execute("DELETE FROM Consolidado_Diario WHERE dtDataReferencia >= ?", (desde,))
+    cursor = conn.execute("""
+        INSERT INTO Consolidado_Diario (dtDataReferencia, IdLayout, IdEmpresa, Qtd)
+        SELECT h.dtDataReferencia, l.IdLayout, e.IdEmpresa, SUM(h.Qtd)
+        FROM __Consolidado_Hist h
+        JOIN Dim_Layout l ON l.Nome = h.Layout
+        JOIN Dim_Empresa e ON e.Nome = h.dsNomeAssessoria
+        WHERE h.dtDataReferencia >= ?
+        GROUP BY h.dtDataReferencia, l.IdLayout, e.IdEmpresa
+    """, (desde,))
+    return cursor.rowcount
+
+
+def atualizar_cumulativo(conn: sqlite3.Connection, desde: str = "0000-00-00") -> int:
+    """
+    Recalcula Auditoria_Cumulativo_Diario a partir de 'desde': contagem do dia e
+    total acumulado, partindo do último acumulado anterior a 'desde'.
+    """
+    conn.execute("DELETE FROM Auditoria_Cumulativo_Diario WHERE dtDataReferencia >= ?", (desde,))
+    cursor = conn.execute("""
+        INSERT INTO Auditoria_Cumulativo_Diario (IdCompany, IdLayout, dtDataReferencia, Qtd, Cumulativo)
+        SELECT d.IdCompany, d.IdLayout, d.dtDataReferencia, d.Qtd,
+               COALESCE((
+                   SELECT c.Cumulativo FROM Auditoria_Cumulativo_Diario c
+                   WHERE c.IdCompany = d.IdCompany AND c.IdLayout = d.IdLayout AND c.dtDataReferencia < :desde
+                   ORDER BY c.dtDataReferencia DESC LIMIT 1
+               ), 0) + SUM(d.Qtd) OVER (PARTITION BY d.IdCompany, d.IdLayout ORDER BY d.dtDataReferencia)
+        FROM (
+            SELECT a.IdCompany, l.IdLayout, a.dtDataReferencia, COUNT(*) AS Qtd
+            FROM Auditoria_LayoutNew a
+            JOIN Dim_Layout l ON l.Nome = a.Layout
+            WHERE a.dtDataReferencia >= :desde
+            GROUP BY a.IdCompany, l.IdLayout, a.dtDataReferencia
+        ) d
+    """, {"desde": desde})
+    return cursor.rowcount
+
+
+def atualizar_hora(conn: sqlite3.Connection, id_empresa: int, empresa: str, desde: str | None = None) -> int:
+    """
+    Atualiza Acionamentos_Hora_Agregado para a empresa a partir de 'desde'.
+    Sem 'desde', recalcula só a partir do último dia já agregado (o dia
+    corrente continua crescendo); na primeira execução agrega todo o histórico.
+    """
+    if desde is None:
+        desde = conn.execute(
+            "SELECT MAX(dtDataReferencia) FROM Acionamentos_Hora_Agregado WHERE IdEmpresa = ?",
+            (id_empresa,)
+        ).fetchone()[0] or "0000-00-00"
+    cursor = conn.execute(f"""
+        INSERT OR REPLACE INTO Acionamentos_Hora_Agregado (IdEmpresa, dtDataReferencia, hrHoraInicio, Qtde)
+        SELECT ?, dtDataReferencia, hrHoraInicio, SUM(Qtde)
+        FROM __{empresa}_input_Acionamentos
+        WHERE dtDataReferencia >= ?
+        GROUP BY dtDataReferencia, hrHoraInicio
+    """, (id_empresa, desde))
+    return cursor.rowcount
+
+
+def atualizar_todos(conn: sqlite3.Connection, desde: str = "0000-00-00") -> dict[str, int]:
+    """
+    Atualiza as dimensões e recalcula todos os agregados a partir de 'desde'
+    (menor data carregada); sem 'desde', reconstrói tudo. 'conn' é o catálogo;
+    os agregados por empresa são recalculados em cada shard, em paralelo.
+    """
+    dimensoes.atualizar(conn, desde)
+    cumulativo = atualizar_cumulativo(conn, desde)
+    conn.commit()
+
+    rot = shards.roteador_de(conn)
+    dims = dimensoes.exportar(conn)
+    por_shard = rot.agrupar(dimensoes.empresas_hora(conn))
+
+    def atualizar_shard(caminho) -> tuple[int, int]:
+        shard = sqlite3.connect(caminho) if rot.fragmentado else conn
+        try:
+            if rot.fragmentado:
+                dimensoes.replicar(shard, dims)
+            consolidado = atualizar_consolidado_diario(shard, desde)
+            hora = sum(atualizar_hora(shard, id_empresa, empresa, desde)
+                       for id_empresa, empresa in por_shard.get(caminho, []))
+            shard.commit()
+            return consolidado, hora
+        finally:
+            if rot.fragmentado:
+                shard.close()
+
+    resultados = rot.paralelo(atualizar_shard)
+    return {
+        "Consolidado_Diario": sum(r[0] for r in resultados),
+        "Auditoria_Cumulativo_Diario": cumulativo,
+        "Acionamentos_Hora_Agregado": sum(r[1] for r in resultados),
+    }
+
+
+def vazios(conn: sqlite3.Connection) -> bool:
+    """True se há dados brutos mas os agregados diários ainda não foram construídos (em algum shard)."""
+    rot = shards.roteador_de(conn)
+    conexoes = shards.conectar_shards(rot, conn)
+    try:
+        for shard in conexoes.values():
+            tem_bruto = shard.execute("SELECT EXISTS (SELECT 1 FROM __Consolidado_Hist)").fetchone()[0]
+            tem_agregado = shard.execute("SELECT EXISTS (SELECT 1 FROM Consolidado_Diario)").fetchone()[0]
+            if tem_bruto and not tem_agregado:
+                return True
+        return False
+    finally:
+        if rot.fragmentado:
+            for shard in conexoes.values():
+                shard.close()
+
+# ==========================
+# Consulta
+# ==========================
+
+def cumulativo_ate(conn: sqlite3.Connection, id_company: int, layout: str, data_iso: str) -> int:
+    """Total acumulado de Auditoria_LayoutNew até a data (uma linha lida pela chave primária)."""
+    linha = conn.execute("""
+        SELECT c.Cumulativo FROM Auditoria_Cumulativo_Diario c
+        JOIN Dim_Layout l ON l.IdLayout = c.IdLayout
+        WHERE c.IdCompany = ? AND l.Nome = ? AND c.dtDataReferencia <= ?
+        ORDER BY c.dtDataReferencia DESC LIMIT 1
+    """, (id_company, layout, data_iso)).fetchone()
+    return linha[0] if linha else 0
+
+
+def cumulativos_em(conn: sqlite3.Connection, datas: Iterable[str]) -> dict[tuple[str, int, str], int]:
+    """
+    Total acumulado por (data, IdCompany, layout) em cada uma das 'datas', numa
+    única leitura: as linhas do período mais a última anterior a ele, resolvidas
+    por data em memória (mesmo resultado de cumulativo_ate para cada combinação;
+    combinações sem linha ficam de fora e valem 0).
+    """
+    datas = sorted(set(datas))
+    if not datas:
+        return {}
+    linhas = conn.execute("""
+        SELECT c.IdCompany, l.Nome, c.dtDataReferencia, c.Cumulativo
+        FROM Auditoria_Cumulativo_Diario c
+        JOIN Dim_Layout l ON l.IdLayout = c.IdLayout
+        WHERE c.dtDataReferencia BETWEEN ? AND ?
+        UNION ALL
+        SELECT c.IdCompany, l.Nome, MAX(c.dtDataReferencia), c.Cumulativo
+        FROM Auditoria_Cumulativo_Diario c
+        JOIN Dim_Layout l ON l.IdLayout = c.IdLayout
+        WHERE c.dtDataReferencia < ?
+        GROUP BY c.IdCompany, c.IdLayout
+    """, (datas[0], datas[-1], datas[0]))
+    series: dict[tuple[int, str], list[tuple[str, int]]] = {}
+    for id_company, layout, data, cumulativo in linhas:
+        series.setdefault((id_company, layout), []).append((data, cumulativo))
+
+    cumulativos = {}
+    for (id_company, layout), serie in series.items():
+        serie.sort()
+        i, atual = 0, 0
+        for data in datas:
+            while i < len(serie) and serie[i][0] <= data:
+                atual = serie[i][1]
+                i += 1
+            cumulativos[(data, id_company, layout)] = atual
+    return cumulativos
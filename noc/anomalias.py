@@ -0,0 +1,112 @@
+"""
+Detecção de quedas nos acionamentos horários.
+Mantém linhas de base (média e variância exponenciais) por empresa, dia da semana
+e hora, atualizadas incrementalmente a cada dia fechado, e sinaliza quedas
+estatisticamente significativas de forma vetorizada para todas as empresas.
+"""
+
+import logging
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+# ==========================
+# Parâmetros da detecção
+# ==========================
+
+ALFA = 0.2           # peso da observação mais recente (~ últimas 9 semanas)
+Z_LIMITE = 3.0       # desvios abaixo da média para considerar queda
+MIN_AMOSTRAS = 3     # semanas mínimas de histórico antes de sinalizar
+CHAVE = ["Empresa", "DiaSemana", "Hora"]
+
+# ==========================
+# Linha de base
+# ==========================
+
+def carregar_baseline(conn: sqlite3.Connection) -> pd.DataFrame:
+    """Lê a tabela de linhas de base (uma linha por empresa, dia da semana e hora)."""
+    return pd.read_sql("""
+        SELECT e.Nome AS Empresa, b.DiaSemana, b.hrHoraInicio AS Hora, b.Media, b.Variancia, b.Amostras, b.UltimoDia
+        FROM Acionamentos_Hora_Baseline b
+        JOIN Dim_Empresa e ON e.IdEmpresa = b.IdEmpresa
+    """, conn).astype({"DiaSemana": "int64", "Media": float, "Variancia": float, "Amostras": "int64"})
+
+
+def _incorporar_dia(baseline: pd.DataFrame, obs: pd.DataFrame, data: str) -> pd.DataFrame:
+    """Aplica a atualização exponencial de um dia inteiro, para todas as chaves de uma vez."""
+    df = baseline.merge(obs[CHAVE + ["Qtde"]], on=CHAVE, how="outer")
+    observado = df["Qtde"].notna()
+    novo = observado & df["Media"].isna()
+    atualizar = observado & ~novo
+
+    delta = df["Qtde"] - df["Media"]
+    df.loc[atualizar, "Variancia"] = (1 - ALFA) * (df["Variancia"] + ALFA * delta ** 2)
+    df.loc[atualizar, "Media"] = df["Media"] + ALFA * delta
+    df.loc[atualizar, "Amostras"] = df["Amostras"] + 1
+
+    df.loc[novo, "Media"] = df["Qtde"]
+    df.loc[novo, "Variancia"] = 0.0
+    df.loc[novo, "Amostras"] = 1
+    df.loc[observado, "UltimoDia"] = data
+    return df.drop(columns="Qtde")
+
+
+def atualizar_baseline(conn: sqlite3.Connection, ate_data: str) -> int:
+    """
+    Incorpora à linha de base os dias fechados (anteriores a 'ate_data') do
+    Acionamentos_Hora_Agregado que ainda não foram processados para cada empresa.
+    Retorna a quantidade de dias incorporados.
+    """
+    baseline = carregar_baseline(conn)
+    novos = pd.read_sql("""
+        SELECT e.Nome AS Empresa, a.dtDataReferencia AS Data, a.hrHoraInicio AS Hora, a.Qtde
+        FROM Acionamentos_Hora_Agregado a
+        JOIN Dim_Empresa e ON e.IdEmpresa = a.IdEmpresa
+        WHERE a.dtDataReferencia < ?
+    """, conn, params=(ate_data,))
+
+    # Marca d'água por empresa: só entram dias posteriores ao último já processado
+    marca = baseline.groupby("Empresa")["UltimoDia"].max()
+    novos = novos[novos["Data"] > novos["Empresa"].map(marca).fillna("")]
+    if novos.empty:
+        return 0
+
+    novos["DiaSemana"] = pd.to_datetime(novos["Data"]).dt.weekday
+    for data, obs in novos.groupby("Data", sort=True):
+        baseline = _incorporar_dia(baseline, obs, data)
+
+    baseline["Amostras"] = baseline["Amostras"].astype(int)
+    baseline["DiaSemana"] = baseline["DiaSemana"].astype(int)
+    conn.executemany("""
+        INSERT OR REPLACE INTO Acionamentos_Hora_Baseline
+        (IdEmpresa, DiaSemana, hrHoraInicio, Media, Variancia, Amostras, UltimoDia)
+        VALUES ((SELECT IdEmpresa FROM Dim_Empresa WHERE Nome = ?), ?, ?, ?, ?, ?, ?)
+    """, baseline[CHAVE + ["Media", "Variancia", "Amostras", "UltimoDia"]].itertuples(index=False, name=None))
+    conn.commit()
+
+    dias = novos["Data"].nunique()
+    logging.info(f"Linha de base horária atualizada com {dias} dia(s).")
+    return dias
+
+# ==========================
+# Detecção
+# ==========================
+
+def detectar_quedas(observado: pd.DataFrame, baseline: pd.DataFrame, hora_limite: str | None = None) -> pd.DataFrame:
+    """
+    Compara cada (Empresa, Data, Hora, Qtde) com a linha de base do mesmo dia da
+    semana e hora. O desvio tem piso de Poisson (raiz da média, mínimo 1) para que
+    contagens pequenas ou estáveis não gerem alarmes. Horas >= 'hora_limite'
+    (hora corrente, ainda aberta) nunca são sinalizadas.
+    """
+    df = observado.assign(DiaSemana=pd.to_datetime(observado["Data"]).dt.weekday)
+    df["Empresa"] = df["Empresa"].astype(str)
+    df = df.merge(baseline[CHAVE + ["Media", "Variancia", "Amostras"]], on=CHAVE, how="left")
+
+    desvio = np.sqrt(np.maximum(df["Variancia"], df["Media"]).clip(lower=1.0))
+    df["Z"] = ((df["Qtde"] - df["Media"]) / desvio).round(2)
+    df["Queda"] = (df["Amostras"].fillna(0) >= MIN_AMOSTRAS) & (df["Z"] <= -Z_LIMITE)
+    if hora_limite is not None:
+        df["Queda"] &= df["Hora"] < hora_limite
+    return df.drop(columns=["DiaSemana", "Variancia"])
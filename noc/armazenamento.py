@@ -0,0 +1,236 @@
+"""
+Backends de armazenamento para as consultas analíticas dos coletores.
+O SQLite (banco_exp.sqlite) continua sendo o banco de carga: Criar_db.py,
+consolida-dados.py e os agregados gravam nele. As leituras analíticas
+(pivot por data de coleta-bancaria e coleta-consorcio) passam por um backend
+escolhido em NOC_BACKEND:
+
+- "sqlite" (padrão): pivot no próprio SQLite sobre o agregado diário, com
+  json_group_object (um objeto data -> Qtd por assessoria × layout);
+- "duckdb": mantém uma réplica colunar local (<banco>.duckdb) do agregado
+  diário e das dimensões, sincronizada quando o SQLite muda, e faz o pivot
+  no motor (PIVOT do DuckDB).
+
+Os pivots ficam no cache persistente de resultados (noc/resultados.py), com
+chave independente do backend: o mesmo pivot é calculado uma vez por mudança
+nos dados, por qualquer coletor ou pelo dashboard.
+
+duckdb é dependência opcional: só é importado quando o backend é escolhido.
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+from noc import dimensoes, resultados, shards
+from noc.conexao import conectar_leitura
+
+# ==========================
+# Configurações
+# ==========================
+
+BASE_DIR = Path(getattr(sys, "_MEIPASS", Path(__file__).resolve().parent.parent))
+DB_PATH = BASE_DIR / "banco_exp.sqlite"
+
+BACKEND = os.environ.get("NOC_BACKEND", "sqlite").lower()
+
+# Tabelas copiadas para a réplica DuckDB
+TABELAS_REPLICA = ("Dim_Empresa", "Dim_Layout", "Consolidado_Diario")
+
+# Agregado diário com nomes e grupos de empresa/layout (mesma SQL nos dois motores)
+CONSOLIDADO = """
+    SELECT c.dtDataReferencia, e.Nome AS dsNomeAssessoria, l.Nome AS Layout, c.Qtd,
+           e.Grupo AS GrupoEmpresa, l.Grupo AS GrupoLayout
+    FROM Consolidado_Diario c
+    JOIN Dim_Layout l ON l.IdLayout = c.IdLayout
+    JOIN Dim_Empresa e ON e.IdEmpresa = c.IdEmpresa
+"""
+INDICE_PIVOT = ["dsNomeAssessoria", "Layout"]
+
+
+def _filtro(data_inicio: str | None, data_fim: str | None,
+            grupo_empresa: str | None, grupo_layout: str | None) -> tuple[str, list]:
+    """Cláusula WHERE (com parâmetros) comum aos backends."""
+    condicoes, params = [], []
+    for sql, valor in (("dtDataReferencia >= ?", data_inicio), ("dtDataReferencia <= ?", data_fim),
+                       ("GrupoEmpresa = ?", grupo_empresa), ("GrupoLayout = ?", grupo_layout)):
+        if valor is not None:
+            condicoes.append(sql)
+            params.append(valor)
+    return (" WHERE " + " AND ".join(condicoes) if condicoes else ""), params
+
+
+def pivotar(df: pd.DataFrame) -> pd.DataFrame:
+    """Pivot no pandas das linhas (dtDataReferencia, dsNomeAssessoria, Layout, Qtd)."""
+    if df.empty:
+        return pd.DataFrame()
+    tabela = df.pivot_table(
+        index=INDICE_PIVOT, columns="dtDataReferencia", values="Qtd", aggfunc="sum"
+    ).fillna(0).astype(int)
+    tabela.columns.name = None
+    return tabela.reset_index()
+
+# ==========================
+# Backends
+# ==========================
+
+class Armazenamento:
+    """Interface comum: consulta SQL e pivot assessoria × layout por data."""
+
+    nome = ""
+
+    def __init__(self, caminho: Path = DB_PATH):
+        self.caminho = Path(caminho)
+
+    def consultar(self, sql: str, params: list | tuple = ()) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def consolidado(self, data_inicio: str | None = None, data_fim: str | None = None,
+                    grupo_empresa: str | None = None, grupo_layout: str | None = None) -> pd.DataFrame:
+        """Linhas (dtDataReferencia, dsNomeAssessoria, Layout, Qtd) do agregado diário no filtro."""
+        where, params = _filtro(data_inicio, data_fim, grupo_empresa, grupo_layout)
+        return self.consultar(f"SELECT dtDataReferencia, dsNomeAssessoria, Layout, Qtd FROM ({CONSOLIDADO}){where}", params)
+
+    def pivot_diario(self, data_inicio: str | None = None, data_fim: str | None = None,
+                     grupo_empresa: str | None = None, grupo_layout: str | None = None) -> pd.DataFrame:
+        """
+        Linhas = (dsNomeAssessoria, Layout); colunas = datas; valores = SUM(Qtd),
+        com zero onde não há dado. Servido do cache de resultados enquanto o
+        agregado diário e as dimensões não mudarem; senão calculado pelo backend.
+        """
+        where, params = _filtro(data_inicio, data_fim, grupo_empresa, grupo_layout)
+        fontes = {caminho: TABELAS_REPLICA for caminho in shards.roteador(self.caminho).caminhos()}
+        return resultados.CACHE.obter(
+            f"pivot_diario {CONSOLIDADO}{where}", params, fontes,
+            lambda: self._pivot_diario(data_inicio, data_fim, grupo_empresa, grupo_layout)
+        )
+
+    def _pivot_diario(self, data_inicio: str | None, data_fim: str | None,
+                      grupo_empresa: str | None, grupo_layout: str | None) -> pd.DataFrame:
+        """Implementação padrão: pivot no pandas."""
+        return pivotar(self.consolidado(data_inicio, data_fim, grupo_empresa, grupo_layout))
+
+    def fechar(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.fechar()
+
+
+class ArmazenamentoSQLite(Armazenamento):
+    """Consultas distribuídas entre os shards (noc/shards.py) e concatenadas."""
+
+    nome = "sqlite"
+
+    def __init__(self, caminho: Path = DB_PATH):
+        super().__init__(caminho)
+        self._roteador = shards.roteador(caminho)
+
+    def consultar(self, sql: str, params: list | tuple = ()) -> pd.DataFrame:
+        return self._roteador.consultar(sql, params)
+
+    def _pivot_diario(self, data_inicio: str | None, data_fim: str | None,
+                      grupo_empresa: str | None, grupo_layout: str | None) -> pd.DataFrame:
+        """
+        Pivot no banco: o GROUP BY devolve uma linha por assessoria × layout com as
+        quantidades do período num objeto JSON {data: Qtd}, que só é expandido em
+        colunas no Python. Transfere (assessoria × layout) linhas em vez de uma por dia.
+        A chave primária do agregado garante uma única Qtd por data em cada objeto,
+        e cada empresa está em um único shard, então as partes só são concatenadas.
+        """
+        where, params = _filtro(data_inicio, data_fim, grupo_empresa, grupo_layout)
+        df = self.consultar(f"""
+            SELECT dsNomeAssessoria, Layout, json_group_object(dtDataReferencia, Qtd) AS Valores
+            FROM ({CONSOLIDADO}){where}
+            GROUP BY dsNomeAssessoria, Layout
+        """, params)
+        if df.empty:
+            return df
+        df = df.sort_values(INDICE_PIVOT, ignore_index=True)
+        valores = pd.DataFrame.from_records([json.loads(v) for v in df.pop("Valores")])
+        valores = valores[sorted(valores.columns)].fillna(0).astype(int)
+        return pd.concat([df, valores], axis=1)
+
+class ArmazenamentoDuckDB(Armazenamento):
+    """
+    Réplica colunar em DuckDB; sincroniza do SQLite quando a versão (mtime do
+    catálogo e shards) muda, só na primeira consulta (acertos no cache de
+    resultados não precisam da réplica).
+    """
+
+    nome = "duckdb"
+
+    def __init__(self, caminho: Path = DB_PATH):
+        import duckdb
+
+        super().__init__(caminho)
+        self._conn = duckdb.connect(str(Path(caminho).with_suffix(".duckdb")))
+        self._sincronizado = False
+
+    def _replica(self):
+        if not self._sincronizado:
+            self._sincronizar(self.caminho)
+            self._sincronizado = True
+        return self._conn
+
+    def _sincronizar(self, origem: Path) -> None:
+        roteador = shards.roteador(origem)
+        versao = roteador.versao()
+        self._conn.execute("CREATE TABLE IF NOT EXISTS Replica_Versao (Versao BIGINT)")
+        atual = self._conn.execute("SELECT MAX(Versao) FROM Replica_Versao").fetchone()[0]
+        if atual == versao:
+            return
+        with conectar_leitura(origem) as catalogo:
+            for tabela in TABELAS_REPLICA:
+                # Dimensões vêm do catálogo; o agregado, de todos os shards
+                if tabela in dimensoes.TABELAS:
+                    df = pd.read_sql(f"SELECT * FROM {tabela}", catalogo)
+                else:
+                    df = roteador.consultar(f"SELECT * FROM {tabela}")
+                self._conn.register("origem_df", df)
+                self._conn.execute(f"CREATE OR REPLACE TABLE {tabela} AS SELECT * FROM origem_df")
+                self._conn.unregister("origem_df")
+        self._conn.execute("DELETE FROM Replica_Versao")
+        self._conn.execute("INSERT INTO Replica_Versao VALUES (?)", [versao])
+
+    def consultar(self, sql: str, params: list | tuple = ()) -> pd.DataFrame:
+        return self._replica().execute(sql, list(params)).df()
+
+    def _pivot_diario(self, data_inicio: str | None, data_fim: str | None,
+                      grupo_empresa: str | None, grupo_layout: str | None) -> pd.DataFrame:
+        """Pivot no motor: o PIVOT do DuckDB exige os valores (datas) explícitos quando há parâmetros."""
+        where, params = _filtro(data_inicio, data_fim, grupo_empresa, grupo_layout)
+        fonte = f"SELECT dtDataReferencia, dsNomeAssessoria, Layout, Qtd FROM ({CONSOLIDADO}){where}"
+        datas = [d for (d,) in self._replica().execute(
+            f"SELECT DISTINCT dtDataReferencia FROM ({fonte}) ORDER BY 1", params
+        ).fetchall()]
+        if not datas:
+            return pd.DataFrame()
+        valores = ", ".join("'" + str(d).replace("'", "''") + "'" for d in datas)
+        tabela = self._conn.execute(f"""
+            PIVOT ({fonte}) ON dtDataReferencia IN ({valores}) USING SUM(Qtd)
+            GROUP BY dsNomeAssessoria, Layout ORDER BY dsNomeAssessoria, Layout
+        """, params).df()
+        colunas = [str(d) for d in datas]
+        tabela[colunas] = tabela[colunas].fillna(0).astype(int)
+        return tabela
+
+    def fechar(self) -> None:
+        self._conn.close()
+
+
+BACKENDS = {"sqlite": ArmazenamentoSQLite, "duckdb": ArmazenamentoDuckDB}
+
+
+def abrir(backend: str | None = None, caminho: Path = DB_PATH) -> Armazenamento:
+    """Abre o backend configurado (NOC_BACKEND) ou o informado, sobre o banco SQLite 'caminho'."""
+    backend = (backend or BACKEND).lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend de armazenamento desconhecido: {backend!r} (opções: {', '.join(BACKENDS)})")
+    return BACKENDS[backend](caminho)
@@ -0,0 +1,96 @@
+"""
+Detecção de mudanças nas fontes dos coletores.
+A assinatura de uma execução reúne, para cada tabela de entrada, o maior rowid
+e a contagem de linhas (no catálogo e em cada shard), mais os parâmetros da
+execução (datas, hora de referência). Ela é gravada em JSON ao lado das saídas;
+na execução seguinte, se a assinatura for a mesma e as saídas existirem, o
+coletor termina sem refazer o trabalho (--force ignora a assinatura).
+
+O PRAGMA data_version não serve para isso: só é comparável dentro da mesma
+conexão, e cada coletor roda num processo novo. Por tabela (e não pelo arquivo
+inteiro), a gravação dos agregados horários pelo coleta-hora.py não invalida
+as saídas dos outros coletores.
+"""
+
+import json
+import logging
+import sqlite3
+from pathlib import Path
+from typing import Iterable
+
+from noc import shards
+from noc.conexao import conectar_leitura
+
+# ==========================
+# Assinatura
+# ==========================
+
+def estado_tabela(conn: sqlite3.Connection, tabela: str) -> list | None:
+    """
+    [maior rowid, linhas] da tabela; None se ela não existe no arquivo.
+    Tabelas WITHOUT ROWID (agregados) são regravadas no lugar (INSERT OR
+    REPLACE, DELETE + INSERT): no lugar do rowid entram as somas das colunas
+    numéricas fora da chave, que mudam quando os valores mudam.
+    """
+    existe = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (tabela,)).fetchone()
+    if not existe:
+        return None
+    try:
+        return list(conn.execute(f'SELECT MAX(rowid), COUNT(*) FROM "{tabela}"').fetchone())
+    except sqlite3.OperationalError:
+        numericas = [nome for _, nome, tipo, _, _, pk in conn.execute(f'PRAGMA table_info("{tabela}")')
+                     if not pk and tipo.upper() in ("INTEGER", "REAL")]
+        somas = "".join(f', TOTAL("{coluna}")' for coluna in numericas)
+        return list(conn.execute(f'SELECT COUNT(*){somas} FROM "{tabela}"').fetchone())
+
+
+def calcular(catalogo: Path, tabelas_catalogo: Iterable[str] = (), tabelas_shards: Iterable[str] = (),
+             **parametros) -> dict:
+    """
+    Assinatura das tabelas de entrada: 'tabelas_catalogo' no catálogo e
+    'tabelas_shards' em cada shard (noc/shards.py), mais os parâmetros informados.
+    """
+    rot = shards.roteador(catalogo)
+    por_arquivo: dict[Path, list[str]] = {}
+    por_arquivo.setdefault(rot.catalogo, []).extend(tabelas_catalogo)
+    tabelas_shards = list(tabelas_shards)
+    for caminho in rot.caminhos():
+        por_arquivo.setdefault(caminho, []).extend(tabelas_shards)
+
+    fontes = {}
+    for caminho, tabelas in por_arquivo.items():
+        if not tabelas or not caminho.exists():
+            continue
+        conn = conectar_leitura(caminho)
+        try:
+            fontes[caminho.name] = {tabela: estado_tabela(conn, tabela) for tabela in tabelas}
+        finally:
+            conn.close()
+    return {"tabelas": fontes, "parametros": parametros}
+
+# ==========================
+# Registro ao lado das saídas
+# ==========================
+
+def inalterado(registro: Path, assinatura: dict, saidas: Iterable[Path] = ()) -> bool:
+    """True se 'registro' guarda a mesma assinatura e todas as 'saidas' ainda existem."""
+    if not registro.exists() or not all(Path(s).exists() for s in saidas):
+        return False
+    try:
+        return json.loads(registro.read_text(encoding="utf-8")) == assinatura
+    except (OSError, ValueError):
+        return False
+
+
+def gravar(registro: Path, assinatura: dict) -> None:
+    registro.write_text(json.dumps(assinatura, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def pular(registro: Path, assinatura: dict, saidas: Iterable[Path] = (), forcar: bool = False) -> bool:
+    """Decide se a execução pode ser pulada, registrando o motivo no log."""
+    if forcar:
+        return False
+    if inalterado(registro, assinatura, saidas):
+        logging.info(f"Fontes e parâmetros inalterados desde a última execução ({registro.name}); nada a fazer.")
+        return True
+    return False
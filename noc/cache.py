@@ -0,0 +1,69 @@
+"""
+Cache de cargas de dados compartilhado pelo processo do dashboard.
+Cada carga é identificada por uma chave (que inclui a versão da fonte, ex.: mtime)
+e guardada como Future: a página que precisa do dado espera a mesma carga que
+uma thread de pré-carregamento já tenha iniciado, em vez de repeti-la.
+
+Os resultados são compartilhados, somente leitura, por todas as sessões do
+Streamlit: quem precisar alterar um DataFrame deve trabalhar sobre uma cópia
+(o dashboard ativa copy-on-write, então filtros e fatias já são independentes).
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Hashable
+
+MAX_ENTRADAS = 32
+
+
+class CacheCompartilhado:
+    """Cache LRU chave -> Future, com pool de threads para cargas em segundo plano."""
+
+    def __init__(self, max_workers: int = 4, max_entradas: int = MAX_ENTRADAS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="noc-carga")
+        self._futuros: OrderedDict[Hashable, Future] = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_entradas = max_entradas
+        self.memoria: dict[str, dict] = {}
+
+    def agendar(self, chave: Hashable, funcao: Callable, *args) -> Future:
+        """Inicia a carga em segundo plano (se ainda não existir) e devolve o Future, sem bloquear."""
+        with self._lock:
+            futuro = self._futuros.get(chave)
+            if futuro is None or (futuro.done() and futuro.exception() is not None):
+                futuro = self._executor.submit(funcao, *args)
+                self._futuros[chave] = futuro
+            self._futuros.move_to_end(chave)
+            while len(self._futuros) > self._max_entradas:
+                self._futuros.popitem(last=False)
+        return futuro
+
+    def obter(self, chave: Hashable, funcao: Callable, *args):
+        """Devolve o resultado da carga, reaproveitando uma pré-carga pronta ou em andamento."""
+        return self.agendar(chave, funcao, *args).result()
+
+    def invalidar(self, predicado: Callable[[Hashable], bool]) -> int:
+        """Descarta as entradas cujas chaves satisfazem 'predicado'; devolve quantas saíram."""
+        with self._lock:
+            chaves = [chave for chave in self._futuros if predicado(chave)]
+            for chave in chaves:
+                del self._futuros[chave]
+        return len(chaves)
+
+    def pronto(self, chave: Hashable) -> bool:
+        with self._lock:
+            futuro = self._futuros.get(chave)
+        return futuro is not None and futuro.done() and futuro.exception() is None
+
+    def precarregar(self, chave: Hashable, funcao: Callable, *args) -> None:
+        """Agenda a carga e apenas registra eventuais erros (quem consumir verá a exceção)."""
+        futuro = self.agendar(chave, funcao, *args)
+        futuro.add_done_callback(
+            lambda f: f.exception() and logging.warning(f"Pré-carga {chave!r} falhou: {f.exception()}")
+        )
+
+
+# Instância única do processo: módulos importados sobrevivem aos reruns do Streamlit
+CACHE = CacheCompartilhado()
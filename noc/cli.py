@@ -0,0 +1,98 @@
+"""
+Linha de comando única dos coletores:
+
+    python -m noc collect bancaria|consorcio|checklist|hora [--from AAAA-MM-DD] [--to AAAA-MM-DD]
+
+Sem período, executa o coletor como o script do dia. Com período, reprocessa
+todas as datas do intervalo num único processo (gerar_periodo de cada coletor):
+as leituras cobrem o período inteiro de uma vez e os relatórios são gravados
+em paralelo, em vez de uma execução completa por dia com o relógio adulterado.
+"""
+
+import argparse
+import importlib.util
+import logging
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+from types import ModuleType
+
+# ==========================
+# Configurações
+# ==========================
+
+BASE_DIR = Path(getattr(sys, "_MEIPASS", Path(__file__).resolve().parent.parent))
+
+# Coletor -> (script, aceita --workers)
+COLETORES = {
+    "bancaria": ("coleta-bancaria.py", False),
+    "consorcio": ("coleta-consorcio.py", False),
+    "checklist": ("coleta-checklist.py", True),
+    "hora": ("coleta-hora.py", True),
+}
+
+# ==========================
+# Funções auxiliares
+# ==========================
+
+def carregar_coletor(nome: str) -> ModuleType:
+    """Importa o script do coletor (nome com hífen) como o módulo 'coleta_<nome>'."""
+    modulo_nome = f"coleta_{nome}"
+    if modulo_nome not in sys.modules:
+        spec = importlib.util.spec_from_file_location(modulo_nome, BASE_DIR / COLETORES[nome][0])
+        modulo = importlib.util.module_from_spec(spec)
+        sys.modules[modulo_nome] = modulo
+        spec.loader.exec_module(modulo)
+    return sys.modules[modulo_nome]
+
+
+def periodo(inicio: date, fim: date) -> list[date]:
+    """Todas as datas de 'inicio' a 'fim' (inclusive)."""
+    return [inicio + timedelta(days=d) for d in range((fim - inicio).days + 1)]
+
+
+def criar_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m noc", description="Coletores do NOC Dashboards.")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    collect = comandos.add_parser("collect", help="executa um coletor (opcionalmente para um período)")
+    coletores = collect.add_subparsers(dest="coletor", required=True)
+    for nome, (script, aceita_workers) in COLETORES.items():
+        sub = coletores.add_parser(nome, help=f"equivale a {script}")
+        sub.add_argument("--from", dest="data_inicio", type=date.fromisoformat,
+                         help="primeira data de referência a reprocessar (AAAA-MM-DD)")
+        sub.add_argument("--to", dest="data_fim", type=date.fromisoformat,
+                         help="última data de referência (padrão: ontem)")
+        sub.add_argument("--force", action="store_true",
+                         help="refaz mesmo sem mudanças nas fontes (o reprocessamento de período sempre refaz)")
+        if aceita_workers:
+            sub.add_argument("--workers", type=int, default=1, help="processos para dividir as empresas (padrão: 1)")
+    return parser
+
+# ==========================
+# Fluxo principal
+# ==========================
+
+def main(argv: list[str] | None = None) -> None:
+    parser = criar_parser()
+    args = parser.parse_args(argv)
+    if args.data_fim is not None and args.data_inicio is None:
+        parser.error("--to exige --from")
+
+    coletor = carregar_coletor(args.coletor)
+    workers = getattr(args, "workers", None)
+
+    if args.data_inicio is None:
+        argv_dia = ["--force"] if args.force else []
+        coletor.main(argv_dia if workers is None else [*argv_dia, "--workers", str(workers)])
+        return
+
+    data_fim = args.data_fim or date.today() - timedelta(days=1)
+    if data_fim < args.data_inicio:
+        parser.error("--to anterior a --from")
+    datas = periodo(args.data_inicio, data_fim)
+    logging.info(f"Reprocessando {args.coletor} de {args.data_inicio} a {data_fim} ({len(datas)} dia(s)).")
+    if workers is None:
+        coletor.gerar_periodo(datas)
+    else:
+        coletor.gerar_periodo(datas, workers)
@@ -0,0 +1,95 @@
+"""
+Conexões SQLite padronizadas para coletores e dashboard.
+Leituras usam URI somente leitura (mode=ro) com mmap_size configurado, de modo
+que as páginas do banco são lidas direto do cache do sistema operacional.
+'immutable=1' só deve ser usado quando nenhum outro processo grava no arquivo
+(ex.: cópias/snapshots e benchmarks), pois desliga o controle de locks.
+Processos longos (dashboard) reaproveitam conexões por um pool.
+"""
+
+import os
+import queue
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+# ==========================
+# Configurações
+# ==========================
+
+BASE_DIR = Path(getattr(sys, "_MEIPASS", Path(__file__).resolve().parent.parent))
+DB_PATH = BASE_DIR / "banco_exp.sqlite"
+
+# Tamanho máximo mapeado em memória (bytes); NOC_SQLITE_MMAP=0 desliga
+MMAP_BYTES = int(os.environ.get("NOC_SQLITE_MMAP", 1 << 30))
+
+# ==========================
+# Conexões
+# ==========================
+
+def _uri(caminho: Path, modo: str, imutavel: bool) -> str:
+    uri = f"{Path(caminho).resolve().as_uri()}?mode={modo}"
+    return uri + "&immutable=1" if imutavel else uri
+
+
+def conectar_leitura(caminho: Path = DB_PATH, imutavel: bool = False,
+                     mmap_size: int = MMAP_BYTES, check_same_thread: bool = True) -> sqlite3.Connection:
+    """Conexão somente leitura (mode=ro, query_only) com memory-map."""
+    conn = sqlite3.connect(_uri(caminho, "ro", imutavel), uri=True, check_same_thread=check_same_thread)
+    conn.execute(f"PRAGMA mmap_size = {int(mmap_size)}")
+    conn.execute("PRAGMA query_only = ON")
+    return conn
+
+
+def conectar_escrita(caminho: Path = DB_PATH, mmap_size: int = MMAP_BYTES) -> sqlite3.Connection:
+    """Conexão leitura/escrita (cria o arquivo se preciso) com memory-map para as leituras."""
+    conn = sqlite3.connect(_uri(caminho, "rwc", False), uri=True)
+    conn.execute(f"PRAGMA mmap_size = {int(mmap_size)}")
+    return conn
+
+# ==========================
+# Pool para processos longos
+# ==========================
+
+class PoolLeitura:
+    """Pool de conexões somente leitura compartilhado entre threads (uma thread por conexão por vez)."""
+
+    def __init__(self, caminho: Path = DB_PATH, tamanho: int = 4, mmap_size: int = MMAP_BYTES):
+        self.caminho = caminho
+        self._mmap_size = mmap_size
+        self._livres: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._vagas = queue.Queue()
+        for _ in range(tamanho):
+            self._vagas.put(None)
+
+    @contextmanager
+    def conexao(self) -> Iterator[sqlite3.Connection]:
+        """Empresta uma conexão; bloqueia se todas estiverem em uso."""
+        self._vagas.get()
+        conn = None
+        try:
+            try:
+                conn = self._livres.get_nowait()
+            except queue.Empty:
+                conn = conectar_leitura(self.caminho, mmap_size=self._mmap_size, check_same_thread=False)
+            yield conn
+        finally:
+            if conn is not None:
+                self._livres.put(conn)
+            self._vagas.put(None)
+
+
+_POOLS: dict[Path, PoolLeitura] = {}
+_LOCK_POOLS = threading.Lock()
+
+
+def pool_leitura(caminho: Path = DB_PATH) -> PoolLeitura:
+    """Pool único por arquivo de banco dentro do processo."""
+    caminho = Path(caminho).resolve()
+    with _LOCK_POOLS:
+        if caminho not in _POOLS:
+            _POOLS[caminho] = PoolLeitura(caminho)
+        return _POOLS[caminho]
@@ -0,0 +1,129 @@
+"""
+Dimensões de empresas e layouts com chaves inteiras.
+Dim_Empresa e Dim_Layout são alimentadas a partir das tabelas brutas a cada
+carga; os agregados mantidos pelo projeto (noc/agregados.py) e a linha de base
+horária guardam só as chaves inteiras, e os coletores leem daqui as listas de
+empresas e layouts em vez de constantes no código. O catálogo (banco_exp.sqlite)
+é a fonte das chaves; com shards, cada shard recebe uma cópia das dimensões.
+"""
+
+import re
+import sqlite3
+
+from noc import shards
+
+TABELAS = ("Dim_Empresa", "Dim_Layout")
+GRUPO_CONSORCIO = "Consorcio"
+GRUPO_DEMAIS = "Demais"
+PADRAO_HORA = re.compile(r"^__(.+)_input_Acionamentos$")
+
+# ==========================
+# Manutenção
+# ==========================
+
+def _tabelas_hora(conn: sqlite3.Connection) -> list[str]:
+    """Empresas que possuem tabela __<Empresa>_input_Acionamentos."""
+    tabelas = conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()
+    return [m.group(1) for (nome,) in tabelas if (m := PADRAO_HORA.match(nome))]
+
+
+def atualizar(conn: sqlite3.Connection, desde: str = "0000-00-00") -> None:
+    """
+    Inclui nas dimensões do catálogo as empresas e layouts novos que aparecem a
+    partir de 'desde', lendo os dados brutos de todos os shards (noc/shards.py).
+    As chaves são atribuídas só no catálogo, então são as mesmas em todos os shards.
+    """
+    rot = shards.roteador_de(conn)
+    conexoes = shards.conectar_shards(rot, conn)
+    layouts = {l for (l,) in conn.execute(
+        "SELECT DISTINCT Layout FROM Auditoria_LayoutNew WHERE dtDataReferencia >= ?", (desde,)
+    )}
+    origem: dict[str, tuple[int, int]] = {}
+    hora: list[str] = []
+    try:
+        for shard in conexoes.values():
+            layouts.update(l for (l,) in shard.execute(
+                "SELECT DISTINCT Layout FROM __Consolidado_Hist WHERE dtDataReferencia >= ?", (desde,)
+            ))
+            # Grupo da empresa: consórcio se ela aparece em algum layout do grupo consórcio
+            for nome, id_company, consorcio in shard.execute(f"""
+                SELECT dsNomeAssessoria, MIN(IdCompany), MAX(Layout = '{GRUPO_CONSORCIO}')
+                FROM __Consolidado_Hist
+                WHERE dtDataReferencia >= ?
+                GROUP BY dsNomeAssessoria
+            """, (desde,)):
+                anterior = origem.get(nome, (0, id_company))
+                origem[nome] = (max(anterior[0], consorcio), min(anterior[1], id_company))
+            hora.extend(_tabelas_hora(shard))
+    finally:
+        if rot.fragmentado:
+            for shard in conexoes.values():
+                shard.close()
+
+    conn.executemany(
+        "INSERT OR IGNORE INTO Dim_Layout (Nome, Grupo) VALUES (?, ?)",
+        [(l, GRUPO_CONSORCIO if l == GRUPO_CONSORCIO else GRUPO_DEMAIS) for l in sorted(layouts)]
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO Dim_Empresa (Nome, IdCompany, Grupo) VALUES (?, ?, ?)",
+        [(nome, id_company, GRUPO_CONSORCIO if consorcio else GRUPO_DEMAIS)
+         for nome, (consorcio, id_company) in sorted(origem.items(), key=lambda item: item[1])]
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO Dim_Empresa (Nome, Grupo) VALUES (?, ?)",
+        [(empresa, GRUPO_DEMAIS) for empresa in hora]
+    )
+    conn.commit()
+
+
+def exportar(conn: sqlite3.Connection) -> dict[str, list[tuple]]:
+    """Linhas das dimensões do catálogo, para replicar nos shards."""
+    return {tabela: conn.execute(f"SELECT * FROM {tabela}").fetchall() for tabela in TABELAS}
+
+
+def replicar(shard: sqlite3.Connection, dimensoes: dict[str, list[tuple]]) -> None:
+    """Substitui as dimensões do shard pelas do catálogo (os agregados do shard fazem JOIN com elas)."""
+    for tabela, linhas in dimensoes.items():
+        shard.execute(f"DELETE FROM {tabela}")
+        if linhas:
+            marcadores = ", ".join("?" for _ in linhas[0])
+            shard.executemany(f"INSERT INTO {tabela} VALUES ({marcadores})", linhas)
+
+# ==========================
+# Consulta
+# ==========================
+
+def empresas(conn: sqlite3.Connection, grupo: str | None = None) -> list[tuple[int, str]]:
+    """
+    (IdCompany, Nome) das empresas do grupo, na ordem do sistema de origem.
+    Empresas só com acionamentos horários (sem IdCompany) ficam de fora: não
+    fazem parte do checklist nem das coletas.
+    """
+    filtro, params = ("AND Grupo = ?", (grupo,)) if grupo else ("", ())
+    return conn.execute(
+        f"SELECT IdCompany, Nome FROM Dim_Empresa WHERE IdCompany IS NOT NULL {filtro} ORDER BY IdCompany, Nome",
+        params
+    ).fetchall()
+
+
+def nomes_empresas(conn: sqlite3.Connection, grupo: str | None = None) -> list[str]:
+    return [nome for _, nome in empresas(conn, grupo)]
+
+
+def empresas_hora(conn: sqlite3.Connection) -> list[tuple[int, str]]:
+    """(IdEmpresa, Nome) das empresas com acionamentos horários (tabela no seu shard)."""
+    rot = shards.roteador_de(conn)
+    conexoes = shards.conectar_shards(rot, conn)
+    try:
+        existentes = {e for shard in conexoes.values() for e in _tabelas_hora(shard)}
+    finally:
+        if rot.fragmentado:
+            for shard in conexoes.values():
+                shard.close()
+    linhas = conn.execute("SELECT IdEmpresa, Nome FROM Dim_Empresa ORDER BY IdCompany, Nome").fetchall()
+    return [(id_empresa, nome) for id_empresa, nome in linhas if nome in existentes]
+
+
+def layouts(conn: sqlite3.Connection, grupo: str | None = None) -> list[str]:
+    filtro, params = ("WHERE Grupo = ?", (grupo,)) if grupo else ("", ())
+    return [nome for (nome,) in conn.execute(f"SELECT Nome FROM Dim_Layout {filtro} ORDER BY Nome", params)]
@@ -0,0 +1,124 @@
+"""
+Exportação de relatórios Excel em streaming.
+Usa o modo constant_memory do xlsxwriter: cada linha é gravada no arquivo
+temporário da aba assim que chega, então o workbook nunca fica inteiro em memória.
+As abas podem vir de DataFrames (em blocos) ou de qualquer gerador de linhas.
+Também publica cópias em Arrow IPC, que o dashboard lê por memory-map sem parse.
+"""
+
+import logging
+import os
+from pathlib import Path
+from typing import Iterable, Iterator, Mapping, Sequence
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import xlsxwriter
+
+# Cabeçalho verde usado nos relatórios de checklist
+FORMATO_CABECALHO = {'bold': True, 'bg_color': '#D7E4BC'}
+
+TAMANHO_BLOCO = 5_000
+
+# ==========================
+# Fontes de linhas
+# ==========================
+
+def linhas_dataframe(df: pd.DataFrame, colunas: Sequence[str] | None = None,
+                     bloco: int = TAMANHO_BLOCO) -> Iterator[tuple]:
+    """Gera as linhas do DataFrame bloco a bloco, com NaN/NaT convertidos em célula vazia."""
+    if colunas is not None:
+        df = df[list(colunas)]
+    for inicio in range(0, len(df), bloco):
+        parte = df.iloc[inicio:inicio + bloco].astype(object)
+        parte = parte.where(parte.notna(), None)
+        yield from parte.itertuples(index=False, name=None)
+
+
+def aba_dataframe(df: pd.DataFrame, colunas: Sequence[str] | None = None) -> tuple[list[str], Iterator[tuple]]:
+    """Atalho para montar (cabeçalho, linhas) de uma aba a partir de um DataFrame."""
+    cabecalho = [str(c) for c in (colunas if colunas is not None else df.columns)]
+    return cabecalho, linhas_dataframe(df, colunas)
+
+# ==========================
+# Escrita
+# ==========================
+
+def exportar_excel(caminho: Path, abas: Mapping[str, tuple[Sequence[str], Iterable[Sequence]]],
+                   formato_cabecalho: dict | None = None) -> int:
+    """
+    Grava um workbook com uma aba por item de 'abas' ({nome: (cabeçalho, linhas)}).
+    As linhas são consumidas uma a uma; retorna o total de linhas gravadas.
+    """
+    total = 0
+    workbook = xlsxwriter.Workbook(str(caminho), {
+        'constant_memory': True,
+        'default_date_format': 'yyyy-mm-dd',
+        'strings_to_urls': False,
+    })
+    try:
+        formato = workbook.add_format(formato_cabecalho) if formato_cabecalho else None
+        for nome, (cabecalho, linhas) in abas.items():
+            worksheet = workbook.add_worksheet(nome)
+            worksheet.write_row(0, 0, cabecalho, formato)
+            numero = 0
+            for numero, linha in enumerate(linhas, start=1):
+                worksheet.write_row(numero, 0, linha)
+            total += numero
+    finally:
+        workbook.close()
+    return total
+
+
+def exportar_dataframe(caminho: Path, df: pd.DataFrame, colunas: Sequence[str] | None = None,
+                       sheet_name: str = "Sheet1", formato_cabecalho: dict | None = None) -> int:
+    """Equivalente em streaming de df.to_excel(caminho, index=False)."""
+    linhas = exportar_excel(caminho, {sheet_name: aba_dataframe(df, colunas)}, formato_cabecalho)
+    logging.debug(f"{linhas} linhas gravadas em {caminho}")
+    return linhas
+
+# ==========================
+# Arrow IPC
+# ==========================
+
+def caminho_arrow(caminho_excel: Path) -> Path:
+    """Arquivo Arrow publicado ao lado do Excel (mesmo nome, extensão .arrow)."""
+    return Path(caminho_excel).with_suffix(".arrow")
+
+
+def publicar_arrow(caminho_excel: Path, df: pd.DataFrame) -> Path | None:
+    """
+    Publica o DataFrame em Arrow IPC (formato arquivo, sem compressão, para que
+    possa ser memory-mapped). Textos viram dictionary (categorias no pandas) e
+    inteiros são rebaixados, então o leitor já recebe os tipos compactos.
+    A troca é atômica; se o arquivo estiver preso por um leitor (Windows),
+    mantém-se o anterior, que o dashboard ignora por ser mais antigo que o Excel.
+    """
+    destino = caminho_arrow(caminho_excel)
+    df = df.copy()
+    for coluna in df.select_dtypes("integer").columns:
+        df[coluna] = pd.to_numeric(df[coluna], downcast="integer")
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    for i, campo in enumerate(tabela.schema):
+        if pa.types.is_string(campo.type) or pa.types.is_large_string(campo.type):
+            tabela = tabela.set_column(i, campo.name, pc.dictionary_encode(tabela.column(i)))
+
+    temporario = destino.with_suffix(".arrow.tmp")
+    with pa.OSFile(str(temporario), "wb") as sink:
+        with pa.ipc.new_file(sink, tabela.schema) as writer:
+            writer.write_table(tabela)
+    try:
+        os.replace(temporario, destino)
+    except OSError as e:
+        temporario.unlink(missing_ok=True)
+        logging.warning(f"Arrow não publicado em {destino} (arquivo em uso?): {e}")
+        return None
+    logging.info(f"Arrow publicado em: {destino}")
+    return destino
+
+
+def ler_arrow(caminho_arrow_ipc: Path) -> pd.DataFrame:
+    """Lê um Arrow IPC via memory-map; colunas numéricas sem nulos apontam para as páginas do arquivo."""
+    tabela = pa.ipc.open_file(pa.memory_map(str(caminho_arrow_ipc), "r")).read_all()
+    return tabela.to_pandas(split_blocks=True)
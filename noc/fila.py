@@ -0,0 +1,193 @@
+"""
+Fila local de recoletas disparadas pelo dashboard.
+As tarefas ("recoletar X, opcionalmente para a data Y") ficam numa tabela SQLite
+(fila_tarefas.sqlite) e são executadas uma por vez por uma thread do processo
+do dashboard. Cada tarefa roda como subprocesso de `python -m noc collect`
+(noc/cli.py), o mesmo caminho da linha de comando, com --force; a última linha
+de log do coletor fica gravada como progresso, para a página acompanhar sem
+bloquear a interface nem reiniciar o servidor.
+"""
+
+import logging
+import sqlite3
+import subprocess
+import sys
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date, datetime
+from pathlib import Path
+from typing import Iterator
+
+from noc.cli import COLETORES
+
+# ==========================
+# Configurações
+# ==========================
+
+BASE_DIR = Path(getattr(sys, "_MEIPASS", Path(__file__).resolve().parent.parent))
+FILA_DB = BASE_DIR / "fila_tarefas.sqlite"
+
+PENDENTE = "pendente"
+EXECUTANDO = "executando"
+CONCLUIDA = "concluida"
+ERRO = "erro"
+ATIVOS = (PENDENTE, EXECUTANDO)
+
+# ==========================
+# Tarefas
+# ==========================
+
+@dataclass
+class Tarefa:
+    id: int
+    coletor: str
+    data: str | None
+    estado: str
+    progresso: str
+    criada: str
+    iniciada: str | None
+    concluida: str | None
+    codigo: int | None
+
+    @property
+    def ativa(self) -> bool:
+        return self.estado in ATIVOS
+
+    def comando(self) -> list[str]:
+        """Linha de comando do coletor (sempre refaz: o operador pediu a recoleta)."""
+        comando = [sys.executable, "-m", "noc", "collect", self.coletor, "--force"]
+        if self.data:
+            comando += ["--from", self.data, "--to", self.data]
+        return comando
+
+
+def _agora() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+class Fila:
+    """Fila de recoletas em SQLite com um worker em thread (iniciado sob demanda)."""
+
+    def __init__(self, caminho: Path = FILA_DB):
+        self.caminho = Path(caminho)
+        self._acordar = threading.Event()
+        self._lock = threading.Lock()
+        self._worker: threading.Thread | None = None
+
+    @contextmanager
+    def _conexao(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.caminho, timeout=10, isolation_level=None)
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS Tarefas (
+                    Id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    Coletor TEXT NOT NULL,
+                    Data DATE,
+                    Estado TEXT NOT NULL,
+                    Progresso TEXT NOT NULL DEFAULT '',
+                    Criada DATETIME NOT NULL,
+                    Iniciada DATETIME,
+                    Concluida DATETIME,
+                    Codigo INTEGER
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_tarefas_estado ON Tarefas (Estado, Id)")
+            yield conn
+        finally:
+            conn.close()
+
+    def enfileirar(self, coletor: str, data: date | None = None) -> int:
+        """Inclui a recoleta na fila; se a mesma já estiver pendente ou em execução, devolve essa."""
+        if coletor not in COLETORES:
+            raise ValueError(f"Coletor desconhecido: {coletor!r} (opções: {', '.join(COLETORES)})")
+        data_iso = data.isoformat() if data else None
+        with self._conexao() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            existente = conn.execute(
+                "SELECT Id FROM Tarefas WHERE Coletor = ? AND Data IS ? AND Estado IN (?, ?)",
+                (coletor, data_iso, *ATIVOS)
+            ).fetchone()
+            if existente:
+                conn.execute("COMMIT")
+                return existente[0]
+            id_tarefa = conn.execute(
+                "INSERT INTO Tarefas (Coletor, Data, Estado, Criada) VALUES (?, ?, ?, ?)",
+                (coletor, data_iso, PENDENTE, _agora())
+            ).lastrowid
+            conn.execute("COMMIT")
+        self.iniciar_worker()
+        self._acordar.set()
+        return id_tarefa
+
+    def listar(self, limite: int = 10) -> list[Tarefa]:
+        """Tarefas mais recentes primeiro."""
+        with self._conexao() as conn:
+            linhas = conn.execute("SELECT * FROM Tarefas ORDER BY Id DESC LIMIT ?", (limite,)).fetchall()
+        return [Tarefa(*linha) for linha in linhas]
+
+    def _atualizar(self, id_tarefa: int, **campos) -> None:
+        colunas = ", ".join(f"{c.capitalize()} = ?" for c in campos)
+        with self._conexao() as conn:
+            conn.execute(f"UPDATE Tarefas SET {colunas} WHERE Id = ?", (*campos.values(), id_tarefa))
+
+    def _reservar(self) -> Tarefa | None:
+        """Marca a tarefa pendente mais antiga como em execução e a devolve."""
+        with self._conexao() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            linha = conn.execute(
+                "SELECT * FROM Tarefas WHERE Estado = ? ORDER BY Id LIMIT 1", (PENDENTE,)
+            ).fetchone()
+            if linha:
+                conn.execute("UPDATE Tarefas SET Estado = ?, Iniciada = ? WHERE Id = ?",
+                             (EXECUTANDO, _agora(), linha[0]))
+            conn.execute("COMMIT")
+        if linha is None:
+            return None
+        tarefa = Tarefa(*linha)
+        tarefa.estado = EXECUTANDO
+        return tarefa
+
+    def executar(self, tarefa: Tarefa) -> None:
+        """Roda o coletor e registra cada linha de log como progresso."""
+        try:
+            processo = subprocess.Popen(
+                tarefa.comando(), cwd=BASE_DIR, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                text=True, bufsize=1,
+            )
+            for linha in processo.stdout:
+                if linha.strip():
+                    self._atualizar(tarefa.id, progresso=linha.strip()[:500])
+            codigo = processo.wait()
+        except OSError as e:
+            self._atualizar(tarefa.id, estado=ERRO, progresso=str(e), concluida=_agora())
+            return
+        self._atualizar(tarefa.id, estado=CONCLUIDA if codigo == 0 else ERRO, codigo=codigo, concluida=_agora())
+
+    def _laco(self) -> None:
+        while True:
+            tarefa = self._reservar()
+            if tarefa is None:
+                self._acordar.wait(timeout=5)
+                self._acordar.clear()
+                continue
+            logging.info(f"Recoleta {tarefa.id}: {' '.join(tarefa.comando()[1:])}")
+            self.executar(tarefa)
+
+    def iniciar_worker(self) -> None:
+        """Inicia a thread do worker uma única vez por processo."""
+        with self._lock:
+            if self._worker is not None:
+                return
+            # Tarefas em execução de um processo anterior não terminarão mais
+            with self._conexao() as conn:
+                conn.execute(
+                    "UPDATE Tarefas SET Estado = ?, Progresso = 'Interrompida (dashboard reiniciado)', Concluida = ? "
+                    "WHERE Estado = ?", (ERRO, _agora(), EXECUTANDO)
+                )
+            self._worker = threading.Thread(target=self._laco, name="noc-fila", daemon=True)
+            self._worker.start()
+
+
+# Instância única do processo do dashboard
+FILA = Fila()
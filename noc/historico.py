@@ -0,0 +1,150 @@
+"""
+Histórico do checklist particionado por mês em SQLite.
+Cada mês fica em sua própria tabela (Checklist_AAAA_MM) do arquivo
+Relatorios_Checklist/historico_checklist.sqlite. Gravar um dia mexe só na
+partição do mês; consultar um período lê só as partições que o cobrem.
+"""
+
+import logging
+import re
+import sqlite3
+import sys
+from datetime import date, datetime
+from pathlib import Path
+from typing import Iterable, Sequence
+
+import pandas as pd
+
+# ==========================
+# Configurações
+# ==========================
+
+BASE_DIR = Path(getattr(sys, "_MEIPASS", Path(__file__).resolve().parent.parent))
+HISTORICO_DB = BASE_DIR / "Relatorios_Checklist" / "historico_checklist.sqlite"
+HISTORICO_XLSX_LEGADO = BASE_DIR / "Relatorios_Checklist" / "historico_checklist.xlsx"
+
+COLUNAS = [
+    "Data_Referencia", "Empresa", "Layout", "Obs Check Diario",
+    "Check Diario", "Obs Vol Cumulativa", "Qnt_Ontem",
+    "Qnt_Hoje", "Diferenca", "Check Vol Cumulativa"
+]
+CHAVE = ["Data_Referencia", "Empresa", "Layout"]
+PADRAO_PARTICAO = re.compile(r"^Checklist_(\d{4})_(\d{2})$")
+
+_COLUNAS_SQL = ", ".join(f'"{c}"' for c in COLUNAS)
+_MARCADORES = ", ".join("?" for _ in COLUNAS)
+
+# ==========================
+# Partições
+# ==========================
+
+def _data_iso(valor) -> str:
+    """Normaliza datas (texto, date ou datetime) para YYYY-MM-DD."""
+    return valor.strftime('%Y-%m-%d') if hasattr(valor, "strftime") else str(valor)[:10]
+
+
+def nome_particao(data_iso: str) -> str:
+    """Tabela do mês da data: '2025-08-30' -> 'Checklist_2025_08'."""
+    return f"Checklist_{data_iso[:4]}_{data_iso[5:7]}"
+
+
+def garantir_particao(conn: sqlite3.Connection, tabela: str) -> None:
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {tabela} (
+            "Data_Referencia" DATE NOT NULL,
+            "Empresa" TEXT NOT NULL,
+            "Layout" TEXT NOT NULL,
+            "Obs Check Diario" TEXT,
+            "Check Diario" TEXT,
+            "Obs Vol Cumulativa" TEXT,
+            "Qnt_Ontem" INTEGER,
+            "Qnt_Hoje" INTEGER,
+            "Diferenca" TEXT,
+            "Check Vol Cumulativa" TEXT,
+            PRIMARY KEY ("Data_Referencia", "Empresa", "Layout")
+        ) WITHOUT ROWID
+    """)
+
+
+def listar_particoes(conn: sqlite3.Connection) -> list[str]:
+    tabelas = conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall()
+    return sorted(nome for (nome,) in tabelas if PADRAO_PARTICAO.match(nome))
+
+
+def particoes_do_periodo(conn: sqlite3.Connection, inicio: str, fim: str) -> list[str]:
+    """Poda de partições: só os meses que intersectam [inicio, fim]."""
+    primeiro, ultimo = nome_particao(inicio), nome_particao(fim)
+    return [t for t in listar_particoes(conn) if primeiro <= t <= ultimo]
+
+
+def abrir(caminho: Path = HISTORICO_DB) -> sqlite3.Connection:
+    caminho.parent.mkdir(exist_ok=True)
+    return sqlite3.connect(caminho)
+
+# ==========================
+# Escrita
+# ==========================
+
+def gravar_linhas(conn: sqlite3.Connection, linhas: Iterable[Sequence]) -> int:
+    """
+    Insere/substitui linhas (na ordem de COLUNAS) em suas partições mensais.
+    Só as linhas recebidas são tocadas; o restante do histórico não é lido.
+    """
+    por_particao: dict[str, list] = {}
+    for linha in linhas:
+        linha = (_data_iso(linha[0]),) + tuple(linha[1:])
+        por_particao.setdefault(nome_particao(linha[0]), []).append(linha)
+
+    for tabela, registros in por_particao.items():
+        garantir_particao(conn, tabela)
+        conn.executemany(
+            f"INSERT OR REPLACE INTO {tabela} ({_COLUNAS_SQL}) VALUES ({_MARCADORES})",
+            registros
+        )
+    conn.commit()
+    return sum(len(r) for r in por_particao.values())
+
+
+def gravar_dia(conn: sqlite3.Connection, linhas_dia: Sequence[Sequence], data_iso: str) -> int:
+    """Substitui o dia inteiro na partição do mês (remove linhas antigas do dia e anexa as novas)."""
+    tabela = nome_particao(data_iso)
+    garantir_particao(conn, tabela)
+    conn.execute(f'DELETE FROM {tabela} WHERE "Data_Referencia" = ?', (data_iso,))
+    return gravar_linhas(conn, linhas_dia)
+
+
+def migrar_excel_legado(conn: sqlite3.Connection, caminho: Path = HISTORICO_XLSX_LEGADO) -> int:
+    """Importa o antigo historico_checklist.xlsx uma única vez (quando ainda não há partições)."""
+    if listar_particoes(conn) or not caminho.exists():
+        return 0
+    df = pd.read_excel(caminho)
+    df = df[COLUNAS].astype(object).where(df[COLUNAS].notna(), None)
+    total = gravar_linhas(conn, df.itertuples(index=False, name=None))
+    logging.info(f"{total} linhas do histórico em Excel migradas para {HISTORICO_DB.name}.")
+    return total
+
+# ==========================
+# Leitura
+# ==========================
+
+def ler_periodo(conn: sqlite3.Connection, inicio: str, fim: str) -> pd.DataFrame:
+    """Lê [inicio, fim] consultando apenas as partições do período (UNION ALL)."""
+    tabelas = particoes_do_periodo(conn, inicio, fim)
+    if not tabelas:
+        return pd.DataFrame(columns=COLUNAS)
+    consulta = " UNION ALL ".join(
+        f'SELECT {_COLUNAS_SQL} FROM {t} WHERE "Data_Referencia" BETWEEN ? AND ?' for t in tabelas
+    )
+    return pd.read_sql(consulta, conn, params=[inicio, fim] * len(tabelas))
+
+
+def limites(conn: sqlite3.Connection) -> tuple[date, date] | None:
+    """Primeira e última data do histórico (consulta só a primeira e a última partição)."""
+    tabelas = listar_particoes(conn)
+    if not tabelas:
+        return None
+    inicio = conn.execute(f'SELECT MIN("Data_Referencia") FROM {tabelas[0]}').fetchone()[0]
+    fim = conn.execute(f'SELECT MAX("Data_Referencia") FROM {tabelas[-1]}').fetchone()[0]
+    if inicio is None or fim is None:
+        return None
+    return (datetime.strptime(inicio, "%Y-%m-%d").date(), datetime.strptime(fim, "%Y-%m-%d").date())
@@ -0,0 +1,153 @@
+"""
+Indicadores da Home mantidos incrementalmente pelos coletores.
+Ao gravar o relatório, cada coletor conta as pendências que a página
+correspondente mostraria e substitui só as próprias linhas (fonte × data e,
+no coleta-hora, só as empresas que atualizou) em resumo_kpis.sqlite. A Home
+lê o resumo com uma única consulta agregada, sem carregar nenhum relatório.
+
+- Checklist: itens VALIDAR no check diário e no cumulativo, por empresa;
+- Consorcio / Coletas: células de coleta com valor 0, por empresa;
+- Hora: faixas horárias já fechadas sem acionamentos, por empresa.
+
+As edições salvas pelo dashboard também atualizam os indicadores da fonte.
+"""
+
+import sqlite3
+import sys
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import pandas as pd
+
+# ==========================
+# Configurações
+# ==========================
+
+BASE_DIR = Path(getattr(sys, "_MEIPASS", Path(__file__).resolve().parent.parent))
+KPI_DB = BASE_DIR / "resumo_kpis.sqlite"
+
+# (fonte, indicador) -> rótulo exibido na Home; fontes com os nomes das páginas do dashboard
+INDICADORES = {
+    ("Checklist", "validar_diario"): "Checklist: pendências diárias",
+    ("Checklist", "validar_volumetria"): "Checklist: pendências de volumetria",
+    ("Consorcio", "valores_zero"): "Consórcio: coletas com valor 0",
+    ("Coletas", "valores_zero"): "Coletas bancárias: coletas com valor 0",
+    ("Hora", "horas_zeradas"): "Hora a hora: faixas sem acionamentos",
+}
+
+COLUNAS_CONTAGEM = ["Indicador", "Empresa", "Valor"]
+COLUNAS_INDICE = ["dsNomeAssessoria", "Layout"]
+
+# ==========================
+# Armazenamento
+# ==========================
+
+@contextmanager
+def abrir(caminho: Path = KPI_DB) -> Iterator[sqlite3.Connection]:
+    conn = sqlite3.connect(caminho, timeout=10)
+    try:
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS Indicadores (
+                Fonte TEXT NOT NULL,
+                Indicador TEXT NOT NULL,
+                Empresa TEXT NOT NULL,
+                Data DATE NOT NULL,
+                Valor INTEGER NOT NULL,
+                PRIMARY KEY (Fonte, Data, Indicador, Empresa)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS Fontes (
+                Fonte TEXT PRIMARY KEY,
+                Data DATE NOT NULL,
+                Atualizado DATETIME NOT NULL
+            );
+        """)
+        yield conn
+    finally:
+        conn.close()
+
+
+def registrar(fonte: str, data: str, contagens: pd.DataFrame, empresas: Iterable[str] | None = None,
+              caminho: Path = KPI_DB) -> None:
+    """
+    Substitui as contagens (Indicador, Empresa, Valor) da fonte na data; com
+    'empresas', só as linhas dessas empresas são trocadas (atualização parcial).
+    """
+    contagens = contagens[contagens["Valor"] > 0]
+    if empresas is not None:
+        empresas = [str(empresa) for empresa in empresas]
+        contagens = contagens[contagens["Empresa"].isin(empresas)]
+    with abrir(caminho) as conn:
+        if empresas is None:
+            conn.execute("DELETE FROM Indicadores WHERE Fonte = ? AND Data = ?", (fonte, data))
+        else:
+            conn.executemany("DELETE FROM Indicadores WHERE Fonte = ? AND Data = ? AND Empresa = ?",
+                             [(fonte, data, empresa) for empresa in empresas])
+        conn.executemany(
+            "INSERT OR REPLACE INTO Indicadores VALUES (?, ?, ?, ?, ?)",
+            [(fonte, indicador, str(empresa), data, int(valor))
+             for indicador, empresa, valor in contagens[COLUNAS_CONTAGEM].itertuples(index=False)]
+        )
+        # A Home mostra a data mais recente de cada fonte (reprocessar o passado não a recua)
+        conn.execute("""
+            INSERT INTO Fontes VALUES (?, ?, ?)
+            ON CONFLICT (Fonte) DO UPDATE SET Data = MAX(Data, excluded.Data), Atualizado = excluded.Atualizado
+        """, (fonte, data, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+        conn.commit()
+
+
+def resumo(caminho: Path = KPI_DB) -> pd.DataFrame:
+    """Total e empresas afetadas por (fonte, indicador) na data mais recente de cada fonte."""
+    if not Path(caminho).exists():
+        return pd.DataFrame(columns=["Fonte", "Data", "Atualizado", "Indicador", "Total", "Empresas"])
+    with abrir(caminho) as conn:
+        return pd.read_sql("""
+            SELECT f.Fonte, f.Data, f.Atualizado, i.Indicador,
+                   COALESCE(SUM(i.Valor), 0) AS Total, COUNT(i.Empresa) AS Empresas
+            FROM Fontes f
+            LEFT JOIN Indicadores i ON i.Fonte = f.Fonte AND i.Data = f.Data
+            GROUP BY f.Fonte, i.Indicador
+        """, conn)
+
+# ==========================
+# Contagens por fonte
+# ==========================
+
+def _por_empresa(indicador: str, marcados: pd.Series, empresas: pd.Series) -> pd.DataFrame:
+    valores = marcados.groupby(empresas.astype(str), observed=True).sum()
+    return pd.DataFrame({"Indicador": indicador, "Empresa": valores.index, "Valor": valores.to_numpy()})
+
+
+def registrar_checklist(df: pd.DataFrame, caminho: Path = KPI_DB) -> None:
+    """Itens VALIDAR de cada data presente no checklist."""
+    for data, do_dia in df.groupby(df["Data_Referencia"].astype(str).str[:10]):
+        contagens = pd.concat([
+            _por_empresa("validar_diario", do_dia["Check Diario"] == "VALIDAR", do_dia["Empresa"]),
+            _por_empresa("validar_volumetria", do_dia["Check Vol Cumulativa"] == "VALIDAR", do_dia["Empresa"]),
+        ], ignore_index=True)
+        registrar("Checklist", data, contagens, caminho=caminho)
+
+
+def registrar_zeros(fonte: str, df: pd.DataFrame, caminho: Path = KPI_DB) -> None:
+    """Células iguais a 0 do relatório de validação; a data é a última coluna de data."""
+    colunas_datas = [c for c in df.columns if c not in COLUNAS_INDICE]
+    if df.empty or not colunas_datas:
+        return
+    zeros = (df[colunas_datas].apply(pd.to_numeric, errors="coerce") == 0).sum(axis=1)
+    data = max(str(c)[:10] for c in colunas_datas)
+    registrar(fonte, data, _por_empresa("valores_zero", zeros, df["dsNomeAssessoria"]), caminho=caminho)
+
+
+def registrar_horas(df: pd.DataFrame, data: str, hora_limite: str | None = None,
+                    empresas: Iterable[str] | None = None, caminho: Path = KPI_DB) -> None:
+    """
+    Faixas horárias sem acionamentos por empresa (última linha de cada uma);
+    com 'hora_limite' (dia corrente), só as horas já fechadas contam.
+    """
+    if df.empty:
+        return
+    df = df.drop_duplicates("Empresa", keep="last")
+    colunas_horas = [c for c in df.columns if c != "Empresa" and (hora_limite is None or str(c) < hora_limite)]
+    zeradas = (df[colunas_horas].fillna(0) == 0).sum(axis=1)
+    registrar("Hora", data, _por_empresa("horas_zeradas", zeradas, df["Empresa"]), empresas, caminho)
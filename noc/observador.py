@@ -0,0 +1,186 @@
+"""
+Observação dos arquivos de relatório lidos pelo dashboard.
+Cada fonte (ex.: "Consorcio") agrupa os arquivos de que depende (o Excel e o
+.arrow publicado junto, o histórico do checklist...). Quando um deles muda, a
+geração da fonte é incrementada e os callbacks registrados recebem o nome da
+fonte: o dashboard descarta do cache compartilhado só as entradas dela,
+pré-carrega a nova versão e as sessões abertas, que comparam a geração que
+exibiram com a atual, recarregam a página.
+
+Com o watchdog instalado (pip install watchdog; usa inotify no Linux) as
+mudanças chegam por evento, e uma varredura lenta cobre pastas que ainda não
+existiam. Sem ele, uma thread compara o mtime dos arquivos a cada
+NOC_OBSERVAR_S segundos (padrão 2; 0 desliga a observação). Rajadas de
+eventos de uma mesma gravação são agrupadas (ESPERA_S) e só há notificação se
+o mtime realmente mudou.
+"""
+
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # dependência opcional: cai na varredura periódica
+    FileSystemEventHandler, Observer = object, None
+
+# ==========================
+# Configurações
+# ==========================
+
+INTERVALO_S = float(os.environ.get("NOC_OBSERVAR_S", 2))
+ESPERA_S = 0.5        # agrupa os eventos de uma mesma gravação
+VARREDURA_LENTA = 15  # com watchdog, varre tudo a cada INTERVALO_S * VARREDURA_LENTA
+
+
+def _mtime(caminho: Path) -> float | None:
+    try:
+        return caminho.stat().st_mtime
+    except OSError:
+        return None
+
+# ==========================
+# Observador
+# ==========================
+
+class _Eventos(FileSystemEventHandler):
+    """Repassa ao observador os caminhos tocados por eventos do sistema de arquivos."""
+
+    def __init__(self, observador: "Observador"):
+        self._observador = observador
+
+    def on_any_event(self, event):
+        for caminho in (event.src_path, getattr(event, "dest_path", "")):
+            if caminho:
+                self._observador.sinalizar(Path(os.fsdecode(caminho)))
+
+
+class Observador:
+    """Gerações por fonte, atualizadas por eventos (watchdog) ou por varredura de mtime."""
+
+    def __init__(self, intervalo_s: float = INTERVALO_S):
+        self.intervalo_s = intervalo_s
+        self._fontes: dict[Path, str] = {}
+        self._mtimes: dict[Path, float | None] = {}
+        self._geracoes: dict[str, int] = {}
+        self._callbacks: list[Callable[[str], None]] = []
+        self._pendentes: set[Path] = set()
+        self._acordar = threading.Event()
+        self._lock = threading.Lock()
+        self._observer = None
+        self._pastas: set[Path] = set()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def ativo(self) -> bool:
+        return self.intervalo_s > 0
+
+    @property
+    def modo(self) -> str:
+        return "eventos" if self._observer is not None else "varredura"
+
+    def observar(self, fonte: str, *caminhos) -> None:
+        """Associa 'caminhos' à fonte (idempotente: pode ser chamado a cada rerun)."""
+        novos = []
+        with self._lock:
+            self._geracoes.setdefault(fonte, 0)
+            for caminho in caminhos:
+                caminho = Path(caminho).resolve()
+                if self._fontes.get(caminho) != fonte:
+                    self._fontes[caminho] = fonte
+                    self._mtimes[caminho] = _mtime(caminho)
+                    novos.append(caminho)
+        for caminho in novos:
+            self._agendar_pasta(caminho.parent)
+
+    def ao_mudar(self, callback: Callable[[str], None]) -> None:
+        self._callbacks.append(callback)
+
+    def geracao(self, fonte: str) -> int:
+        return self._geracoes.get(fonte, 0)
+
+    def sinalizar(self, caminho: Path) -> None:
+        """Marca 'caminho' para verificação (chamado pelos eventos do watchdog)."""
+        with self._lock:
+            if caminho not in self._fontes:
+                return
+            self._pendentes.add(caminho)
+        self._acordar.set()
+
+    def _caminhos(self) -> list[Path]:
+        with self._lock:
+            return list(self._fontes)
+
+    def _agendar_pasta(self, pasta: Path) -> None:
+        # A pasta é reservada sob o lock e registrada fora dele: schedule() pode
+        # demorar e não deve travar sinalizar/verificar
+        with self._lock:
+            observer = self._observer
+            if observer is None or pasta in self._pastas or not pasta.is_dir():
+                return
+            self._pastas.add(pasta)
+        try:
+            observer.schedule(_Eventos(self), str(pasta), recursive=False)
+        except OSError as e:
+            with self._lock:
+                self._pastas.discard(pasta)
+            logging.warning(f"Sem eventos para {pasta} ({e}); a varredura periódica cobre a pasta.")
+
+    def verificar(self, caminhos=None) -> list[str]:
+        """Compara o mtime dos caminhos (padrão: todos) e notifica as fontes alteradas."""
+        with self._lock:
+            caminhos = list(self._fontes) if caminhos is None else [c for c in caminhos if c in self._fontes]
+            alteradas = []
+            for caminho in caminhos:
+                atual = _mtime(caminho)
+                if atual == self._mtimes.get(caminho):
+                    continue
+                self._mtimes[caminho] = atual
+                fonte = self._fontes[caminho]
+                if fonte not in alteradas:
+                    alteradas.append(fonte)
+                    self._geracoes[fonte] += 1
+        for fonte in alteradas:
+            for callback in self._callbacks:
+                try:
+                    callback(fonte)
+                except Exception as e:
+                    logging.warning(f"Falha ao tratar a mudança em {fonte}: {e}")
+        return alteradas
+
+    def _laco(self) -> None:
+        espera = self.intervalo_s * (VARREDURA_LENTA if self._observer is not None else 1)
+        while True:
+            if self._acordar.wait(timeout=espera):
+                time.sleep(ESPERA_S)
+                self._acordar.clear()
+                with self._lock:
+                    pendentes, self._pendentes = self._pendentes, set()
+                self.verificar(pendentes)
+            else:
+                # Pastas criadas depois do início passam a ter eventos
+                for caminho in self._caminhos():
+                    self._agendar_pasta(caminho.parent)
+                self.verificar()
+
+    def iniciar(self) -> None:
+        """Inicia a observação uma única vez por processo (no-op com NOC_OBSERVAR_S=0)."""
+        with self._lock:
+            if self._thread is not None or not self.ativo:
+                return
+            if Observer is not None:
+                self._observer = Observer()
+                self._observer.daemon = True
+                self._observer.start()
+            self._thread = threading.Thread(target=self._laco, name="noc-observador", daemon=True)
+            self._thread.start()
+        for caminho in self._caminhos():
+            self._agendar_pasta(caminho.parent)
+
+
+# Instância única do processo do dashboard
+OBSERVADOR = Observador()
@@ -0,0 +1,100 @@
+"""
+Execução paralela do trabalho por empresa dos coletores.
+As empresas são divididas em lotes contíguos, um por processo; cada processo
+abre as próprias conexões somente leitura (noc/conexao.py) e devolve um
+DataFrame parcial, e os parciais são concatenados na ordem dos lotes, ou seja,
+na mesma ordem da execução serial. Com workers=1 tudo roda no próprio processo.
+
+As tarefas precisam ser funções de nível de módulo (são enviadas aos processos
+por pickle) com a assinatura tarefa(lote, *args) -> DataFrame. Tarefas de
+scripts carregados por caminho (python -m noc collect) são recarregadas do
+mesmo arquivo em cada processo.
+"""
+
+import importlib.util
+import os
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Sequence
+
+import pandas as pd
+
+from noc.conexao import conectar_leitura
+
+# ==========================
+# Configurações
+# ==========================
+
+WORKERS_MAXIMO = os.cpu_count() or 1
+
+# Conexões somente leitura do processo atual, uma por arquivo de banco
+_CONEXOES: dict[Path, sqlite3.Connection] = {}
+
+# ==========================
+# Conexões por processo
+# ==========================
+
+def conexao(caminho: Path) -> sqlite3.Connection:
+    """Conexão somente leitura do processo atual para 'caminho', reaproveitada entre lotes."""
+    caminho = Path(caminho).resolve()
+    if caminho not in _CONEXOES:
+        _CONEXOES[caminho] = conectar_leitura(caminho)
+    return _CONEXOES[caminho]
+
+
+def _fechar_conexoes() -> None:
+    for conn in _CONEXOES.values():
+        conn.close()
+    _CONEXOES.clear()
+
+
+def _carregar_modulo(nome: str, arquivo: str | None) -> None:
+    """Inicialização do worker: garante que o módulo da tarefa possa ser importado pelo nome."""
+    if nome in sys.modules or arquivo is None:
+        return
+    spec = importlib.util.spec_from_file_location(nome, arquivo)
+    modulo = importlib.util.module_from_spec(spec)
+    sys.modules[nome] = modulo
+    spec.loader.exec_module(modulo)
+
+# ==========================
+# Distribuição
+# ==========================
+
+def particionar(itens: Sequence, partes: int) -> list[list]:
+    """Divide 'itens' em até 'partes' lotes contíguos de tamanhos quase iguais."""
+    itens = list(itens)
+    partes = max(1, min(partes, len(itens)))
+    tamanho, resto = divmod(len(itens), partes)
+    lotes, inicio = [], 0
+    for i in range(partes):
+        fim = inicio + tamanho + (i < resto)
+        lotes.append(itens[inicio:fim])
+        inicio = fim
+    return [lote for lote in lotes if lote]
+
+
+def distribuir(tarefa: Callable[..., pd.DataFrame], itens: Sequence, workers: int = 1, *args) -> pd.DataFrame:
+    """
+    Executa tarefa(lote, *args) para cada lote de 'itens' em até 'workers'
+    processos e concatena os DataFrames parciais na ordem dos itens.
+    """
+    lotes = particionar(itens, min(max(1, workers), WORKERS_MAXIMO))
+    if len(lotes) <= 1:
+        try:
+            partes = [tarefa(lote, *args) for lote in lotes]
+        finally:
+            _fechar_conexoes()
+    else:
+        modulo = sys.modules.get(tarefa.__module__)
+        with ProcessPoolExecutor(max_workers=len(lotes), initializer=_carregar_modulo,
+                                 initargs=(tarefa.__module__, getattr(modulo, "__file__", None))) as executor:
+            futuros = [executor.submit(tarefa, lote, *args) for lote in lotes]
+            partes = [futuro.result() for futuro in futuros]
+
+    partes = [p for p in partes if p is not None and not p.empty]
+    if not partes:
+        return pd.DataFrame()
+    return pd.concat(partes, ignore_index=True) if len(partes) > 1 else partes[0]
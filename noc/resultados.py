@@ -0,0 +1,210 @@
+"""
+Cache persistente de resultados de consultas, compartilhado por coletores e dashboard.
+A chave combina o SQL normalizado (espaços colapsados), os parâmetros e a
+assinatura das tabelas lidas em cada arquivo (noc/assinaturas.py: maior rowid e
+linhas, ou somas nos agregados WITHOUT ROWID). Gravações em outras tabelas do
+mesmo arquivo (ex.: o agregado horário do coleta-hora) não invalidam o resultado:
+o mesmo agregado é calculado uma vez por mudança nos dados que ele lê, em
+qualquer processo.
+
+Calcular a assinatura percorre a tabela, então ela fica guardada junto com a
+versão do arquivo: o contador de alterações do cabeçalho, que o SQLite
+incrementa a cada transação confirmada (é o equivalente persistente do PRAGMA
+data_version), mais tamanho e mtime. Enquanto o arquivo não muda, a assinatura
+é reaproveitada sem abrir o banco.
+
+Os resultados (DataFrames) ficam em Arrow IPC num SQLite local
+(cache_consultas.sqlite), com descarte LRU quando o total passa de NOC_CACHE_MB
+(padrão 256; 0 desliga). O cache é só uma otimização: falhas de leitura ou
+gravação nele apenas fazem a consulta ser executada normalmente.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Mapping
+
+import pandas as pd
+import pyarrow as pa
+
+from noc import assinaturas
+from noc.conexao import conectar_leitura
+
+# ==========================
+# Configurações
+# ==========================
+
+BASE_DIR = Path(getattr(sys, "_MEIPASS", Path(__file__).resolve().parent.parent))
+CACHE_DB = BASE_DIR / "cache_consultas.sqlite"
+
+LIMITE_BYTES = int(float(os.environ.get("NOC_CACHE_MB", 256)) * 1024 * 1024)
+
+# ==========================
+# Chave
+# ==========================
+
+def versao_arquivo(caminho: Path) -> list | None:
+    """[contador de alterações, tamanho, mtime_ns] do banco (e do -wal, se existir)."""
+    caminho = Path(caminho)
+    try:
+        with open(caminho, "rb") as arquivo:
+            cabecalho = arquivo.read(100)
+        estado = caminho.stat()
+    except FileNotFoundError:
+        return None
+    versao = [int.from_bytes(cabecalho[24:28], "big"), estado.st_size, estado.st_mtime_ns]
+    # Em modo WAL as transações ficam no -wal até o checkpoint
+    wal = caminho.with_name(caminho.name + "-wal")
+    if wal.exists():
+        versao += [wal.stat().st_size, wal.stat().st_mtime_ns]
+    return versao
+
+
+def normalizar_sql(sql: str) -> str:
+    return re.sub(r"\s+", " ", sql).strip()
+
+
+def chave(sql: str, params: Iterable, estados: Mapping[str, dict]) -> str:
+    """Chave do resultado: SQL normalizado, parâmetros e assinatura das tabelas lidas."""
+    conteudo = json.dumps([normalizar_sql(sql), list(params), estados], default=str, sort_keys=True)
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+# ==========================
+# Cache
+# ==========================
+
+class CacheResultados:
+    """Resultados de consultas em disco, com descarte LRU por tamanho total."""
+
+    def __init__(self, caminho: Path = CACHE_DB, limite_bytes: int = LIMITE_BYTES):
+        self.caminho = Path(caminho)
+        self.limite_bytes = limite_bytes
+
+    @contextmanager
+    def _conexao(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.caminho, timeout=10)
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS Resultados (
+                    Chave TEXT PRIMARY KEY,
+                    Dados BLOB NOT NULL,
+                    Tamanho INTEGER NOT NULL,
+                    Acesso REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_resultados_acesso ON Resultados (Acesso)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS Estados (
+                    Arquivo TEXT NOT NULL,
+                    Tabela TEXT NOT NULL,
+                    Versao TEXT NOT NULL,
+                    Estado TEXT NOT NULL,
+                    PRIMARY KEY (Arquivo, Tabela)
+                ) WITHOUT ROWID
+            """)
+            yield conn
+        finally:
+            conn.close()
+
+    def _estados(self, conn: sqlite3.Connection, fontes: Mapping[Path, Iterable[str]]) -> dict[str, dict]:
+        """Assinatura das tabelas de cada arquivo, recalculada só quando o arquivo mudou."""
+        estados = {}
+        for caminho, tabelas in fontes.items():
+            caminho = Path(caminho).resolve()
+            versao = json.dumps(versao_arquivo(caminho))
+            guardados = dict(conn.execute(
+                "SELECT Tabela, Estado FROM Estados WHERE Arquivo = ? AND Versao = ?", (str(caminho), versao)
+            ).fetchall())
+            faltam = [tabela for tabela in tabelas if tabela not in guardados]
+            if faltam and caminho.exists():
+                fonte = conectar_leitura(caminho)
+                try:
+                    calculados = {tabela: json.dumps(assinaturas.estado_tabela(fonte, tabela)) for tabela in faltam}
+                finally:
+                    fonte.close()
+                conn.executemany("INSERT OR REPLACE INTO Estados VALUES (?, ?, ?, ?)",
+                                 [(str(caminho), tabela, versao, estado) for tabela, estado in calculados.items()])
+                conn.commit()
+                guardados.update(calculados)
+            estados[caminho.name] = {tabela: json.loads(guardados.get(tabela, "null")) for tabela in tabelas}
+        return estados
+
+    def _ler(self, conn: sqlite3.Connection, chave_resultado: str) -> pd.DataFrame | None:
+        linha = conn.execute("SELECT Dados FROM Resultados WHERE Chave = ?", (chave_resultado,)).fetchone()
+        if linha is None:
+            return None
+        conn.execute("UPDATE Resultados SET Acesso = ? WHERE Chave = ?", (time.time(), chave_resultado))
+        conn.commit()
+        with pa.ipc.open_stream(linha[0]) as leitor:
+            return leitor.read_all().to_pandas()
+
+    def _gravar(self, conn: sqlite3.Connection, chave_resultado: str, df: pd.DataFrame) -> None:
+        tabela = pa.Table.from_pandas(df, preserve_index=False)
+        saida = pa.BufferOutputStream()
+        with pa.ipc.new_stream(saida, tabela.schema) as escritor:
+            escritor.write_table(tabela)
+        dados = saida.getvalue().to_pybytes()
+        if len(dados) > self.limite_bytes:
+            return
+        conn.execute("INSERT OR REPLACE INTO Resultados VALUES (?, ?, ?, ?)",
+                     (chave_resultado, dados, len(dados), time.time()))
+        self._descartar(conn)
+        conn.commit()
+
+    def _descartar(self, conn: sqlite3.Connection) -> None:
+        """Remove os menos usados recentemente até o total caber no limite."""
+        excesso = conn.execute("SELECT COALESCE(SUM(Tamanho), 0) FROM Resultados").fetchone()[0] - self.limite_bytes
+        if excesso <= 0:
+            return
+        removidas = []
+        for chave_antiga, tamanho in conn.execute("SELECT Chave, Tamanho FROM Resultados ORDER BY Acesso"):
+            removidas.append((chave_antiga,))
+            excesso -= tamanho
+            if excesso <= 0:
+                break
+        conn.executemany("DELETE FROM Resultados WHERE Chave = ?", removidas)
+
+    def obter(self, sql: str, params: Iterable, fontes: Mapping[Path, Iterable[str]],
+              calcular: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+        """
+        Resultado em cache para (sql, params, assinatura das tabelas lidas);
+        'fontes' mapeia cada arquivo SQLite às tabelas que a consulta lê nele.
+        Se não houver, calcula e guarda.
+        """
+        if self.limite_bytes <= 0:
+            return calcular()
+        fontes = {caminho: list(tabelas) for caminho, tabelas in fontes.items()}
+        try:
+            with self._conexao() as conn:
+                chave_resultado = chave(sql, params, self._estados(conn, fontes))
+                df = self._ler(conn, chave_resultado)
+            if df is not None:
+                return df
+        except (sqlite3.Error, pa.ArrowException) as e:
+            logging.warning(f"Cache de consultas indisponível ({e}); executando a consulta.")
+            return calcular()
+
+        df = calcular()
+        try:
+            with self._conexao() as conn:
+                self._gravar(conn, chave_resultado, df)
+        except (sqlite3.Error, pa.ArrowException) as e:
+            logging.warning(f"Resultado não gravado no cache de consultas: {e}")
+        return df
+
+    def limpar(self) -> None:
+        with self._conexao() as conn:
+            conn.execute("DELETE FROM Resultados")
+            conn.execute("DELETE FROM Estados")
+            conn.commit()
+
+
+# Instância padrão (cache_consultas.sqlite ao lado do banco)
+CACHE = CacheResultados()
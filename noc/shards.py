@@ -0,0 +1,178 @@
+"""
+Fragmentação (shards) dos dados por grupo de empresas.
+Com NOC_SHARDS=N (N > 1), os dados consolidados e horários de cada empresa
+ficam em banco_exp_shardXX.sqlite, escolhido por um hash estável do nome da
+empresa; banco_exp.sqlite continua como catálogo (dimensões, tabelas de
+auditoria e cumulativo do checklist). Cargas de empresas em shards diferentes
+não disputam o mesmo lock de escrita, e as leituras são distribuídas entre os
+shards em paralelo e concatenadas (cada empresa está em um único shard).
+
+Sem NOC_SHARDS (ou N = 1) o único shard é o próprio banco_exp.sqlite.
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterable
+
+import pandas as pd
+
+from noc import resultados
+from noc.conexao import pool_leitura
+
+# ==========================
+# Configurações
+# ==========================
+
+BASE_DIR = Path(getattr(sys, "_MEIPASS", Path(__file__).resolve().parent.parent))
+DB_PATH = BASE_DIR / "banco_exp.sqlite"
+
+QUANTIDADE = max(1, int(os.environ.get("NOC_SHARDS", 1)))
+
+# ==========================
+# Roteador
+# ==========================
+
+class Roteador:
+    """Mapeia empresas para arquivos de banco e distribui leituras/escritas entre eles."""
+
+    def __init__(self, catalogo: Path = DB_PATH, quantidade: int = QUANTIDADE):
+        self.catalogo = Path(catalogo)
+        self.quantidade = max(1, quantidade)
+
+    @property
+    def fragmentado(self) -> bool:
+        return self.quantidade > 1
+
+    def caminhos(self) -> list[Path]:
+        """Arquivos com dados por empresa (só o catálogo quando não fragmentado)."""
+        if not self.fragmentado:
+            return [self.catalogo]
+        return [self.catalogo.with_name(f"{self.catalogo.stem}_shard{i:02d}{self.catalogo.suffix}")
+                for i in range(self.quantidade)]
+
+    def shard_de(self, empresa: str) -> Path:
+        """Shard da empresa: crc32 do nome (estável entre processos, ao contrário de hash())."""
+        return self.caminhos()[zlib.crc32(empresa.encode("utf-8")) % self.quantidade]
+
+    def agrupar(self, empresas: Iterable) -> dict[Path, list]:
+        """Agrupa empresas (nomes, ou tuplas com o nome na última posição) por shard."""
+        grupos: dict[Path, list] = {}
+        for item in empresas:
+            nome = item[-1] if isinstance(item, tuple) else item
+            grupos.setdefault(self.shard_de(nome), []).append(item)
+        return grupos
+
+    def paralelo(self, funcao: Callable[[Path], object], caminhos: Iterable[Path] | None = None) -> list:
+        """Executa funcao(caminho) em cada shard em paralelo; resultados na ordem dos shards."""
+        caminhos = list(self.caminhos() if caminhos is None else caminhos)
+        if not caminhos:
+            return []
+        if len(caminhos) == 1:
+            return [funcao(caminhos[0])]
+        with ThreadPoolExecutor(max_workers=len(caminhos), thread_name_prefix="noc-shard") as executor:
+            return list(executor.map(funcao, caminhos))
+
+    def arquivos(self) -> list[Path]:
+        """Catálogo e shards (sem repetição quando não fragmentado)."""
+        return list(dict.fromkeys([self.catalogo, *self.caminhos()]))
+
+    def consultar(self, sql: str, params: list | tuple = (), tabelas_cache: Iterable[str] = ()) -> pd.DataFrame:
+        """
+        Mesma consulta em todos os shards (pool somente leitura), resultados
+        concatenados. Com 'tabelas_cache' (as tabelas lidas pela consulta), passa
+        pelo cache persistente de resultados, com a assinatura delas em cada shard.
+        """
+        if tabelas_cache:
+            fontes = {caminho: tabelas_cache for caminho in self.caminhos()}
+            return resultados.CACHE.obter(sql, params, fontes, lambda: self.consultar(sql, params))
+
+        def consultar_shard(caminho: Path) -> pd.DataFrame | None:
+            if not caminho.exists():
+                return None
+            with pool_leitura(caminho).conexao() as conn:
+                return pd.read_sql(sql, conn, params=list(params))
+
+        lidas = [r for r in self.paralelo(consultar_shard) if r is not None]
+        if not lidas:
+            return pd.DataFrame()
+        # Shards vazios só contam se todos estiverem vazios (preserva as colunas)
+        partes = [r for r in lidas if not r.empty] or lidas[:1]
+        return pd.concat(partes, ignore_index=True) if len(partes) > 1 else partes[0]
+
+    def versao(self) -> int:
+        """Maior mtime (ns) entre catálogo e shards: muda sempre que algum arquivo é gravado."""
+        return max((p.stat().st_mtime_ns for p in self.arquivos() if p.exists()), default=0)
+
+
+_ROTEADORES: dict[Path, Roteador] = {}
+_LOCK_ROTEADORES = threading.Lock()
+
+
+def roteador(catalogo: Path = DB_PATH) -> Roteador:
+    """Roteador único por catálogo dentro do processo (quantidade de shards de NOC_SHARDS)."""
+    catalogo = Path(catalogo).resolve()
+    with _LOCK_ROTEADORES:
+        if catalogo not in _ROTEADORES:
+            _ROTEADORES[catalogo] = Roteador(catalogo)
+        return _ROTEADORES[catalogo]
+
+
+def roteador_de(conn: sqlite3.Connection) -> Roteador:
+    """Roteador do catálogo aberto em 'conn'."""
+    caminho = conn.execute("PRAGMA database_list").fetchone()[2]
+    return roteador(Path(caminho) if caminho else DB_PATH)
+
+
+def conectar_shards(rot: Roteador, conn_catalogo: sqlite3.Connection) -> dict[Path, sqlite3.Connection]:
+    """
+    Conexões de escrita por shard. Sem fragmentação reaproveita a conexão do
+    catálogo, para que leituras vejam as gravações ainda não confirmadas dela.
+    """
+    if not rot.fragmentado:
+        return {rot.catalogo: conn_catalogo}
+    return {caminho: sqlite3.connect(caminho, check_same_thread=False) for caminho in rot.caminhos()}
+
+
+def redistribuir(conn_catalogo: sqlite3.Connection, rot: Roteador) -> int:
+    """
+    Migração para o modo fragmentado: move do catálogo para os shards os dados
+    brutos por empresa (__Consolidado_Hist e tabelas __<Empresa>_input_Acionamentos)
+    e descarta os agregados por empresa do catálogo, que serão recalculados nos
+    shards. Os shards já devem ter o esquema criado. Retorna as linhas movidas.
+    """
+    if not rot.fragmentado:
+        return 0
+    colunas = "dtDataReferencia, dsNomeAssessoria, IdCompany, Qtd, Layout, Data_Coleta"
+    empresas = [e for (e,) in conn_catalogo.execute("SELECT DISTINCT dsNomeAssessoria FROM __Consolidado_Hist")]
+    tabelas = {t for (t,) in conn_catalogo.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    horarias = [t[2:-len("_input_Acionamentos")] for t in tabelas
+                if t.startswith("__") and t.endswith("_input_Acionamentos")]
+    movidas = 0
+    conn_catalogo.commit()
+    for caminho, nomes in rot.agrupar(set(empresas) | set(horarias)).items():
+        conn_catalogo.execute("ATTACH DATABASE ? AS shard", (str(caminho),))
+        try:
+            marcadores = ", ".join("?" for _ in nomes)
+            movidas += conn_catalogo.execute(f"""
+                INSERT INTO shard.__Consolidado_Hist ({colunas})
+                SELECT {colunas} FROM main.__Consolidado_Hist WHERE dsNomeAssessoria IN ({marcadores})
+            """, nomes).rowcount
+            for empresa in nomes:
+                if empresa in horarias:
+                    movidas += conn_catalogo.execute(f"""
+                        INSERT INTO shard.__{empresa}_input_Acionamentos (dtDataReferencia, hrHoraInicio, Qtde)
+                        SELECT dtDataReferencia, hrHoraInicio, Qtde FROM main.__{empresa}_input_Acionamentos
+                    """).rowcount
+                    conn_catalogo.execute(f"DROP TABLE main.__{empresa}_input_Acionamentos")
+            conn_catalogo.commit()
+        finally:
+            conn_catalogo.execute("DETACH DATABASE shard")
+    for tabela in ("__Consolidado_Hist", "Consolidado_Diario", "Acionamentos_Hora_Agregado", "Acionamentos_Hora_Baseline"):
+        conn_catalogo.execute(f"DELETE FROM main.{tabela}")
+    conn_catalogo.commit()
+    return movidas